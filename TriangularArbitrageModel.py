@@ -1,10 +1,24 @@
 import api_lib
-import grequests
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from decimal import Decimal
 
-from binance.client import Client
+from requests.exceptions import RequestException
+
+from binance.bookprovider import CoalescingBookProvider
+from binance.client import Client, OrderTemplate
 from binance.enums import *
+from binance.exceptions import BinanceAPIException, BinanceOrderException, BinanceRequestException
+from binance.infocache import ExchangeInfoCache
+from binance.latency import tracer
+from binance.log import INFO, get_logger
+from binance.metrics import registry
+from binance.rules import Quantiser, SymbolRules
+from binance.recorder import MarketDataRecorder, RECORD_BOOK_TICKER, RECORD_EXCHANGE_INFO, RECORD_ORDER_RESPONSE
+from binance.workqueue import POLICY_COALESCE, WorkerPool, WorkQueue
 
 valid_pair_name = {
         # lookup dictionary to provide valid currency pairs on the Binance exchange
@@ -41,19 +55,62 @@ valid_pair_name = {
     }
 
 
+def register_pairs(exchange_info):
+    # add every trading symbol of exchange_info to valid_pair_name, so any triangle can be modelled
+    for symbol in exchange_info['symbols']:
+        if symbol.get('status', 'TRADING') != 'TRADING':
+            continue
+        valid_pair_name[(symbol['baseAsset'], symbol['quoteAsset'])] = symbol['symbol']
+        valid_pair_name[(symbol['quoteAsset'], symbol['baseAsset'])] = symbol['symbol']
+
+
+log = get_logger('arbitrage')
+
+EVALUATIONS = registry.counter('arbitrage_evaluations_total', 'Triangle evaluations', ['triangle'])
+OPPORTUNITIES = registry.counter('arbitrage_opportunities_total', 'Evaluations meeting the trade conditional',
+                                 ['triangle'])
+ORDER_LATENCY = registry.histogram('arbitrage_order_latency_seconds', 'Order round trip per leg', ['resp_type'])
+FAILED_TRADES = registry.counter('arbitrage_failed_trades_total', 'Arbitrages stopped before the last leg filled',
+                                 ['triangle'])
+SLIPPAGE = registry.histogram('arbitrage_slippage', 'Predicted minus realised base asset per completed arbitrage',
+                              ['triangle'], buckets=(-1.0, -0.1, -0.01, 0.0, 0.01, 0.1, 1.0))
+
+
+# quantisers of truncate by number of decimal places
+_truncate_quantisers = {}
+
+
 def truncate(f, n):
     '''Truncates/pads a float f to n decimal places without rounding'''
-    s = '{}'.format(f)
-    if 'e' in s or 'E' in s:
-        return '{0:.{1}f}'.format(f, n)
-    i, p, d = s.partition('.')
-    return '.'.join([i, (d+'0'*n)[:n]])
+    quantiser = _truncate_quantisers.get(n)
+    if quantiser is None:
+        quantiser = _truncate_quantisers[n] = Quantiser('0', '0', Decimal(1).scaleb(-n))
+    return quantiser.quantise(f)
 
 
 class TriangularArbitrageModel:
-    def __init__(self, base_asset, quote_asset, tertiary_asset):
-        # Construct the Binance API client
-        self.client = Client(os.environ.get('STELLA_API_KEY'), os.environ.get('STELLA_SECRET_KEY'))
+    def __init__(self, base_asset, quote_asset, tertiary_asset, client=None, exchange_info=None, clock=None,
+                 book_provider=None, exchange_info_cache=None):
+        # client, exchange_info and clock can be injected to run the model offline, e.g. for replays
+        # clock is anything with a now() returning a datetime, by default the system clock
+        # book_provider is anything with a get_order_books(symbols), e.g. a CoalescingBookProvider shared by
+        # the models of several triangles, update_order_books makes one for the model when it is None
+        # exchange_info_cache is a file to keep exchangeInfo in, so a restart does not wait on downloading it
+        self._started = time.perf_counter()
+        self.startup_timings = {}
+        self.clock = clock or datetime
+        self.recv_window = 1000
+        if client is None:
+            # Construct the Binance API client, the first request opens the connection instead of a ping
+            client = Client(os.environ.get('STELLA_API_KEY'), os.environ.get('STELLA_SECRET_KEY'), ping=False)
+
+            # correct signed request timestamps for clock skew so a tight recvWindow can be used
+            # and orders that arrive late are rejected instead of filled late
+            # the first sync blocks, signed calls such as start_ledger may follow the constructor straight away
+            client.sync_server_time()
+            client.start_time_sync()
+        self.client = client
+        self._startup_stage('client')
 
         self.base_asset = base_asset
         self.quote_asset = quote_asset
@@ -73,6 +130,10 @@ class TriangularArbitrageModel:
         self.pair_b_inversion = self.pair_b_valid_name.startswith(tertiary_asset) #eth/btc false
         self.pair_c_inversion = self.pair_c_valid_name.startswith(base_asset) # btc/usdt false
 
+        triangle = '/'.join((base_asset, quote_asset, tertiary_asset))
+        self._evaluations = EVALUATIONS.labels(triangle)
+        self._opportunities = OPPORTUNITIES.labels(triangle)
+
         # call get_market_data to update the data
         self.market_data = {}
 
@@ -89,7 +150,7 @@ class TriangularArbitrageModel:
 
         self.debounce = timedelta(0, 10, 0)  # 10 seconds -- decrease this when we get more advanced
         # initialize last_trade_time so we can trade immediately
-        self.last_trade_time = datetime.now() - self.debounce
+        self.last_trade_time = self.clock.now() - self.debounce
 
         # holds the last n values for implicit profit
 
@@ -102,27 +163,82 @@ class TriangularArbitrageModel:
 
         self.trade_fee = 0.0005
 
+        # seconds taken by each leg of the last arbitrage trade, None for a leg whose request failed
+        self.leg_latency = []
+        # (asset, amount) received by each leg of the last chained arbitrage
+        self.leg_received = []
+        # recent per leg order latencies by response type, to measure what FULL responses cost over ACK
+        self.order_latency = {ORDER_RESP_TYPE_ACK: deque(maxlen=100), ORDER_RESP_TYPE_FULL: deque(maxlen=100)}
+
         self.base_asset_account = 0
         self.quote_asset_account = 0
         self.tertiary_asset_account = 0
 
+        # user data stream ledger, see start_ledger
+        self.ledger_manager = None
+
+        # market data recorder, see start_recording
+        self.recorder = None
+
+        # websocket depth caches and the worker evaluating them, see start_depth_streams
+        self.depth_cache_managers = {}
+        self.worker_pool = None
+
+        # source of the order books, see attach_book_bus, update_order_books makes its own when there is none
+        self.book_provider = book_provider
+        self._own_book_provider = False
+
+        # threads sending the concurrent legs and pings over the client's session
+        self._request_pool = None
+
+        # place the chained arbitrage when the trade conditional is met, see start_paper_trading
+        self.execute_trades = False
+        # (predicted, realised) base asset of recent completed arbitrages
+        self.trade_results = deque(maxlen=1000)
+        # (predicted, leg, reason) of recent arbitrages that stopped early, leg is None when the failure
+        # was outside the legs
+        self.failed_trades = deque(maxlen=1000)
+        self._slippage = SLIPPAGE.labels(triangle)
+        self._failed_trades = FAILED_TRADES.labels(triangle)
+
         # TODO: add filters for min_notional
 
-        self.pair_a_minQty = 0
-        self.pair_a_maxQty = 0
-        self.pair_a_stepSize = 0
-        self.pair_b_minQty = 0
-        self.pair_b_maxQty = 0
-        self.pair_b_stepSize = 0
-        self.pair_c_minQty = 0
-        self.pair_c_maxQty = 0
-        self.pair_c_stepSize = 0
-        self.exchangeInfo = self.update_exchange_info()  # update filter information
+        # LOT_SIZE of each pair as a binance.rules.Quantiser, see update_exchange_info
+        self.symbol_rules = None
+        self.pair_a_lot_size = None
+        self.pair_b_lot_size = None
+        self.pair_c_lot_size = None
+        self.exchangeInfo = None
+        self.exchange_info_cache = None
+        if exchange_info is None and exchange_info_cache is not None:
+            # the cache applies its copy before revalidating it in the background, and any newer one after
+            self.exchange_info_cache = ExchangeInfoCache(exchange_info_cache, self.client)
+            self.exchange_info_cache.load(self.update_exchange_info)
+        else:
+            self.update_exchange_info(exchange_info)  # update filter information
+        self._startup_stage('filters')
+
+    def _startup_stage(self, stage):
+        # seconds from the start of the constructor to the end of each start up stage
+        self.startup_timings[stage] = time.perf_counter() - self._started
+
+    def get_startup_report(self):
+        # start up stages in ms since the constructor started, first_evaluation once the model has evaluated
+        return dict((stage, round(seconds * 1000.0, 3)) for stage, seconds in self.startup_timings.items())
 
     def async_update(self, total_base_asset, profit_conditional):
         # This method should be called periodically for executing live trading
         # TODO: get order book data from web socket streams instead of REST API
+        # stage latencies are traced into binance.latency.tracer, see tracer.dump()
+        start = tracer.start()
         self.update_order_books()
+        tracer.stop('book_fetch', start)
+        return self.evaluate(total_base_asset, profit_conditional)
+
+    def evaluate(self, total_base_asset, profit_conditional):
+        # run the model against the current order books and decide whether to trade
+        # returns True when the trade conditional was met
+        start = tracer.start()
         self.base_asset_amount = total_base_asset
         self.pair_a_quote_fill = self._get_order_book_quote_value(self.pair_a_order_book,
                                                                   total_base_asset,
@@ -133,6 +249,7 @@ class TriangularArbitrageModel:
         self.implicit_profit = self._get_order_book_quote_value(self.pair_c_order_book,
                                                                 self.pair_b_quote_fill,
                                                                 self.pair_c_inversion)
+        start = tracer.stop('fill_simulation', start)
 
         # update the time series for last n implicit profits
         self.live_implicit_profit_len = len(self.live_implicit_profit)
@@ -146,152 +263,415 @@ class TriangularArbitrageModel:
         self.live_implicit_profit.append(self.implicit_profit)
 
         # CONDITIONAL FOR PLACING TRADES
-        debounce_conditional = (datetime.now() - self.last_trade_time >= self.debounce)
+        debounce_conditional = (self.clock.now() - self.last_trade_time >= self.debounce)
         implicit_rolling_average = self.implicit_profit
         if self.live_implicit_profit_len > self.implicit_rolling_window:
             implicit_rolling_average = sum(self.live_implicit_profit[-self.implicit_rolling_window:]) / float(self.implicit_rolling_window)
-        if debounce_conditional and (self.implicit_profit > implicit_rolling_average > profit_conditional):
-            print()
-            print('Implicit profit is: ', self.implicit_profit)
-            print('implicit_rolling_average: ', implicit_rolling_average)
-            pre_trade = datetime.now()
-            print('Placing arbitrage trades', str(pre_trade))
-            # self.place_arbitrage_trade(total_base_asset)
-            # self.place_arbitrage_trade()
-            post_trade = datetime.now()
-            print('Arbitrage trades complete: ', str(post_trade))
-            print('Time to complete trades: ', str(post_trade-pre_trade))
-            print()
+        trade_conditional = debounce_conditional and (self.implicit_profit > implicit_rolling_average > profit_conditional)
+        tracer.stop('decision', start)
+        self._evaluations.inc()
+        if self._started is not None:
+            self._startup_stage('first_evaluation')
+            self._started = None
+            log.info('startup', **self.get_startup_report())
+        if trade_conditional:
+            self._opportunities.inc()
+            pre_trade = self.clock.now()
+            log.info('placing_arbitrage_trades', implicit_profit=self.implicit_profit,
+                     implicit_rolling_average=implicit_rolling_average)
+            if self.execute_trades:
+                try:
+                    self.place_chained_arbitrage_trade()
+                except (BinanceAPIException, BinanceOrderException, BinanceRequestException, RequestException) as e:
+                    # e.g. the account query after the legs, the update loop carries on
+                    log.error('arbitrage_failed', 'error placing the arbitrage', exception=repr(e))
+                    self._record_failed_trade(None, repr(e))
+            post_trade = self.clock.now()
+            log.info('arbitrage_trades_complete', duration=post_trade - pre_trade)
             self.last_trade_time = post_trade
 
         else:
-            print('Trade conditional not met. Implicit profit: ', self.implicit_profit)
-
-    def update_exchange_info(self):
-        exchange_info = self.client.get_exchange_info()
-
-        for symbol in exchange_info['symbols']:
-            print(symbol['symbol'])
-            print(symbol['filters'])
-            if symbol['symbol'] == self.pair_a_valid_name:
-                self.pair_a_minQty = symbol['filters'][1]['minQty']
-                self.pair_a_maxQty = symbol['filters'][1]['maxQty']
-                self.pair_a_stepSize = symbol['filters'][1]['stepSize']
-                print(self.pair_a_minQty)
-                print(self.pair_a_maxQty)
-                print(self.pair_a_stepSize)
-
-        for symbol in exchange_info['symbols']:
-            print(symbol['filters'])
-            if symbol['symbol'] == self.pair_b_valid_name:
-                self.pair_b_minQty = symbol['filters'][1]['minQty']
-                self.pair_b_maxQty = symbol['filters'][1]['maxQty']
-                self.pair_b_stepSize = symbol['filters'][1]['stepSize']
-                print(self.pair_b_minQty)
-                print(self.pair_b_maxQty)
-                print(self.pair_b_stepSize)
-
-        for symbol in exchange_info['symbols']:
-            print(symbol['filters'])
-            if symbol['symbol'] == self.pair_c_valid_name:
-                self.pair_c_minQty = symbol['filters'][1]['minQty']
-                self.pair_c_maxQty = symbol['filters'][1]['maxQty']
-                self.pair_c_stepSize = symbol['filters'][1]['stepSize']
-                print(self.pair_c_minQty)
-                print(self.pair_c_maxQty)
-                print(self.pair_c_stepSize)
+            # this fires on every evaluation, only write a sample of them
+            log.sampled(INFO, 'trade_conditional_not_met', 100, implicit_profit=self.implicit_profit)
+        return trade_conditional
+
+    def set_order_book(self, symbol, order_book):
+        # replace the order book of one of the triangle's pairs, e.g. from a depth cache or a replay
+        # order_book has the REST depth layout, {'bids': [[price, qty], ...], 'asks': [[price, qty], ...]}
+        if symbol == self.pair_a_valid_name:
+            self.pair_a_order_book = order_book
+        elif symbol == self.pair_b_valid_name:
+            self.pair_b_order_book = order_book
+        elif symbol == self.pair_c_valid_name:
+            self.pair_c_order_book = order_book
+
+    def get_order_book(self, symbol):
+        # the current order book of one of the triangle's pairs
+        if symbol == self.pair_a_valid_name:
+            return self.pair_a_order_book
+        elif symbol == self.pair_b_valid_name:
+            return self.pair_b_order_book
+        elif symbol == self.pair_c_valid_name:
+            return self.pair_c_order_book
+
+    def update_exchange_info(self, exchange_info=None):
+        # read the filters from exchange_info, downloading it if not given, and keep it as exchangeInfo
+        if exchange_info is None:
+            exchange_info = self.client.get_exchange_info()
+        self.exchangeInfo = exchange_info
+
+        # one index of every symbol's filters, shared by the models built from the same exchange_info
+        self.symbol_rules = SymbolRules.for_exchange_info(exchange_info)
+        self.pair_a_lot_size = self.symbol_rules.lot_size(self.pair_a_valid_name)
+        self.pair_b_lot_size = self.symbol_rules.lot_size(self.pair_b_valid_name)
+        self.pair_c_lot_size = self.symbol_rules.lot_size(self.pair_c_valid_name)
+        for symbol, lot_size in ((self.pair_a_valid_name, self.pair_a_lot_size),
+                                 (self.pair_b_valid_name, self.pair_b_lot_size),
+                                 (self.pair_c_valid_name, self.pair_c_lot_size)):
+            if lot_size is None:
+                # offline models may run on an exchange_info without the symbol
+                continue
+            log.info('lot_size', symbol=symbol, minQty=lot_size.minimum, maxQty=lot_size.maximum,
+                     stepSize=lot_size.step)
 
         return exchange_info
 
     def test_binance_client(self):
         depth = self.client.get_order_book(symbol='ETHBTC')
-        print(depth)
+        log.info('order_book', symbol='ETHBTC', depth=depth)
 
-    def place_arbitrage_trade(self):
+    def place_arbitrage_trade(self, sequential=True):
         # place the arbitrage based on the model's most recent calculations
         # we save time by not updating the values
+        # sequential=False signs all three legs up front and sends them concurrently,
+        # keep it sequential when a leg depends on the previous fill
+        legs = self._arbitrage_legs()
+        if sequential:
+            orders = self._place_legs_sequential(legs)
+        else:
+            orders = self._place_legs_concurrent(legs)
 
-        # place trade a
-        a_side = SIDE_BUY
-        if self.pair_a_inversion:
-            a_side = SIDE_SELL
-        trade_qty = str(float(self.pair_a_quote_fill) - (float(self.pair_a_quote_fill) % float(self.pair_a_stepSize)))[:7]
-        print('placing order for %s %s' % (trade_qty, self.pair_a_valid_name))
-        order = self.client.create_order(
-            symbol=self.pair_a_valid_name,
-            side=a_side,
-            type=ORDER_TYPE_MARKET,
-            quantity=trade_qty,
-            recvWindow=10000)
-        print('ORDER: ', order)
-
-        # TODO: receive trade a fill amount
-
-        # place trade b
-        b_side = SIDE_BUY
-        if self.pair_b_inversion:
-            b_side = SIDE_SELL
-        trade_qty = str(float(self.pair_b_quote_fill) - (float(self.pair_b_quote_fill) % float(self.pair_b_stepSize)))[:7]
-        print('placing order for %s %s' % (trade_qty, self.pair_b_valid_name))
-        order = self.client.create_order(
-            symbol=self.pair_b_valid_name,
-            side=b_side,
-            type=ORDER_TYPE_MARKET,
-            quantity=trade_qty,
-            recvWindow=10000)
-        print('ORDER: ', order)
-
-        # TODO: receive trade b fill amount
-
-        # place trade c
-        c_side = SIDE_BUY
-        if self.pair_c_inversion:
-            c_side = SIDE_SELL
-        trade_qty = str(float(self.implicit_profit) - (float(self.implicit_profit) % float(self.pair_c_stepSize)))[:7]
-        print('placing order for %s %s' % (trade_qty, self.pair_c_valid_name))
-        order = self.client.create_order(
-            symbol=self.pair_c_valid_name,
-            side=c_side,
-            type=ORDER_TYPE_MARKET,
-            quantity=trade_qty,
-            recvWindow=10000)
-        print('ORDER: ', order)
+        for (symbol, side, trade_qty), latency in zip(legs, self.leg_latency):
+            log.info('leg_latency', symbol=symbol, side=side, quantity=trade_qty, seconds=latency)
 
         # TODO: calculate total trade profit from fill amount
 
         # print account info after trade
         self.print_account_info()
-        return
+        return orders
+
+    def _arbitrage_legs(self):
+        # build the (symbol, side, quantity) of each leg from the most recent model values
+        # the legs turn the base asset into the quote asset, that into the tertiary asset and that back into the base
+        # place_chained_arbitrage_trade resizes legs b and c from the actual fills
+        legs = []
+        amounts = [self.base_asset_amount, self.pair_a_quote_fill, self.pair_b_quote_fill, self.implicit_profit]
+        for i, (valid_name, received_asset, lot_size) in enumerate([
+                (self.pair_a_valid_name, self.quote_asset, self.pair_a_lot_size),
+                (self.pair_b_valid_name, self.tertiary_asset, self.pair_b_lot_size),
+                (self.pair_c_valid_name, self.base_asset, self.pair_c_lot_size)]):
+            # buying a symbol receives its base asset, selling it receives its quote asset
+            side = SIDE_BUY
+            if self.symbol_rules.assets(valid_name)[0] != received_asset:
+                side = SIDE_SELL
+            # quantities are in the symbol's base asset, what a buy receives and what a sell spends
+            trade_qty = lot_size.quantise(amounts[i + 1] if side == SIDE_BUY else amounts[i])
+            legs.append((valid_name, side, trade_qty))
+        return legs
+
+    def _received_asset(self, symbol, side):
+        # the asset an order delivers, the symbol's base asset for a buy and its quote asset for a sell
+        base_asset, quote_asset = self.symbol_rules.assets(symbol)
+        return base_asset if side == SIDE_BUY else quote_asset
+
+    def _place_legs_sequential(self, legs):
+        # send each leg and wait for its response before sending the next
+        orders = []
+        self.leg_latency = []
+        for symbol, side, trade_qty in legs:
+            log.info('placing_order', symbol=symbol, side=side, quantity=trade_qty)
+            pre_order = time.perf_counter()
+            template = self.client.order_template(symbol, side, ORDER_TYPE_MARKET,
+                                                  recvWindow=self.recv_window,
+                                                  newOrderRespType=ORDER_RESP_TYPE_ACK)
+            order = self.client.create_template_order(template, trade_qty)
+            self.leg_latency.append(time.perf_counter() - pre_order)
+            self._record_order_latency(ORDER_RESP_TYPE_ACK, self.leg_latency[-1])
+            log.info('order', response=order)
+            self._record_order(order)
+            orders.append(order)
+        return orders
+
+    def _get_request_pool(self):
+        # plain threads sharing the client's connection pool, one per leg
+        if self._request_pool is None:
+            self._request_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='arbitrage-request')
+        return self._request_pool
+
+    def _place_legs_concurrent(self, legs):
+        # sign every leg before sending anything, then send them all at once
+        # over the client's pooled session
+        templates = [self.client.order_template(symbol, side, ORDER_TYPE_MARKET, recvWindow=self.recv_window,
+                                                newOrderRespType=ORDER_RESP_TYPE_ACK)
+                     for symbol, side, trade_qty in legs]
+        if not all(isinstance(template, OrderTemplate) for template in templates):
+            # e.g. a paper client, its orders are filled in process without a request to send
+            return self._place_legs_sequential(legs)
+
+        bodies = []
+        for (symbol, side, trade_qty), template in zip(legs, templates):
+            start = tracer.start()
+            bodies.append(template.build(trade_qty, self.client.server_timestamp()))
+            tracer.stop('sign', start)
+
+        log.info('placing_orders', legs=legs)
+        pool = self._get_request_pool()
+        futures = [pool.submit(self.client.session.post, template.uri, data=body,
+                               headers={'Content-Type': OrderTemplate.CONTENT_TYPE})
+                   for template, body in zip(templates, bodies)]
+
+        # every leg was sent, so every response is handled before an error is raised
+        orders = []
+        errors = []
+        self.leg_latency = []
+        for (symbol, side, trade_qty), future in zip(legs, futures):
+            try:
+                response = future.result()
+            except RequestException as e:
+                log.error('request_failed', 'error sending an order', symbol=symbol, side=side, exception=repr(e))
+                self.leg_latency.append(None)
+                errors.append(e)
+                continue
+            # elapsed covers sending the request until the response headers arrived
+            self.leg_latency.append(response.elapsed.total_seconds())
+            self._record_order_latency(ORDER_RESP_TYPE_ACK, self.leg_latency[-1])
+            tracer.record('submit_ack', self.leg_latency[-1])
+            try:
+                order = self.client._handle_response(response)
+            except (BinanceAPIException, BinanceRequestException) as e:
+                log.error('order_rejected', 'order not accepted', symbol=symbol, side=side, exception=repr(e))
+                errors.append(e)
+                continue
+            log.info('order', response=order)
+            self._record_order(order)
+            orders.append(order)
+        if errors:
+            raise errors[0]
+        return orders
+
+    def place_chained_arbitrage_trade(self):
+        # place the legs one after another with FULL responses and size legs b and c
+        # from the amount actually received by the previous leg, net of commission
+        legs = self._arbitrage_legs()
+        order_books = [self.pair_a_order_book, self.pair_b_order_book, self.pair_c_order_book]
+        lot_sizes = [self.pair_a_lot_size, self.pair_b_lot_size, self.pair_c_lot_size]
+
+        orders = []
+        self.leg_latency = []
+        self.leg_received = []
+        received = None
+        for i, (symbol, side, trade_qty) in enumerate(legs):
+            if received is not None:
+                trade_qty = self._get_chained_quantity(received, side, order_books[i], lot_sizes[i])
+            log.info('placing_order', symbol=symbol, side=side, quantity=trade_qty)
+            pre_order = time.perf_counter()
+            template = self.client.order_template(symbol, side, ORDER_TYPE_MARKET,
+                                                  recvWindow=self.recv_window,
+                                                  newOrderRespType=ORDER_RESP_TYPE_FULL)
+            try:
+                order = self.client.create_template_order(template, trade_qty)
+            except (BinanceAPIException, BinanceOrderException, BinanceRequestException, RequestException) as e:
+                # the legs already filled stay filled, the held asset is left for the next arbitrage
+                log.error('leg_failed', 'stopping the arbitrage', symbol=symbol, side=side, quantity=trade_qty,
+                          leg=i, exception=repr(e))
+                self._record_failed_trade(i, repr(e))
+                break
+            self.leg_latency.append(time.perf_counter() - pre_order)
+            self._record_order_latency(ORDER_RESP_TYPE_FULL, self.leg_latency[-1])
+            log.info('order', response=order)
+            self._record_order(order)
+            orders.append(order)
+
+            received_asset = self._received_asset(symbol, side)
+            received = self._get_fill_received(order, side, received_asset)
+            self.leg_received.append((received_asset, received))
+            log.info('received', asset=received_asset, amount=received)
+            if received <= 0.0:
+                log.warning('leg_not_filled', 'stopping the arbitrage', symbol=symbol, side=side,
+                            quantity=trade_qty, leg=i)
+                self._record_failed_trade(i, 'not filled')
+                break
+        else:
+            # every leg filled, received is the base asset we ended up with
+            self.trade_results.append((self.implicit_profit, received))
+            self._slippage.observe(self.implicit_profit - received)
+            log.info('arbitrage_realised', predicted=self.implicit_profit, realised=received,
+                     base_asset_amount=self.base_asset_amount)
+
+        self.print_account_info()
+        return orders
+
+    def _record_failed_trade(self, leg, reason):
+        self.failed_trades.append((self.implicit_profit, leg, reason))
+        self._failed_trades.inc()
+
+    def _record_order_latency(self, resp_type, seconds):
+        self.order_latency[resp_type].append(seconds)
+        ORDER_LATENCY.labels(resp_type).observe(seconds)
+
+    def get_order_latency_report(self):
+        # mean per leg order latency by response type and the extra time a FULL response costs
+        report = {}
+        for resp_type, latencies in self.order_latency.items():
+            report[resp_type] = sum(latencies) / len(latencies) if latencies else None
+        if report[ORDER_RESP_TYPE_ACK] is not None and report[ORDER_RESP_TYPE_FULL] is not None:
+            report['full_extra'] = report[ORDER_RESP_TYPE_FULL] - report[ORDER_RESP_TYPE_ACK]
+        return report
+
+    @classmethod
+    def _get_chained_quantity(cls, held, side, order_book, lot_size):
+        # order quantity is in the symbol's base asset
+        # selling spends the held base asset directly, buying spends the held quote asset down the asks
+        if side == SIDE_SELL:
+            return lot_size.quantise(held)
+        return lot_size.quantise(cls._get_base_amount_for_quote(order_book, held))
+
+    @staticmethod
+    def _get_base_amount_for_quote(order_book, quote_amount):
+        # base asset a market buy spending quote_amount receives, walking the asks from the best price
+        base_bought = 0.0
+        for ask in order_book['asks']:
+            price = float(ask[0])
+            qty = float(ask[1])
+            if price * qty >= quote_amount:
+                return base_bought + quote_amount / price
+            base_bought += qty
+            quote_amount -= price * qty
+
+        log.warning('order_book_exhausted',
+                    'not enough order book info to calculate trade quantity, consider increasing the limit')
+        return base_bought
+
+    @staticmethod
+    def _get_fill_received(order, side, received_asset):
+        # amount of received_asset that a FULL order response actually delivered
+        # a buy receives the base asset qty, a sell receives the quote asset qty * price
+        received = 0.0
+        for fill in order.get('fills', []):
+            qty = float(fill['qty'])
+            if side == SIDE_BUY:
+                received += qty
+            else:
+                received += qty * float(fill['price'])
+            if fill['commissionAsset'] == received_asset:
+                received -= float(fill['commission'])
+        return received
+
+    def start_recording(self, path):
+        # append the raw order books, book tickers and order responses the model sees to a recording
+        # the exchange info goes in first so the recording is self contained
+        if self.recorder is None:
+            self.recorder = MarketDataRecorder(path)
+            self.recorder.record_json(RECORD_EXCHANGE_INFO, self.exchangeInfo)
+        return self.recorder
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def _record_order(self, order):
+        if self.recorder is not None:
+            self.recorder.record_json(RECORD_ORDER_RESPONSE, order, order.get('symbol', ''))
+
+    def start_depth_streams(self, total_base_asset, profit_conditional, stream_url=None, work_queue=None):
+        # evaluate on every websocket depth update instead of polling update_order_books
+        # books are applied on the reactor thread and the evaluation is handed to a single worker,
+        # the coalescing queue keeps only the latest book per symbol when evaluations fall behind
+        # the websocket stack pulls in twisted and autobahn, imported here so models without streams start fast
+        from binance.depthcache import DepthCacheManager
+
+        if self.worker_pool is None:
+            self._stream_total_base_asset = total_base_asset
+            self._stream_profit_conditional = profit_conditional
+            self.worker_pool = WorkerPool(work_queue or WorkQueue('arbitrage', maxsize=16, policy=POLICY_COALESCE))
+            self.worker_pool.start()
+            for symbol in (self.pair_a_valid_name, self.pair_b_valid_name, self.pair_c_valid_name):
+                self.depth_cache_managers[symbol] = DepthCacheManager(self.client, symbol, self._depth_cache_update,
+                                                                      self.recorder, stream_url=stream_url,
+                                                                      work_queue=self.worker_pool.queue)
+        return self.worker_pool
+
+    def stop_depth_streams(self):
+        for depth_cache_manager in self.depth_cache_managers.values():
+            depth_cache_manager.close()
+        self.depth_cache_managers = {}
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+            self.worker_pool = None
+
+    def _depth_cache_update(self, depth_cache):
+        # runs on the worker thread with a copy of the depth cache
+        self.set_order_book(depth_cache._symbol, {'bids': depth_cache.get_bids(), 'asks': depth_cache.get_asks()})
+        if self.pair_a_order_book and self.pair_b_order_book and self.pair_c_order_book:
+            self.evaluate(self._stream_total_base_asset, self._stream_profit_conditional)
+
+    def start_ledger(self):
+        # track balances and orders from the user data stream instead of polling get_account
+        # the ledger only calls the REST API at start up and after the stream reconnects
+        from binance.ledger import AccountLedgerManager
+
+        if self.ledger_manager is None:
+            self.ledger_manager = AccountLedgerManager(self.client, recv_window=self.recv_window)
+            # the balances load once the user data stream connects
+            if not self.ledger_manager.wait_ready(10):
+                log.warning('ledger_not_ready', 'balances not loaded yet')
+        return self.ledger_manager
+
+    def start_paper_trading(self, balances=None):
+        # execute trades against the model's own order books on a simulated venue instead of the exchange
+        # market data still comes from the current client's REST API
+        from binance.paper import PaperClient
+
+        if not isinstance(self.client, PaperClient):
+            client = PaperClient(self.exchangeInfo, balances, self.trade_fee, self.get_order_book)
+            client.API_URL = self.client.API_URL
+            self.client = client
+        self.execute_trades = True
+        return self.client
 
     def print_account_info(self):
         self.pair_a_valid_name = valid_pair_name[self.pair_a]
         self.pair_b_valid_name = valid_pair_name[self.pair_b]
         self.pair_c_valid_name = valid_pair_name[self.pair_c]
 
-        info = self.client.get_account(recvWindow=10000)
-        for balance in info['balances']:
+        if self.ledger_manager is not None:
+            # balances are kept current by the user data stream, no REST call needed
+            ledger = self.ledger_manager.get_ledger()
+            balances = [{'asset': asset, 'free': ledger.get_balance(asset), 'locked': ledger.get_locked(asset)}
+                        for asset in (self.base_asset, self.quote_asset, self.tertiary_asset)]
+        else:
+            balances = self.client.get_account(recvWindow=self.recv_window)['balances']
+        for balance in balances:
             if balance['asset'] == self.base_asset:
-                print(balance['asset'], balance)
-                print(balance['free'])
-                print('Change %s: %s' % (balance['asset'], float(balance['free']) - float(self.base_asset_account)))
+                log.info('balance', asset=balance['asset'], free=balance['free'],
+                         change=float(balance['free']) - float(self.base_asset_account))
                 self.base_asset_account = float(balance['free'])
             elif balance['asset'] == self.quote_asset:
-                print(balance['asset'], balance)
-                print(balance['free'])
-                print('Change %s: %s' % (balance['asset'], float(balance['free']) - float(self.quote_asset_account)))
+                log.info('balance', asset=balance['asset'], free=balance['free'],
+                         change=float(balance['free']) - float(self.quote_asset_account))
                 self.quote_asset_account = float(balance['free'])
             elif balance['asset'] == self.tertiary_asset:
-                print(balance['asset'], balance)
-                print('Change %s: %s' % (balance['asset'], float(balance['free']) - float(self.tertiary_asset_account)))
+                log.info('balance', asset=balance['asset'], free=balance['free'],
+                         change=float(balance['free']) - float(self.tertiary_asset_account))
                 self.tertiary_asset_account = float(balance['free'])
 
     def testing_ping(self, total_base_asset):
         # place trades in parallel
-        ep = 'https://api.binance.com/api/v1/ping'
-
-        get_request_list = [grequests.get(ep)] * 3
+        ep = self.client.API_URL + '/v1/ping'
 
-        responses = grequests.map(get_request_list, exception_handler=self._request_exception, size=3)
+        pool = self._get_request_pool()
+        responses = [future.result() for future in [pool.submit(self.client.session.get, ep) for _ in range(3)]]
 
         pair_a_response = responses[0]
         pair_b_response = responses[1]
@@ -301,8 +681,13 @@ class TriangularArbitrageModel:
 
     def update_market_data(self):
         # call this once per second
-        response_list = api_lib.get_book_ticker(symbol='all').json()
+        response = api_lib.get_book_ticker(symbol='all')
+        if self.recorder is not None:
+            self.recorder.record(RECORD_BOOK_TICKER, response.content, 'all')
+        return self.parse_market_data(response.json())
 
+    def parse_market_data(self, response_list):
+        # read the triangle's prices from an allBookTickers response list
         # assign the prices to variables
         self.market_data['pair_a_ask'] = self._get_ask_from_json(response_list, self.pair_a_valid_name, self.pair_a_inversion)
         self.market_data['pair_b_ask'] = self._get_ask_from_json(response_list, self.pair_b_valid_name, self.pair_b_inversion)
@@ -340,41 +725,32 @@ class TriangularArbitrageModel:
 
         return self.implicit_profit
 
+    def attach_book_bus(self, name):
+        # read the order books from a shared memory bus published by a binance.shmbook.BookFeed
+        # instead of fetching them, so many model processes can share one feed
+        from binance.shmbook import SharedBookReader
+
+        if not isinstance(self.book_provider, SharedBookReader):
+            self.book_provider = SharedBookReader(name)
+            self._own_book_provider = False
+        return self.book_provider
+
     def update_order_books(self):
         # update order books in parallel
         # call this sparsely -- when arbitrage_profit is within a specified range
-        ep = 'https://api.binance.com/api/v1/depth'
         symbols = [self.pair_a_valid_name, self.pair_b_valid_name, self.pair_c_valid_name]
-        headers = {'X-MBX-APIKEY': os.environ.get('STELLA_API_KEY')}
-
-        get_request_list = []
-        for symbol in symbols:
-            get_request_list.append(grequests.get(ep,
-                                                  params={'symbol': symbol, 'limit': self.order_book_limit},
-                                                  headers=headers))
-
-        responses = grequests.map(get_request_list, exception_handler=self._request_exception, size=3)
-
-        pair_a_response = responses[0]
-        pair_b_response = responses[1]
-        pair_c_response = responses[2]
-
-        if 429 in [pair_a_response.status_code, pair_b_response.status_code, pair_c_response.status_code]:
-            print('Received a status code 429... exiting')
-            exit(1)
-
-        self.pair_a_order_book = pair_a_response.json()
-        self.pair_b_order_book = pair_b_response.json()
-        self.pair_c_order_book = pair_c_response.json()
-
+        if self.book_provider is None:
+            # fetch the three books in parallel on threads, a ttl of 0 never serves a book twice
+            self.book_provider = CoalescingBookProvider(self.client, ttl=0, limit=self.order_book_limit)
+            self._own_book_provider = True
+        if self._own_book_provider:
+            # follow start_recording and start_paper_trading
+            self.book_provider.client = self.client
+            self.book_provider.recorder = self.recorder
+        self.pair_a_order_book, self.pair_b_order_book, self.pair_c_order_book = \
+            self.book_provider.get_order_books(symbols)
         return [self.pair_a_order_book, self.pair_b_order_book, self.pair_c_order_book]
 
-    @staticmethod
-    def _request_exception(request, exception):
-        print('Error executing HTTP GET request')
-        print("Problem: {}: {}".format(request.url, exception))
-        exit(1)
-
     def _get_order_book_quote_value(self, order_book, total_base_asset, inversion=False):
         # choose the trading direction dependent on inversion factor
         # fees are calculated here
@@ -407,7 +783,8 @@ class TriangularArbitrageModel:
                 base_to_sell -= ask_total
 
         if base_to_sell > 0.0:
-            print('Not enough order book info to calculate trade quantity. Consider increasing the limit parameter.')
+            log.warning('order_book_exhausted',
+                        'not enough order book info to calculate trade quantity, consider increasing the limit')
         return quote_bought
 
     @staticmethod
@@ -433,7 +810,8 @@ class TriangularArbitrageModel:
                 quote_to_sell -= bid_total
 
         if quote_to_sell > 0.0:
-            print('Not enough order book info to calculate trade quantity. Consider increasing the limit parameter.')
+            log.warning('order_book_exhausted',
+                        'not enough order book info to calculate trade quantity, consider increasing the limit')
         return base_bought
 
     @staticmethod
@@ -1,5 +1,4 @@
 import requests
-import pandas as pd
 import os
 
 
@@ -8,6 +7,12 @@ stella_secret_key = os.environ.get('STELLA_SECRET_KEY')
 
 _base_endpoint = 'https://api.binance.com'
 
+
+def set_base_endpoint(base_endpoint):
+    # point every request at another server, e.g. the local mock server
+    global _base_endpoint
+    _base_endpoint = base_endpoint
+
 # GENERAL ENDPOINTS ################################
 
 
@@ -0,0 +1,10 @@
+"""Microbenchmarks for the trading hot paths
+
+Run a benchmark from the repository root, e.g. ``python -m benchmarks.signing``
+
+``python -m benchmarks.hotpaths --output results.json`` runs the fill, depth cache,
+decode, market data and truncate (quantiser) suites on the pinned fixtures in
+``benchmarks.fixtures`` and writes throughput and percentiles as JSON, pass
+``--compare`` an earlier results file to see the change.
+
+"""
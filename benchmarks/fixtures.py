@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding=utf-8
+# pinned synthetic market data for the benchmarks
+# every fixture comes from random.Random(FIXTURE_SEED) and only uses random(), whose sequence is stable
+# across Python versions, so two runs on different machines benchmark exactly the same inputs
+# bump FIXTURE_VERSION whenever a generator changes, results are only comparable within one version
+
+import json
+import random
+
+FIXTURE_VERSION = 1
+FIXTURE_SEED = 20180114
+
+# symbol, mid price, price tick
+SYMBOLS = [('ETHUSDT', 1350.0, 0.01), ('ETHBTC', 0.098, 0.000001), ('BTCUSDT', 13800.0, 0.01)]
+
+
+def _rng(name):
+    # one independent, pinned stream per fixture so adding a fixture does not shift the others
+    return random.Random('%d:%s' % (FIXTURE_SEED, name))
+
+
+def _price(mid, tick, offset):
+    return '%.8f' % (round(mid / tick + offset) * tick)
+
+
+def order_book(symbol='ETHBTC', depth=100):
+    # REST depth response layout with depth levels per side, prices as strings
+    mid, tick = dict((s, (m, t)) for s, m, t in SYMBOLS)[symbol]
+    rng = _rng('order_book:%s:%d' % (symbol, depth))
+    bids = []
+    asks = []
+    for level in range(1, depth + 1):
+        bids.append([_price(mid, tick, -level), '%.8f' % (0.01 + rng.random() * 20.0), []])
+        asks.append([_price(mid, tick, level), '%.8f' % (0.01 + rng.random() * 20.0), []])
+    return {'lastUpdateId': 1, 'bids': bids, 'asks': asks}
+
+
+def depth_updates(symbol='ETHBTC', count=5000, depth=100):
+    # depthUpdate events against order_book(symbol, depth): size changes near the top of the book,
+    # levels removed and re added as the mid wanders, about 4 bids and 4 asks per event like the live stream
+    mid, tick = dict((s, (m, t)) for s, m, t in SYMBOLS)[symbol]
+    rng = _rng('depth_updates:%s:%d:%d' % (symbol, count, depth))
+    events = []
+    update_id = 1
+    for i in range(count):
+        bids = []
+        asks = []
+        for side in (bids, asks):
+            sign = -1 if side is bids else 1
+            for _ in range(4):
+                level = 1 + int(rng.random() * rng.random() * depth)
+                qty = '0.00000000' if rng.random() < 0.2 else '%.8f' % (0.01 + rng.random() * 20.0)
+                side.append([_price(mid, tick, sign * level), qty, []])
+        events.append({'e': 'depthUpdate', 'E': 1515900000000 + i * 100, 's': symbol,
+                       'U': update_id + 1, 'u': update_id + 8, 'b': bids, 'a': asks})
+        update_id += 8
+    return events
+
+
+def depth_update_payloads(count=5000, combined=False):
+    # the depth events as websocket payload bytes, combined=True wraps them like /stream?streams=
+    payloads = []
+    for event in depth_updates(count=count):
+        if combined:
+            event = {'stream': event['s'].lower() + '@depth', 'data': event}
+        payloads.append(json.dumps(event, separators=(',', ':')).encode('utf-8'))
+    return payloads
+
+
+def book_tickers(count=300):
+    # allBookTickers response with the triangle's symbols spread through count symbols
+    rng = _rng('book_tickers:%d' % count)
+    tickers = []
+    for i in range(count):
+        price = 0.0001 + rng.random() * 10.0
+        tickers.append({'symbol': 'SYM%03dBTC' % i, 'bidPrice': '%.8f' % price, 'bidQty': '%.8f' % (rng.random() * 100),
+                        'askPrice': '%.8f' % (price * 1.001), 'askQty': '%.8f' % (rng.random() * 100)})
+    for position, (symbol, mid, tick) in zip((count // 4, count // 2, count - 1), SYMBOLS):
+        tickers[position] = {'symbol': symbol, 'bidPrice': _price(mid, tick, -1), 'bidQty': '1.00000000',
+                             'askPrice': _price(mid, tick, 1), 'askQty': '1.00000000'}
+    return tickers
+
+
+def truncate_values(count=10000):
+    # floats across the magnitudes seen in quantities, including ones repr prints in exponent form
+    rng = _rng('truncate_values:%d' % count)
+    return [rng.random() * 10 ** int(rng.random() * 12 - 6) for _ in range(count)]
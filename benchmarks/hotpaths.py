@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# coding=utf-8
+# throughput and latency percentiles of the model's and depth cache's hot paths on pinned fixtures
+# run from the repository root:
+#   python -m benchmarks.hotpaths --output results.json
+#   python -m benchmarks.hotpaths --compare baseline.json
+# calls are timed in batches and each batch's mean per call time is recorded in a histogram in ns,
+# so the percentiles describe batch means rather than single calls for the sub microsecond paths
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+from binance.client import Client
+from binance.depthcache import DepthCache
+from binance.latency import LatencyHistogram
+from binance.log import WARNING, set_level
+
+from benchmarks import fixtures
+
+RESULT_VERSION = 1
+
+
+class Benchmark(object):
+
+    def __init__(self, name, func, items, batch=100, params=None):
+        # func is called once per item, items are cycled until the run is long enough
+        self.name = name
+        self.func = func
+        self.items = items
+        self.batch = batch
+        self.params = params or {}
+
+    def run(self, min_time=1.0, warmup=0.2):
+        histogram = LatencyHistogram()
+        func = self.func
+        batch = self.batch
+        # repeat the items so any batch can be sliced without wrapping
+        items = self.items * (batch // len(self.items) + 2)
+        perf_counter = time.perf_counter
+        position = 0
+        calls = 0
+        measured = 0.0
+        deadline = perf_counter() + warmup
+        recording = False
+        while True:
+            if not recording and perf_counter() >= deadline:
+                recording = True
+                deadline = perf_counter() + min_time
+            elif recording and perf_counter() >= deadline:
+                break
+            chunk = items[position:position + batch]
+            position = (position + batch) % len(self.items)
+            start = perf_counter()
+            for item in chunk:
+                func(item)
+            elapsed = perf_counter() - start
+            if recording:
+                histogram.record(elapsed * 1e9 / batch)
+                calls += batch
+                measured += elapsed
+
+        summary = histogram.summary()
+        result = {'name': self.name, 'params': self.params, 'calls': calls, 'batch': batch,
+                  'ops_per_sec': calls / measured if measured else None}
+        for key in ('min', 'mean', 'p50', 'p90', 'p99', 'max'):
+            result[key + '_ns'] = summary[key]
+        return result
+
+
+def _model():
+    # offline model on the fixture books, imported here so the suites without it do not load the model
+    from TriangularArbitrageModel import TriangularArbitrageModel
+
+    model = TriangularArbitrageModel('USDT', 'ETH', 'BTC', client=Client(None, None, ping=False),
+                                     exchange_info={'symbols': []})
+    return model
+
+
+def _fill_benchmarks():
+    from TriangularArbitrageModel import TriangularArbitrageModel
+
+    benchmarks = []
+    for depth in (5, 20, 100):
+        book = fixtures.order_book('ETHBTC', depth)
+        # walk about half of the book so the loop cost scales with depth
+        ask_total = sum(float(price) * float(qty) for price, qty, _ in book['asks'][:max(depth // 2, 1)])
+        bid_total = sum(float(price) * float(qty) for price, qty, _ in book['bids'][:max(depth // 2, 1)])
+        benchmarks.append(Benchmark('quote_amount_from_sell_base',
+                                    lambda amount, book=book: TriangularArbitrageModel._get_quote_amount_from_sell_base(
+                                        book, amount),
+                                    [ask_total], params={'depth': depth}))
+        benchmarks.append(Benchmark('base_amount_from_sell_quote',
+                                    lambda amount, book=book: TriangularArbitrageModel._get_base_amount_from_sell_quote(
+                                        book, amount),
+                                    [bid_total], params={'depth': depth}))
+    return benchmarks
+
+
+def _depth_cache_benchmarks():
+    benchmarks = []
+    for depth in (20, 100):
+        book = fixtures.order_book('ETHBTC', depth)
+        events = fixtures.depth_updates('ETHBTC', 5000, depth)
+        depth_cache = DepthCache('ETHBTC')
+        for bid in book['bids']:
+            depth_cache.add_bid(bid)
+        for ask in book['asks']:
+            depth_cache.add_ask(ask)
+
+        def apply(msg, depth_cache=depth_cache):
+            # the per event work of DepthCacheManager._depth_event
+            for bid in msg['b']:
+                depth_cache.add_bid(bid)
+            for ask in msg['a']:
+                depth_cache.add_ask(ask)
+
+        def apply_and_sort(msg, depth_cache=depth_cache):
+            apply(msg)
+            depth_cache.get_bids()
+            depth_cache.get_asks()
+
+        benchmarks.append(Benchmark('depth_cache_apply', apply, events, params={'depth': depth}))
+        benchmarks.append(Benchmark('depth_cache_apply_sort', apply_and_sort, events, batch=10,
+                                    params={'depth': depth}))
+        benchmarks.append(Benchmark('depth_cache_sort_depth',
+                                    lambda reverse, depth_cache=depth_cache: DepthCache.sort_depth(
+                                        depth_cache._bids, reverse),
+                                    [True, False], batch=10, params={'depth': depth}))
+    return benchmarks
+
+
+def _decode_benchmarks():
+    benchmarks = []
+    for combined in (False, True):
+        # the decode step of BinanceClientProtocol.onMessage
+        benchmarks.append(Benchmark('ws_decode', lambda payload: json.loads(payload.decode('utf8')),
+                                    fixtures.depth_update_payloads(5000, combined),
+                                    params={'combined': combined}))
+    return benchmarks
+
+
+def _market_data_benchmarks():
+    model = _model()
+    tickers = fixtures.book_tickers(300)
+    payload = json.dumps(tickers).encode('utf-8')
+    return [
+        Benchmark('parse_market_data', model.parse_market_data, [tickers], batch=10, params={'symbols': 300}),
+        Benchmark('parse_market_data_decode', lambda body: model.parse_market_data(json.loads(body.decode('utf-8'))),
+                  [payload], batch=10, params={'symbols': 300}),
+    ]
+
+
+def _truncate_benchmarks():
+    from TriangularArbitrageModel import truncate
+    from binance.rules import Quantiser, SymbolQuantiser
+
+    values = fixtures.truncate_values()
+    quantiser = SymbolQuantiser(Quantiser('0.00000100', '9000000.00000000', '0.00000100'),
+                                Quantiser('0.00000100', '100000.00000000', '0.00000100'), Decimal('0.001'))
+    # candidate quantities and prices validated a batch at a time, the same values as the scalar paths
+    candidates = [(values[i:i + 100], values[i + 1:i + 101]) for i in range(0, len(values) - 101, 100)]
+    return [
+        Benchmark('truncate', lambda value: truncate(value, 6), values, params={'n': 6}),
+        Benchmark('quantise', quantiser.quantity, values, params={'step': '0.000001'}),
+        Benchmark('validate_batch', lambda candidate: quantiser.validate_batch(*candidate), candidates, batch=10,
+                  params={'step': '0.000001', 'candidates': 100}),
+    ]
+
+
+SUITES = {
+    'fill': _fill_benchmarks,
+    'depth_cache': _depth_cache_benchmarks,
+    'decode': _decode_benchmarks,
+    'market_data': _market_data_benchmarks,
+    'truncate': _truncate_benchmarks,
+}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suites(names=None, min_time=1.0):
+    # run the named suites, all by default, and return the machine readable report
+    set_level(WARNING)
+    results = []
+    for name in names or sorted(SUITES):
+        for benchmark in SUITES[name]():
+            result = benchmark.run(min_time)
+            result['suite'] = name
+            results.append(result)
+            sys.stderr.write('%-28s %-18s %12.0f ops/s  p50 %8s ns  p99 %8s ns\n' % (
+                benchmark.name, ','.join('%s=%s' % item for item in sorted(benchmark.params.items())),
+                result['ops_per_sec'], result['p50_ns'], result['p99_ns']))
+    return {
+        'version': RESULT_VERSION,
+        'fixture_version': fixtures.FIXTURE_VERSION,
+        'revision': _git_revision(),
+        'timestamp': int(time.time()),
+        'python': platform.python_implementation() + ' ' + platform.python_version(),
+        'platform': platform.platform(),
+        'min_time': min_time,
+        'results': results,
+    }
+
+
+def _key(result):
+    return result['name'], tuple(sorted(result['params'].items()))
+
+
+def compare(report, baseline):
+    # p50 ratio of every benchmark present in both reports, above 1.0 means slower than the baseline
+    if report['fixture_version'] != baseline['fixture_version']:
+        raise ValueError('fixture version %s can not be compared with %s' % (report['fixture_version'],
+                                                                             baseline['fixture_version']))
+    baseline_results = dict((_key(result), result) for result in baseline['results'])
+    rows = []
+    for result in report['results']:
+        previous = baseline_results.get(_key(result))
+        if previous and previous['p50_ns']:
+            rows.append((result['name'], result['params'], result['p50_ns'] / float(previous['p50_ns'])))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the model and depth cache hot paths')
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES), help='suites to run, default all')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to measure each benchmark')
+    parser.add_argument('--output', default=None, help='json file for the results, default stdout')
+    parser.add_argument('--compare', default=None, help='json results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    report = run_suites(args.suite, args.min_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for name, params, ratio in compare(report, baseline):
+            sys.stderr.write('%-28s %-18s %6.2fx p50 vs baseline\n' % (
+                name, ','.join('%s=%s' % item for item in sorted(params.items())), ratio))
+
+
+if __name__ == '__main__':
+    main()
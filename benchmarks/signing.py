@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# coding=utf-8
+# order build-and-sign latency: per-call HMAC keying vs the cached signer and order templates
+# run from the repository root: python -m benchmarks.signing
+
+import hashlib
+import hmac
+import time
+from urllib.parse import urlencode
+
+from binance.client import OrderTemplate
+from binance.enums import SIDE_BUY, ORDER_TYPE_MARKET
+
+API_SECRET = 'NhqPtmdSJYdKjVHjA7PZj4Mge3R5YNiP1e3UZjInClVN65XAbvqqM6A7H5fATj0j'
+ORDER_URI = 'https://api.binance.com/api/v3/order'
+ITERATIONS = 100000
+
+
+def build_order_uncached(quantity):
+    # the original path: build the params dict, re-key the HMAC and urlencode everything
+    data = {'symbol': 'ETHBTC', 'side': SIDE_BUY, 'type': ORDER_TYPE_MARKET,
+            'quantity': quantity, 'recvWindow': 10000, 'timestamp': int(time.time() * 1000)}
+    m = hmac.new(API_SECRET.encode('utf-8'), urlencode(data).encode('utf-8'), hashlib.sha256)
+    data['signature'] = m.hexdigest()
+    params = [(key, value) for key, value in data.items() if key != 'signature']
+    params.append(('signature', data['signature']))
+    return params
+
+
+def build_order_cached_signer(signer, quantity):
+    # same parameters, but copying the keyed HMAC state
+    data = {'symbol': 'ETHBTC', 'side': SIDE_BUY, 'type': ORDER_TYPE_MARKET,
+            'quantity': quantity, 'recvWindow': 10000, 'timestamp': int(time.time() * 1000)}
+    m = signer.copy()
+    m.update(urlencode(data).encode('utf-8'))
+    data['signature'] = m.hexdigest()
+    params = [(key, value) for key, value in data.items() if key != 'signature']
+    params.append(('signature', data['signature']))
+    return params
+
+
+def time_per_call(func, *args):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(*args)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    signer = hmac.new(API_SECRET.encode('utf-8'), digestmod=hashlib.sha256)
+    template = OrderTemplate(signer, ORDER_URI, 'ETHBTC', SIDE_BUY, ORDER_TYPE_MARKET, recvWindow=10000)
+
+    results = [
+        ('uncached', time_per_call(build_order_uncached, '1.234')),
+        ('cached_signer', time_per_call(build_order_cached_signer, signer, '1.234')),
+        ('order_template', time_per_call(template.build, '1.234')),
+    ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print('%-16s %8.3f us/order  %5.2fx' % (name, seconds * 1e6, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
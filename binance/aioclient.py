@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from .client import Client, OrderTemplate
+from .exceptions import BinanceAPIException, BinanceRequestException, BinanceWithdrawException
+from .latency import tracer
+from .log import get_logger
+
+log = get_logger('aioclient')
+
+
+class _AsyncResponse(object):
+
+    def __init__(self, status, headers, text):
+        """Read aiohttp response with the requests.Response attributes the client and exceptions use
+
+        :param status: HTTP status code
+        :type status: int
+        :param headers: response headers
+        :param text: response body
+        :type text: str
+
+        """
+        self.status_code = status
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncClient(Client):
+
+    def __init__(self, api_key, api_secret, base_url=None, limit=100, timeout=10):
+        """Binance API Client on asyncio
+
+        Same methods as Client, every API call is a coroutine, e.g.
+
+        .. code-block:: python
+
+            client = AsyncClient(api_key, api_secret)
+            depth = await client.get_order_book(symbol='ETHBTC')
+            await client.close()
+
+        Requests share one pooled aiohttp session, so fanning out over many symbols
+        or sending several order legs at once with asyncio.gather costs in flight
+        requests instead of threads. The session is created on the first request,
+        inside the running event loop.
+
+        :param api_key: Api Key
+        :type api_key: str.
+        :param api_secret: Api Secret
+        :type api_secret: str.
+        :param base_url: scheme and host to use instead of the Binance servers, e.g. http://127.0.0.1:8080
+        :type base_url: str.
+        :param limit: most connections the session keeps open at once
+        :type limit: int.
+        :param timeout: total seconds allowed per request
+        :type timeout: float.
+
+        """
+        self._limit = limit
+        self._timeout = timeout
+        self._time_sync_task = None
+        super(AsyncClient, self).__init__(api_key, api_secret, ping=False, base_url=base_url)
+
+    def _init_session(self):
+        # aiohttp sessions belong to an event loop, see _get_session
+        return None
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            headers = {'Accept': 'application/json', 'User-Agent': 'binance/python'}
+            if self.API_KEY:
+                headers['X-MBX-APIKEY'] = self.API_KEY
+            self.session = aiohttp.ClientSession(headers=headers,
+                                                 connector=aiohttp.TCPConnector(limit=self._limit,
+                                                                                ttl_dns_cache=300),
+                                                 timeout=aiohttp.ClientTimeout(total=self._timeout))
+        return self.session
+
+    async def close(self):
+        """Close the session and stop the time sync
+
+        """
+        self.stop_time_sync()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _request(self, method, uri, signed, force_params=False, **kwargs):
+
+        data = kwargs.get('data', None)
+        if signed:
+            # generate signature
+            self._sign_data(kwargs['data'])
+
+        if data and (method == 'get' or force_params):
+            kwargs['params'] = self._order_params(kwargs['data'])
+            del(kwargs['data'])
+
+        async with self._get_session().request(method, uri, **kwargs) as response:
+            text = await response.text()
+            return self._handle_response(_AsyncResponse(response.status, response.headers, text))
+
+    async def get_order_books(self, symbols, **params):
+        """Get the order books of several symbols at once
+
+        :param symbols: required
+        :type symbols: list
+        :param params: get_order_book parameters for every symbol, e.g. limit
+
+        :returns: dict of symbol to get_order_book response
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        books = await asyncio.gather(*[self.get_order_book(symbol=symbol, **params) for symbol in symbols])
+        return dict(zip(symbols, books))
+
+    async def sync_server_time(self, samples=5):
+        """Estimate the offset between the server clock and the local clock, see Client.sync_server_time
+
+        :param samples: number of round trips to make, default 5
+        :type samples: int
+
+        :returns: the estimated offset in ms
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        best_rtt = None
+        offset = self.time_offset
+        for _ in range(samples):
+            sent = time.time() * 1000
+            server_time = (await self.get_server_time())['serverTime']
+            received = time.time() * 1000
+            rtt = received - sent
+            if best_rtt is None or rtt < best_rtt:
+                best_rtt = rtt
+                offset = server_time - (sent + received) / 2.0
+
+        self.time_offset = offset
+        self.time_offset_rtt = best_rtt
+        return offset
+
+    def start_time_sync(self, interval=60, samples=5):
+        """Refresh the server time offset in a task of the running event loop
+
+        :param interval: seconds between refreshes, default 60
+        :type interval: int
+        :param samples: number of round trips per refresh, default 5
+        :type samples: int
+
+        """
+        self.stop_time_sync()
+        self._time_sync_task = asyncio.ensure_future(self._refresh_time_offset(interval, samples))
+
+    async def _refresh_time_offset(self, interval, samples):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync_server_time(samples)
+            except (aiohttp.ClientError, asyncio.TimeoutError, BinanceAPIException, BinanceRequestException):
+                # keep the previous offset and try again at the next refresh
+                pass
+            except Exception as e:
+                log.error('time_sync_failed', 'unexpected error refreshing the server time offset',
+                          exception=repr(e))
+
+    def stop_time_sync(self):
+        """Stop refreshing the server time offset
+
+        """
+        if self._time_sync_task:
+            self._time_sync_task.cancel()
+            self._time_sync_task = None
+
+    async def create_template_order(self, template, quantity):
+        """Send in a new order built from an order template, see Client.create_template_order
+
+        :param template: template returned by order_template
+        :type template: OrderTemplate
+        :param quantity: required
+        :type quantity: str
+
+        :returns: API response, see create_order
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        start = tracer.start()
+        body = template.build(quantity, self.server_timestamp())
+        start = tracer.stop('sign', start)
+        async with self._get_session().post(template.uri, data=body,
+                                            headers={'Content-Type': OrderTemplate.CONTENT_TYPE}) as response:
+            text = await response.text()
+        tracer.stop('submit_ack', start)
+        return self._handle_response(_AsyncResponse(response.status, response.headers, text))
+
+    async def withdraw(self, **params):
+        """Submit a withdraw request, see Client.withdraw
+
+        :raises: BinanceResponseException, BinanceAPIException, BinanceWithdrawException
+
+        """
+        res = await self._request_withdraw_api('post', 'withdraw.html', True, data=params)
+        if not res['success']:
+            raise BinanceWithdrawException(res['msg'])
+        return res
+
+    async def stream_get_listen_key(self):
+        """Start a new user data stream and return the listen key, see Client.stream_get_listen_key
+
+        :returns: API response
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        res = await self._post('userDataStream', False, data={})
+        return res['listenKey']
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import asyncio
+import functools
+import ssl
+
+from autobahn.asyncio.websocket import WebSocketClientFactory, WebSocketClientProtocol
+
+from .log import get_logger
+from .streams import BaseSocketManager, dispatch_message, init_stream, stream_connected
+
+log = get_logger('aiowebsockets')
+
+
+class AsyncBinanceClientProtocol(WebSocketClientProtocol):
+
+    def onConnect(self, response):
+        # reset the delay after reconnecting
+        self.factory.delay = self.factory.initial_delay
+        stream_connected(self.factory)
+
+    def onMessage(self, payload, isBinary):
+        dispatch_message(self.factory, payload, isBinary)
+
+    def onClose(self, wasClean, code, reason):
+        if not self.factory.closed.done():
+            self.factory.closed.set_result(wasClean)
+
+
+class AsyncBinanceClientFactory(WebSocketClientFactory):
+
+    protocol = AsyncBinanceClientProtocol
+
+    # reconnect backoff in seconds, as for the Twisted BinanceReconnectingClientFactory
+    initial_delay = 0.1
+
+    max_delay = 10
+
+    max_retries = 5
+
+
+class AsyncBinanceSocketManager(BaseSocketManager):
+
+    def __init__(self, client, recorder=None, stream_url=None, loop=None):
+        """Initialise the AsyncBinanceSocketManager
+
+        Same start_*_socket API as BinanceSocketManager, but every socket runs as a
+        task in an asyncio event loop instead of on the Twisted reactor thread, so
+        callbacks run on the loop alongside anything else awaiting there. Callbacks
+        must not block, hand slow work to an executor or a binance.workqueue.WorkQueue.
+
+        Sockets start connecting as soon as they are started, there is no thread to
+        start. start_user_socket is a coroutine as it fetches the listen key.
+
+        :param client: Binance API client, REST calls of a synchronous client run in the loop's executor
+        :type client: binance.Client
+        :param recorder: optional recorder that receives every raw message
+        :type recorder: binance.recorder.MarketDataRecorder
+        :param stream_url: stream server to use instead of STREAM_URL, e.g. ws://127.0.0.1:9443/
+        :type stream_url: str
+        :param loop: event loop to run the sockets in, default the running loop
+        :type loop: asyncio.AbstractEventLoop
+
+        """
+        super(AsyncBinanceSocketManager, self).__init__(client, recorder, stream_url)
+        self._loop = loop
+        self._keepalive_task = None
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        return self._loop
+
+    def _start_socket(self, path, callback, prefix='ws/', connect_callback=None):
+        if path in self._conns:
+            return False
+
+        factory_url = self.STREAM_URL + prefix + path
+        factory = AsyncBinanceClientFactory(factory_url, loop=self.loop)
+        init_stream(factory, self._client, self._recorder, path, callback, connect_callback)
+        factory.delay = factory.initial_delay
+        factory.transport = None
+
+        task = self.loop.create_task(self._run_socket(factory))
+        self._conns[path] = (task, factory)
+        return path
+
+    async def _run_socket(self, factory):
+        # connect, wait for the connection to drop, then reconnect with backoff
+        # a cleanly closed socket is not reconnected
+        retries = 0
+        while True:
+            factory.closed = self.loop.create_future()
+            try:
+                factory.transport, _ = await self.loop.create_connection(
+                    factory, factory.host, factory.port,
+                    ssl=ssl.create_default_context() if factory.isSecure else None,
+                    server_hostname=factory.host if factory.isSecure else None)
+            except OSError as e:
+                log.warning('ws_connect_failed', stream=factory.stream, exception=repr(e))
+            else:
+                retries = 0
+                if await factory.closed:
+                    return
+            retries += 1
+            if retries > factory.max_retries:
+                log.error('ws_gave_up', 'stopped reconnecting', stream=factory.stream)
+                return
+            await asyncio.sleep(factory.delay)
+            factory.delay = min(factory.delay * 2, factory.max_delay)
+
+    async def _call_client(self, name, **params):
+        # await a coroutine client, run a synchronous client in the executor so the loop keeps going
+        method = getattr(self._client, name)
+        if asyncio.iscoroutinefunction(method):
+            return await method(**params)
+        return await self.loop.run_in_executor(None, functools.partial(method, **params))
+
+    async def start_user_socket(self, callback, connect_callback=None):
+        """Start a websocket for user data
+
+        https://www.binance.com/restapipub.html#user-wss-endpoint
+
+        :param callback: callback function to handle messages
+        :type callback: function
+        :param connect_callback: optional function called each time the socket connects or reconnects
+        :type connect_callback: function
+
+        :returns: connection key string if successful, False otherwise
+
+        Message Format - see Binance API docs for all types
+        """
+        if self._user_listen_key:
+            # cleanup any sockets with this key
+            for conn_key in self._conns:
+                if self._is_user_socket(conn_key):
+                    self._stop_connection(conn_key)
+                    break
+        self._user_listen_key = await self._call_client('stream_get_listen_key')
+        self._user_callback = callback
+        self._user_connect_callback = connect_callback
+        conn_key = self._start_socket(self._user_listen_key, callback, connect_callback=connect_callback)
+        if conn_key and self._keepalive_task is None:
+            # keep the socket alive
+            self._keepalive_task = self.loop.create_task(self._keepalive_user_socket())
+
+        return conn_key
+
+    async def _keepalive_user_socket(self):
+        while True:
+            await asyncio.sleep(self._user_timeout)
+            listen_key = await self._call_client('stream_get_listen_key')
+            # check if they key changed
+            if listen_key != self._user_listen_key:
+                await self.start_user_socket(self._user_callback, self._user_connect_callback)
+
+    def _stop_connection(self, conn_key):
+        task, factory = self._conns.pop(conn_key)
+        task.cancel()
+        if factory.transport is not None:
+            factory.transport.close()
+
+    def stop_socket(self, conn_key):
+        """Stop a websocket given the connection key
+
+        :param conn_key: Socket connection key
+        :type conn_key: string
+
+        """
+        if conn_key not in self._conns:
+            return
+
+        user_socket = self._is_user_socket(conn_key)
+        self._stop_connection(conn_key)
+
+        # check if we have a user stream socket
+        if user_socket:
+            self._stop_user_socket()
+
+    def _stop_user_socket(self):
+        if not self._user_listen_key:
+            return
+        # stop the keepalive
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        # close the stream
+        self.loop.create_task(self._call_client('stream_close', listenKey=self._user_listen_key))
+        self._user_listen_key = None
+
+    def close(self):
+        """Close all connections
+
+        """
+        keys = set(self._conns.keys())
+        for key in keys:
+            self.stop_socket(key)
+
+        self._conns = {}
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+
+from .metrics import registry
+from .recorder import RECORD_DEPTH_SNAPSHOT
+
+# where a requested book came from
+#   cache      a fetched book younger than the ttl
+#   coalesced  the result of a fetch another caller already had in flight
+#   fetched    a new depth request
+BOOK_REQUESTS = registry.counter('binance_book_provider_requests_total', 'Order books served by the book provider',
+                                 ['source'])
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.book = None
+        self.error = None
+
+
+class CoalescingBookProvider(object):
+
+    def __init__(self, client, ttl=0.1, limit=100, recorder=None):
+        """Intialise the CoalescingBookProvider
+
+        Order book source shared by every model trading a symbol. Concurrent
+        requests for a symbol wait on one depth request and all get its result,
+        and a book younger than the ttl is served without a request at all, so
+        BTCUSDT is fetched once per cycle however many triangles use it.
+
+        Books are shared between callers and must not be modified.
+
+        :param client: Binance API client
+        :type client: binance.Client
+        :param ttl: seconds a fetched book is served from the cache, 0 to only coalesce concurrent requests
+        :type ttl: float
+        :param limit: depth levels to request
+        :type limit: int
+        :param recorder: optional recorder for the fetched snapshots
+        :type recorder: binance.recorder.MarketDataRecorder
+
+        """
+        self.client = client
+        self.ttl = ttl
+        self.limit = limit
+        self.recorder = recorder
+        self._books = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._cached = BOOK_REQUESTS.labels('cache')
+        self._coalesced = BOOK_REQUESTS.labels('coalesced')
+        self._fetched = BOOK_REQUESTS.labels('fetched')
+
+    def get_order_book(self, symbol):
+        """Get the order book of a symbol, see get_order_books
+
+        :param symbol: required
+        :type symbol: str
+
+        :return: get_order_book API response
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        return self.get_order_books([symbol])[0]
+
+    def get_order_books(self, symbols):
+        """Get the order books of several symbols, fetching the stale ones in parallel
+
+        :param symbols: required
+        :type symbols: list
+
+        :return: list of get_order_book API responses in the order of symbols
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        now = time.monotonic()
+        books = {}
+        flights = {}
+        leading = []
+        with self._lock:
+            for symbol in symbols:
+                cached = self._books.get(symbol)
+                if cached is not None and now - cached[0] < self.ttl:
+                    books[symbol] = cached[1]
+                    self._cached.inc()
+                    continue
+                flight = self._flights.get(symbol)
+                if flight is None:
+                    flight = self._flights[symbol] = _Flight()
+                    leading.append(symbol)
+                    self._fetched.inc()
+                else:
+                    self._coalesced.inc()
+                flights[symbol] = flight
+
+        # this thread makes the first request itself while a thread per symbol makes the rest,
+        # a thread is cheap next to the request
+        for symbol in leading[1:]:
+            thread = threading.Thread(target=self._fetch, args=(symbol, flights[symbol]))
+            thread.daemon = True
+            thread.start()
+        if leading:
+            self._fetch(leading[0], flights[leading[0]])
+
+        for symbol, flight in flights.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            books[symbol] = flight.book
+        return [books[symbol] for symbol in symbols]
+
+    def _fetch(self, symbol, flight):
+        # the book is at least as fresh as the moment it was requested
+        requested = time.monotonic()
+        try:
+            flight.book = self.client.get_order_book(symbol=symbol, limit=self.limit)
+            if self.recorder is not None:
+                self.recorder.record_json(RECORD_DEPTH_SNAPSHOT, flight.book, symbol)
+        except Exception as e:
+            # every caller waiting on the flight gets the error
+            flight.error = e
+        finally:
+            with self._lock:
+                if flight.book is not None:
+                    self._books[symbol] = (requested, flight.book)
+                del self._flights[symbol]
+            flight.done.set()
+
+    def invalidate(self, symbol=None):
+        """Drop a cached book so the next request fetches it
+
+        :param symbol: symbol to drop, None drops every book
+        :type symbol: str
+
+        """
+        with self._lock:
+            if symbol is None:
+                self._books.clear()
+            else:
+                self._books.pop(symbol, None)
@@ -5,15 +5,77 @@ import hashlib
 import hmac
 import requests
 import six
+import threading
 import time
 from .exceptions import BinanceAPIException, BinanceRequestException, BinanceWithdrawException
 from .enums import TIME_IN_FORCE_GTC, SIDE_BUY, SIDE_SELL, ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from .hedging import request_weight
+from .latency import tracer
+from .log import get_logger
+from .metrics import registry
 
 if six.PY2:
     from urllib import urlencode
 elif six.PY3:
     from urllib.parse import urlencode
 
+log = get_logger('client')
+
+REST_USED_WEIGHT = registry.gauge('binance_rest_used_weight', 'Request weight used in the current minute')
+REST_RESPONSES = registry.counter('binance_rest_responses_total', 'REST responses received', ['status'])
+
+
+class OrderTemplate(object):
+
+    CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+    def __init__(self, signer, uri, symbol, side, order_type=ORDER_TYPE_MARKET, **params):
+        """Prebuilt signed order request for a fixed symbol, side and type
+
+        The static part of the query string is encoded once and fed into a copy of
+        the keyed HMAC state, so building an order only encodes and signs the
+        quantity and timestamp.
+
+        :param signer: keyed HMAC state for the API secret
+        :type signer: hmac.HMAC
+        :param uri: order endpoint uri
+        :type uri: str
+        :param symbol: required
+        :type symbol: str
+        :param side: required
+        :type side: enum
+        :param order_type: default ORDER_TYPE_MARKET
+        :type order_type: enum
+        :param params: any other static order parameters, e.g. recvWindow
+
+        """
+        self.uri = uri
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        fields = [('symbol', symbol), ('side', side), ('type', order_type)] + list(params.items())
+        self._prefix = urlencode(fields)
+        self._signer = signer.copy()
+        self._signer.update(self._prefix.encode('utf-8'))
+
+    def build(self, quantity, timestamp=None):
+        """Build the signed request body for an order of the given quantity
+
+        :param quantity: order quantity, already rounded to the symbol step size
+        :type quantity: str
+        :param timestamp: request timestamp in ms, defaults to the local clock
+        :type timestamp: int
+
+        :returns: url encoded request body including the signature
+
+        """
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        suffix = '&quantity=%s&timestamp=%d' % (quantity, timestamp)
+        m = self._signer.copy()
+        m.update(suffix.encode('utf-8'))
+        return self._prefix + suffix + '&signature=' + m.hexdigest()
+
 
 class Client(object):
 
@@ -28,22 +90,50 @@ class Client(object):
     ORDER_RESP_TYPE_RESULT = 'RESULT'
     ORDER_RESP_TYPE_FULL = 'FULL'
 
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, ping=True, base_url=None, hedge_policy=None):
         """Binance API Client constructor
 
         :param api_key: Api Key
         :type api_key: str.
         :param api_secret: Api Secret
         :type api_secret: str.
+        :param ping: ping the API on construction, False for offline use
+        :type ping: bool.
+        :param base_url: scheme and host to use instead of the Binance servers, e.g. http://127.0.0.1:8080
+        :type base_url: str.
+        :param hedge_policy: optional policy sending slow depth, bookTicker and time requests twice
+        :type hedge_policy: binance.hedging.HedgePolicy
 
         """
 
         self.API_KEY = api_key
         self.API_SECRET = api_secret
+        if base_url:
+            self.API_URL = base_url + '/api'
+            self.WITHDRAW_API_URL = base_url + '/wapi'
+            self.WEBSITE_URL = base_url
         self.session = self._init_session()
 
+        # keyed HMAC state, copied for each signature instead of re-keying every call
+        self._hmac = None
+        if api_secret:
+            self._hmac = hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)
+        self._order_templates = {}
+
+        # estimated server clock minus local clock in ms, see sync_server_time
+        self.time_offset = 0
+        self.time_offset_rtt = None
+        self._time_sync_timer = None
+
+        # request weight used this minute, from the X-MBX-USED-WEIGHT header plus the hedges sent since
+        self.hedge_policy = hedge_policy
+        self.used_weight = 0
+        self._used_weight_minute = None
+        self._weight_lock = threading.Lock()
+
         # init DNS and SSL cert
-        self.ping()
+        if ping:
+            self.ping()
 
     def _init_session(self):
 
@@ -66,7 +156,8 @@ class Client(object):
     def _generate_signature(self, data):
 
         query_string = urlencode(data)
-        m = hmac.new(self.API_SECRET.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256)
+        m = self._hmac.copy()
+        m.update(query_string.encode('utf-8'))
         return m.hexdigest()
 
     def _order_params(self, data):
@@ -87,6 +178,17 @@ class Client(object):
             params.append(('signature', data['signature']))
         return params
 
+    def _sign_data(self, data):
+        """Stamp the request data with the current timestamp and its signature
+
+        :param data: request parameters, updated in place
+        :return: the signed data
+
+        """
+        data['timestamp'] = self.server_timestamp()
+        data['signature'] = self._generate_signature(data)
+        return data
+
     def _request(self, method, uri, signed, force_params=False, **kwargs):
 
         data = kwargs.get('data', None)
@@ -94,8 +196,7 @@ class Client(object):
             kwargs['data'] = data
         if signed:
             # generate signature
-            kwargs['data']['timestamp'] = int(time.time() * 1000)
-            kwargs['data']['signature'] = self._generate_signature(kwargs['data'])
+            self._sign_data(kwargs['data'])
 
         if data and (method == 'get' or force_params):
             kwargs['params'] = self._order_params(kwargs['data'])
@@ -107,8 +208,37 @@ class Client(object):
     def _request_api(self, method, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         uri = self._create_api_uri(path, signed, version)
 
+        if method == 'get' and not signed and self.hedge_policy is not None and self.hedge_policy.hedges(path):
+            return self._request_hedged(path, uri, **kwargs)
         return self._request(method, uri, signed, **kwargs)
 
+    def _request_hedged(self, path, uri, **kwargs):
+        if kwargs.get('data'):
+            kwargs['params'] = self._order_params(kwargs.pop('data'))
+        weight = request_weight(path, kwargs.get('params'))
+
+        def send():
+            return self.session.get(uri, **kwargs)
+
+        response = self.hedge_policy.run(path, weight, send, self._reserve_weight)
+        return self._handle_response(response)
+
+    def _reserve_weight(self, weight, max_weight):
+        """Count weight against this minute's budget ahead of the response reporting it
+
+        :return: False, without counting it, if the weight would take the minute past max_weight
+
+        """
+        with self._weight_lock:
+            minute = int(time.time() // 60)
+            if minute != self._used_weight_minute:
+                self.used_weight = 0
+                self._used_weight_minute = minute
+            if self.used_weight + weight > max_weight:
+                return False
+            self.used_weight += weight
+            return True
+
     def _request_withdraw_api(self, method, path, signed=False, **kwargs):
         uri = self._create_withdraw_api_uri(path)
 
@@ -125,6 +255,7 @@ class Client(object):
         Raises the appropriate exceptions when necessary; otherwise, returns the
         response.
         """
+        self._update_used_weight(response)
         if not str(response.status_code).startswith('2'):
             raise BinanceAPIException(response)
         try:
@@ -132,6 +263,16 @@ class Client(object):
         except ValueError:
             raise BinanceRequestException('Invalid Response: %s' % response.text)
 
+    def _update_used_weight(self, response):
+        """Update the REST metrics and used weight from the response status and used weight header"""
+        REST_RESPONSES.labels(response.status_code).inc()
+        weight = response.headers.get('X-MBX-USED-WEIGHT')
+        if weight is not None:
+            with self._weight_lock:
+                self.used_weight = int(weight)
+                self._used_weight_minute = int(time.time() // 60)
+            REST_USED_WEIGHT.set(self.used_weight)
+
     def _get(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         return self._request_api('get', path, signed, version, **kwargs)
 
@@ -260,6 +401,83 @@ class Client(object):
         """
         return self._get('time')
 
+    def server_timestamp(self):
+        """Current time in ms on the server clock, estimated from the local clock
+
+        :returns: int timestamp corrected by the tracked time offset
+
+        """
+        return int(time.time() * 1000 + self.time_offset)
+
+    def sync_server_time(self, samples=5):
+        """Estimate the offset between the server clock and the local clock
+
+        Makes several get_server_time round trips and keeps the one with the
+        shortest round trip time, assuming the server stamped its time halfway
+        through it. The offset is applied to the timestamp of every signed request.
+
+        :param samples: number of round trips to make, default 5
+        :type samples: int
+
+        :returns: the estimated offset in ms
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        best_rtt = None
+        offset = self.time_offset
+        for _ in range(samples):
+            sent = time.time() * 1000
+            server_time = self.get_server_time()['serverTime']
+            received = time.time() * 1000
+            rtt = received - sent
+            if best_rtt is None or rtt < best_rtt:
+                best_rtt = rtt
+                offset = server_time - (sent + received) / 2.0
+
+        self.time_offset = offset
+        self.time_offset_rtt = best_rtt
+        return offset
+
+    def start_time_sync(self, interval=60, samples=5, delay=None):
+        """Refresh the server time offset in the background
+
+        :param interval: seconds between refreshes, default 60
+        :type interval: int
+        :param samples: number of round trips per refresh, default 5
+        :type samples: int
+        :param delay: seconds until the first refresh, default interval, 0 to sync now without blocking
+        :type delay: float
+
+        """
+        self.stop_time_sync()
+        if delay is None:
+            delay = interval
+        self._time_sync_timer = threading.Timer(delay, self._refresh_time_offset, (interval, samples))
+        self._time_sync_timer.daemon = True
+        self._time_sync_timer.start()
+
+    def _refresh_time_offset(self, interval, samples):
+        try:
+            self.sync_server_time(samples)
+        except (requests.exceptions.RequestException, BinanceAPIException, BinanceRequestException):
+            # keep the previous offset and try again at the next refresh
+            pass
+        except Exception as e:
+            log.error('time_sync_failed', 'unexpected error refreshing the server time offset', exception=repr(e))
+        finally:
+            # whatever happened the offset keeps being refreshed, unless stop_time_sync was called meanwhile
+            if self._time_sync_timer is not None:
+                self.start_time_sync(interval, samples)
+
+    def stop_time_sync(self):
+        """Stop refreshing the server time offset
+
+        """
+        if self._time_sync_timer:
+            self._time_sync_timer.cancel()
+            self._time_sync_timer = None
+
     # Market Data Endpoints
 
     def get_all_tickers(self):
@@ -756,6 +974,50 @@ class Client(object):
         """
         return self._post('order', True, data=params)
 
+    def order_template(self, symbol, side, type=ORDER_TYPE_MARKET, **params):
+        """Get the prebuilt order template for a symbol, side and order type
+
+        Templates are built once per distinct set of static parameters and cached
+        on the client.
+
+        :param symbol: required
+        :type symbol: str
+        :param side: required
+        :type side: enum
+        :param type: default ORDER_TYPE_MARKET
+        :type type: enum
+        :param params: any other static order parameters, e.g. recvWindow
+
+        :returns: OrderTemplate
+
+        """
+        key = (symbol, side, type, tuple(params.items()))
+        template = self._order_templates.get(key)
+        if template is None:
+            template = OrderTemplate(self._hmac, self._create_api_uri('order', True), symbol, side, type, **params)
+            self._order_templates[key] = template
+        return template
+
+    def create_template_order(self, template, quantity):
+        """Send in a new order built from an order template
+
+        :param template: template returned by order_template
+        :type template: OrderTemplate
+        :param quantity: required
+        :type quantity: str
+
+        :returns: API response, see create_order
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        start = tracer.start()
+        body = template.build(quantity, self.server_timestamp())
+        start = tracer.stop('sign', start)
+        response = self.session.post(template.uri, data=body, headers={'Content-Type': OrderTemplate.CONTENT_TYPE})
+        tracer.stop('submit_ack', start)
+        return self._handle_response(response)
+
     def order_limit(self, timeInForce=TIME_IN_FORCE_GTC, **params):
         """Send in a new limit order
 
@@ -1,10 +1,32 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import weakref
 from operator import itemgetter
 
+from .latency import tracer
+from .log import get_logger
+from .metrics import registry
+from .recorder import RECORD_DEPTH_SNAPSHOT
 from .websockets import BinanceSocketManager
 
+log = get_logger('depthcache')
+
+DEPTH_CACHE_LEVELS = registry.gauge('binance_depth_cache_levels', 'Price levels held in the depth cache',
+                                    ['symbol', 'side'])
+
+
+def _levels_function(depth_cache_manager, side):
+    # a weak reference, so the metrics registry does not keep the manager alive
+    depth_cache_manager = weakref.ref(depth_cache_manager)
+
+    def levels():
+        manager = depth_cache_manager()
+        if manager is None:
+            return 0
+        return len(manager._depth_cache._bids if side == 'bids' else manager._depth_cache._asks)
+    return levels
+
 
 class DepthCache(object):
 
@@ -18,6 +40,8 @@ class DepthCache(object):
         self._symbol = symbol
         self._bids = {}
         self._asks = {}
+        # lastUpdateId of the snapshot or u of the last depth event applied
+        self.update_id = 0
 
     def add_bid(self, bid):
         """Add a bid to the cache
@@ -107,6 +131,18 @@ class DepthCache(object):
         """
         return DepthCache.sort_depth(self._asks, reverse=False)
 
+    def copy(self):
+        """Get a copy of the cache that later updates do not change
+
+        :return: DepthCache object
+
+        """
+        depth_cache = DepthCache(self._symbol)
+        depth_cache._bids = self._bids.copy()
+        depth_cache._asks = self._asks.copy()
+        depth_cache.update_id = self.update_id
+        return depth_cache
+
     @staticmethod
     def sort_depth(vals, reverse=False):
         """Sort bids or asks by price
@@ -118,7 +154,7 @@ class DepthCache(object):
 
 class DepthCacheManager(object):
 
-    def __init__(self, client, symbol, callback):
+    def __init__(self, client, symbol, callback, recorder=None, start=True, stream_url=None, work_queue=None):
         """Intialise the DepthCacheManager
 
         :param client: Binance API client
@@ -127,22 +163,58 @@ class DepthCacheManager(object):
         :type symbol: string
         :param callback: Function to receive depth cache updates
         :type callback: function
+        :param recorder: optional recorder for the snapshot and depth events
+        :type recorder: binance.recorder.MarketDataRecorder
+        :param start: fetch the snapshot and start the socket, False to feed the manager yourself
+            with apply_snapshot and depth events, e.g. when replaying a recording
+        :type start: bool
+        :param stream_url: stream server to use instead of the Binance one
+        :type stream_url: str
+        :param work_queue: run the callback on a worker with a copy of the cache instead of on the reactor
+            thread, keyed by symbol so a coalescing queue only keeps the latest book
+        :type work_queue: binance.workqueue.WorkQueue
 
         """
         self._client = client
         self._symbol = symbol
         self._callback = callback
+        self._recorder = recorder
+        self._stream_url = stream_url
+        self._work_queue = work_queue
         self._first_update_id = 0
         self._bm = None
         self._depth_cache = DepthCache(self._symbol)
 
-        self._init_cache()
-        self._start_socket()
+        # sizes are only read when the metrics are scraped
+        self._levels_functions = {}
+        for side in ('bids', 'asks'):
+            self._levels_functions[side] = _levels_function(self, side)
+            DEPTH_CACHE_LEVELS.labels(symbol, side).set_function(self._levels_functions[side])
+
+        if start:
+            self._init_cache()
+            self._start_socket()
 
     def _init_cache(self):
         res = self._client.get_order_book(symbol=self._symbol, limit=10)
+        if self._recorder:
+            # under the depth stream's name, a replay tells it from the REST snapshots a model polls by symbol
+            self._recorder.record_json(RECORD_DEPTH_SNAPSHOT, res, '%s@depth' % self._symbol.lower())
+        self.apply_snapshot(res)
+
+        log.info('depth_cache_init', symbol=self._symbol, last_update_id=self._first_update_id,
+                 bids=len(res['bids']), asks=len(res['asks']))
 
+    def apply_snapshot(self, res):
+        """Reset the cache from an order book snapshot
+
+        :param res: get_order_book response
+        :type res: dict
+
+        """
+        self._depth_cache = DepthCache(self._symbol)
         self._first_update_id = res['lastUpdateId']
+        self._depth_cache.update_id = res['lastUpdateId']
 
         for bid in res['bids']:
             self._depth_cache.add_bid(bid)
@@ -150,7 +222,7 @@ class DepthCacheManager(object):
             self._depth_cache.add_ask(ask)
 
     def _start_socket(self):
-        self._bm = BinanceSocketManager(self._client)
+        self._bm = BinanceSocketManager(self._client, self._recorder, self._stream_url)
 
         self._bm.start_depth_socket(self._symbol, self._depth_event)
 
@@ -165,16 +237,24 @@ class DepthCacheManager(object):
         """
         # ignore any updates before the initial update id
         if msg['u'] <= self._first_update_id:
+            log.debug('depth_event_skipped', symbol=self._symbol, update_id=msg['u'])
             return
 
         # add any bid or ask values
+        start = tracer.start()
         for bid in msg['b']:
             self._depth_cache.add_bid(bid)
         for ask in msg['a']:
             self._depth_cache.add_ask(ask)
+        self._depth_cache.update_id = msg['u']
+        tracer.stop('book_apply', start)
 
         # call the callback with the updated depth cache
-        self._callback(self._depth_cache)
+        if self._work_queue is not None:
+            # the reactor keeps updating the live cache while the worker reads the copy
+            self._work_queue.put(self._symbol, self._callback, self._depth_cache.copy())
+        else:
+            self._callback(self._depth_cache)
 
     def get_depth_cache(self):
         """Get the current depth cache
@@ -189,4 +269,10 @@ class DepthCacheManager(object):
 
         :return:
         """
-        self._bm.close()
+        if self._bm:
+            self._bm.close()
+        for side, function in self._levels_functions.items():
+            # a newer manager for the symbol may have taken the gauge over
+            if DEPTH_CACHE_LEVELS.labels(self._symbol, side).function is function:
+                DEPTH_CACHE_LEVELS.remove(self._symbol, side)
+        self._levels_functions = {}
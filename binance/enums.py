@@ -44,3 +44,7 @@ WEBSOCKET_DEPTH_1 = '1'
 WEBSOCKET_DEPTH_5 = '5'
 WEBSOCKET_DEPTH_10 = '10'
 WEBSOCKET_DEPTH_20 = '20'
+
+FILTER_TYPE_PRICE_FILTER = 'PRICE_FILTER'
+FILTER_TYPE_LOT_SIZE = 'LOT_SIZE'
+FILTER_TYPE_MIN_NOTIONAL = 'MIN_NOTIONAL'
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import heapq
+import itertools
+import threading
+import time
+
+from .latency import LatencyHistogram
+from .log import get_logger
+from .metrics import registry
+
+log = get_logger('hedging')
+
+# idempotent GETs that may be sent twice, the market data the model waits on
+HEDGEABLE_PATHS = ('depth', 'ticker/bookTicker', 'ticker/allBookTickers', 'time')
+
+REST_HEDGES = registry.counter('binance_rest_hedges_total', 'Duplicate GETs sent after the hedge delay', ['path'])
+REST_HEDGE_WINS = registry.counter('binance_rest_hedge_wins_total', 'Hedged GETs answered by the duplicate first',
+                                   ['path'])
+REST_HEDGES_SKIPPED = registry.counter('binance_rest_hedges_skipped_total',
+                                       'Hedges not sent as they would exceed the weight budget', ['path'])
+# attempt is primary for the first request's own latency and effective for the first response of the two,
+# the gap between their p99s is what hedging saves
+REST_HEDGED_LATENCY = registry.histogram('binance_rest_hedged_get_seconds', 'Latency of hedgeable GETs',
+                                         ['path', 'attempt'])
+
+
+def request_weight(path, params=None):
+    """Get the request weight of a hedgeable GET
+
+    :param path: API path, e.g. depth
+    :type path: str
+    :param params: request parameters
+    :type params: dict or list of (key, value)
+
+    :return: int
+
+    """
+    params = dict(params or ())
+    if path == 'depth':
+        limit = int(params.get('limit', 100))
+        if limit <= 100:
+            return 1
+        if limit <= 500:
+            return 5
+        if limit <= 1000:
+            return 10
+        return 50
+    if path == 'ticker/allBookTickers' or (path == 'ticker/bookTicker' and 'symbol' not in params):
+        return 2
+    return 1
+
+
+class _Race(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        # the primary is pending from the start
+        self.pending = 1
+        self.response = None
+        self.error = None
+        self.hedged = False
+        self.skipped = False
+        self.hedge_won = False
+
+
+class _HedgeTimer(object):
+
+    def __init__(self):
+        # one thread for the hedge delays of every request in flight, started on first use
+        self._condition = threading.Condition()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._thread = None
+
+    def schedule(self, when, function):
+        with self._condition:
+            heapq.heappush(self._heap, (when, next(self._sequence), function))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                when, _, function = self._heap[0]
+                timeout = when - time.perf_counter()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+                heapq.heappop(self._heap)
+            try:
+                function()
+            except Exception as e:
+                log.error('hedge_failed', 'Could not start a hedge', error=repr(e))
+
+
+class HedgePolicy(object):
+
+    def __init__(self, percentile=95, initial_delay=0.05, min_delay=0.002, max_delay=1.0, min_samples=50,
+                 window=1000, max_weight=960, paths=HEDGEABLE_PATHS):
+        """Intialise the HedgePolicy
+
+        Hedged requests for a Client, see Client(hedge_policy=). A GET on one of
+        the paths that has not answered within the percentile of its recent
+        latencies is sent a second time and the first response wins, trading a
+        little extra weight for the tail latency of the straggler.
+
+        The primary is sent on the calling thread, which returns once it is back,
+        with the hedge's response if that came first or the primary failed. A
+        single timer thread watches the delays and only starts a thread for a
+        request that needs hedging.
+
+        Each hedge costs the weight of the request, it is only sent while the
+        weight used this minute plus the hedge stays within max_weight, so
+        hedging can never be what gets the client rate limited.
+
+        :param percentile: latency percentile after which a request is hedged
+        :type percentile: float
+        :param initial_delay: seconds to wait until a path has min_samples latencies
+        :type initial_delay: float
+        :param min_delay: shortest hedge delay in seconds
+        :type min_delay: float
+        :param max_delay: longest hedge delay in seconds
+        :type max_delay: float
+        :param min_samples: latencies needed before the percentile is used
+        :type min_samples: int
+        :param window: latencies per path after which the percentile starts over, so it follows the network
+        :type window: int
+        :param max_weight: most request weight per minute hedges may take the client to, 80% of 1200 by default
+        :type max_weight: int
+        :param paths: paths to hedge, a subset of HEDGEABLE_PATHS
+        :type paths: tuple
+
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.max_weight = max_weight
+        self.paths = frozenset(paths)
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._delays = {}
+        self._stats = {}
+        self._timer = _HedgeTimer()
+
+    def hedges(self, path):
+        return path in self.paths
+
+    def _path_stats(self, path):
+        stats = self._stats.get(path)
+        if stats is None:
+            stats = self._stats[path] = {
+                'requests': 0,
+                'hedges': 0,
+                'wins': 0,
+                'skipped': 0,
+                'primary': LatencyHistogram(),
+                'effective': LatencyHistogram(),
+            }
+            self._windows[path] = LatencyHistogram()
+        return stats
+
+    def delay(self, path):
+        """Get the seconds to wait before hedging a request
+
+        :param path: API path
+        :type path: str
+
+        :return: float
+
+        """
+        with self._lock:
+            window = self._windows.get(path)
+            if window is not None and window.count >= self.min_samples:
+                delay = window.percentile(self.percentile) / 1e6
+            else:
+                delay = self._delays.get(path, self.initial_delay)
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def _record(self, path, attempt, seconds):
+        REST_HEDGED_LATENCY.labels(path, attempt).observe(seconds)
+        with self._lock:
+            self._path_stats(path)[attempt].record(seconds * 1e6)
+            if attempt == 'primary':
+                window = self._windows[path]
+                window.record(seconds * 1e6)
+                if window.count >= self.window:
+                    # keep the last percentile until the new window has enough samples
+                    self._delays[path] = window.percentile(self.percentile) / 1e6
+                    window.reset()
+
+    def run(self, path, weight, send, reserve_weight):
+        """Send a request, hedging it if it is slow
+
+        :param path: API path, for the delay and the metrics
+        :type path: str
+        :param weight: request weight of one attempt
+        :type weight: int
+        :param send: function sending the request and returning the response
+        :type send: function
+        :param reserve_weight: function(weight, max_weight) counting the weight of a hedge against the budget,
+            returning False when it does not fit
+        :type reserve_weight: function
+
+        :return: the first response
+
+        :raises: the error of the last attempt if none of them got a response
+
+        """
+        race = _Race()
+        start = time.perf_counter()
+        self._timer.schedule(start + self.delay(path),
+                             lambda: self._start_hedge(path, weight, race, send, reserve_weight))
+        # the primary runs on the calling thread, a thread is only started once a hedge is due
+        self._attempt(path, race, send, start, False)
+        race.done.wait()
+        self._record(path, 'effective', time.perf_counter() - start)
+
+        with race.lock:
+            hedged = race.hedged
+            skipped = race.skipped
+        with self._lock:
+            stats = self._path_stats(path)
+            stats['requests'] += 1
+            stats['hedges'] += hedged
+            stats['wins'] += race.hedge_won
+            stats['skipped'] += skipped
+        if race.hedge_won:
+            REST_HEDGE_WINS.labels(path).inc()
+        if race.error is not None:
+            raise race.error
+        return race.response
+
+    def _start_hedge(self, path, weight, race, send, reserve_weight):
+        with race.lock:
+            # the race is done once the primary answered, or failed with no hedge in flight
+            if race.done.is_set():
+                return
+            if not reserve_weight(weight, self.max_weight):
+                race.skipped = True
+                REST_HEDGES_SKIPPED.labels(path).inc()
+                return
+            race.hedged = True
+            race.pending += 1
+        REST_HEDGES.labels(path).inc()
+        thread = threading.Thread(target=self._attempt, args=(path, race, send, time.perf_counter(), True))
+        thread.daemon = True
+        thread.start()
+
+    def _attempt(self, path, race, send, start, hedge):
+        response = error = None
+        try:
+            response = send()
+        except Exception as e:
+            error = e
+        if not hedge:
+            # the primary's own latency, also when the hedge beat it, drives the delay
+            self._record(path, 'primary', time.perf_counter() - start)
+        with race.lock:
+            race.pending -= 1
+            if race.done.is_set():
+                return
+            # an error only counts once no other attempt can still answer
+            if error is None or not race.pending:
+                race.response = response
+                race.error = error
+                race.hedge_won = hedge
+                race.done.set()
+
+    def report(self):
+        """Get the hedging statistics of every path
+
+        :return: dict of path to statistics, latencies in microseconds
+
+        .. code-block:: python
+
+            {
+                'depth': {
+                    'requests': 1520,
+                    'hedges': 81,
+                    'hedge_rate': 0.053,
+                    'wins': 64,
+                    'skipped': 0,
+                    'delay': 0.042,
+                    'primary_p99': 180000,
+                    'effective_p99': 61000,
+                    'p99_improvement': 119000
+                }
+            }
+
+        """
+        report = {}
+        with self._lock:
+            paths = list(self._stats)
+        for path in paths:
+            delay = self.delay(path)
+            with self._lock:
+                stats = self._stats[path]
+                primary_p99 = stats['primary'].percentile(99)
+                effective_p99 = stats['effective'].percentile(99)
+                report[path] = {
+                    'requests': stats['requests'],
+                    'hedges': stats['hedges'],
+                    'hedge_rate': stats['hedges'] / float(stats['requests']) if stats['requests'] else 0.0,
+                    'wins': stats['wins'],
+                    'skipped': stats['skipped'],
+                    'delay': delay,
+                    'primary_p99': primary_p99,
+                    'effective_p99': effective_p99,
+                    'p99_improvement': (primary_p99 - effective_p99
+                                        if primary_p99 is not None and effective_p99 is not None else None),
+                }
+        return report
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import os
+import threading
+import time
+
+from .log import get_logger
+
+log = get_logger('infocache')
+
+# bump when the layout of the cache file or what is read from exchangeInfo changes,
+# older caches are then ignored and fetched again
+CACHE_VERSION = 1
+
+
+class ExchangeInfoCache(object):
+
+    def __init__(self, path, client, max_age=86400):
+        """Intialise the ExchangeInfoCache
+
+        exchangeInfo kept on disk, so a restarted process reads the symbol
+        filters from a file instead of waiting on the largest response of the
+        API. A cached copy is used straight away and revalidated against the
+        API in the background.
+
+        :param path: cache file
+        :type path: str
+        :param client: Binance API client, its API_URL is part of the cache key
+        :type client: binance.Client
+        :param max_age: seconds after which the cache is fetched again before it is used
+        :type max_age: int
+
+        """
+        self.path = os.path.expanduser(path)
+        self.client = client
+        self.max_age = max_age
+        self._thread = None
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if cached.get('version') != CACHE_VERSION or cached.get('api_url') != self.client.API_URL:
+            return None
+        return cached
+
+    def _write(self, exchange_info):
+        # write a temporary file and rename it over the cache, readers never see half a file
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'api_url': self.client.API_URL, 'fetched': time.time(),
+                       'exchange_info': exchange_info}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def fetch(self):
+        """Download exchangeInfo and write it to the cache
+
+        :return: exchangeInfo
+
+        :raises: BinanceResponseException, BinanceAPIException
+
+        """
+        exchange_info = self.client.get_exchange_info()
+        try:
+            self._write(exchange_info)
+        except (IOError, OSError) as e:
+            log.warning('exchange_info_cache_write_failed', path=self.path, exception=repr(e))
+        return exchange_info
+
+    def load(self, on_update=None):
+        """Get exchangeInfo, from the cache when it is fresh enough
+
+        :param on_update: function called with the exchangeInfo to use, first with the returned one on
+            this thread, before the background revalidation starts so it can never overwrite a newer one,
+            then from the revalidation thread with the new exchangeInfo if it changed
+        :type on_update: function
+
+        :return: exchangeInfo
+
+        :raises: BinanceResponseException, BinanceAPIException when there is no usable cache
+
+        """
+        cached = self._read()
+        if cached is None or time.time() - cached['fetched'] > self.max_age:
+            exchange_info = self.fetch()
+            if on_update is not None:
+                on_update(exchange_info)
+            return exchange_info
+        exchange_info = cached['exchange_info']
+        if on_update is not None:
+            on_update(exchange_info)
+        self._thread = threading.Thread(target=self._revalidate, args=(exchange_info, on_update),
+                                        name='exchange-info-revalidate')
+        self._thread.daemon = True
+        self._thread.start()
+        return exchange_info
+
+    def _revalidate(self, cached, on_update):
+        try:
+            exchange_info = self.fetch()
+        except Exception as e:
+            # keep trading on the cached filters, the next start tries again
+            log.warning('exchange_info_revalidate_failed', exception=repr(e))
+            return
+        if exchange_info.get('symbols') != cached.get('symbols'):
+            log.info('exchange_info_changed', path=self.path)
+            if on_update is not None:
+                on_update(exchange_info)
+
+    def wait(self, timeout=None):
+        """Wait for the background revalidation to finish
+
+        :param timeout: seconds to wait
+        :type timeout: float
+
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import sys
+import threading
+import time
+
+
+class LatencyHistogram(object):
+
+    def __init__(self, significant_bits=7):
+        """Intialise the LatencyHistogram
+
+        HDR style histogram of integer microsecond values. Values below
+        2 ** significant_bits get their own bucket, larger values fall into
+        power of two ranges that are each split into 2 ** (significant_bits - 1)
+        linear sub buckets, so every recorded value keeps the same relative
+        precision (under 2% with the default 7 bits) at constant memory.
+
+        :param significant_bits: bits of precision kept for each value
+        :type significant_bits: int
+
+        """
+        self._bits = significant_bits
+        self._sub_bucket_count = 1 << significant_bits
+        self._half_count = self._sub_bucket_count >> 1
+        self._counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._bits
+        return self._sub_bucket_count + (shift - 1) * self._half_count + (value >> shift) - self._half_count
+
+    def _value(self, index):
+        # midpoint of the values that map to the bucket
+        if index < self._sub_bucket_count:
+            return index
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        lowest = (offset % self._half_count + self._half_count) << shift
+        return lowest + ((1 << shift) >> 1)
+
+    def record(self, value):
+        """Record a latency
+
+        :param value: latency in microseconds
+        :type value: int
+
+        """
+        value = max(int(value), 0)
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percentile):
+        """Get the value at a percentile
+
+        :param percentile: percentile between 0 and 100
+        :type percentile: float
+
+        :return: latency in microseconds, None if nothing was recorded
+
+        """
+        if not self.count:
+            return None
+        target = max(1, int(round(self.count * percentile / 100.0)))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / float(self.count)
+
+    def reset(self):
+        self._counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def copy(self):
+        histogram = LatencyHistogram(self._bits)
+        histogram._counts = dict(self._counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.min = self.min
+        histogram.max = self.max
+        return histogram
+
+    def summary(self):
+        """Get the histogram summary
+
+        :return: dict of statistics in microseconds
+
+        .. code-block:: python
+
+            {
+                'count': 1520,
+                'min': 41,
+                'mean': 63.2,
+                'p50': 58,
+                'p90': 81,
+                'p99': 169,
+                'p999': 402,
+                'max': 433
+            }
+
+        """
+        return {
+            'count': self.count,
+            'min': self.min,
+            'mean': self.mean(),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max,
+        }
+
+
+class LatencyTracer(object):
+
+    # stages in tick to trade order
+    STAGES = ('ws_receive', 'json_decode', 'book_fetch', 'book_apply', 'fill_simulation', 'decision',
+              'sign', 'submit_ack')
+
+    def __init__(self, enabled=True):
+        """Intialise the LatencyTracer
+
+        Aggregates monotonic clock spans into one LatencyHistogram per stage.
+        Spans may be recorded from any thread.
+
+        :param enabled: record spans, default True
+        :type enabled: bool
+
+        """
+        self.enabled = enabled
+        self._histograms = {}
+        # the reactor, worker and calling threads all record into the same histograms
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def start():
+        """Start a span
+
+        :return: monotonic start time to pass to stop
+
+        """
+        return time.perf_counter()
+
+    def stop(self, stage, start):
+        """Finish a span and record its duration
+
+        :param stage: stage name, see STAGES
+        :type stage: str
+        :param start: value returned by start
+        :type start: float
+
+        :return: monotonic stop time, so consecutive stages can be chained
+
+        """
+        now = time.perf_counter()
+        if self.enabled:
+            self.record(stage, now - start)
+        return now
+
+    def record(self, stage, seconds):
+        """Record a duration for a stage
+
+        :param stage: stage name, see STAGES
+        :type stage: str
+        :param seconds: duration in seconds
+        :type seconds: float
+
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(seconds * 1e6)
+
+    def record_event_time(self, stage, event_time, received_time, clock_offset=0):
+        """Record the delay between an exchange event time and its local receipt
+
+        :param stage: stage name, see STAGES
+        :type stage: str
+        :param event_time: exchange event time ``E`` in ms
+        :type event_time: int
+        :param received_time: local wall clock receive time in seconds
+        :type received_time: float
+        :param clock_offset: server minus local clock offset in ms, see Client.sync_server_time
+        :type clock_offset: float
+
+        """
+        if self.enabled:
+            self.record(stage, (received_time * 1000 + clock_offset - event_time) / 1000.0)
+
+    def get_histogram(self, stage):
+        """Get the histogram of a stage
+
+        :return: copy of the LatencyHistogram or None if the stage has no spans
+
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            return histogram.copy() if histogram is not None else None
+
+    def report(self):
+        """Get the summary of every stage with recorded spans
+
+        :return: dict of stage to LatencyHistogram.summary()
+
+        """
+        with self._lock:
+            stages = [stage for stage in self.STAGES if stage in self._histograms]
+            stages += sorted(stage for stage in self._histograms if stage not in self.STAGES)
+            return dict((stage, self._histograms[stage].summary()) for stage in stages)
+
+    def dump(self, stream=None):
+        """Write the report as a table of microsecond latencies
+
+        :param stream: file like object, default sys.stdout
+
+        """
+        stream = stream or sys.stdout
+        stream.write('%-16s %8s %8s %8s %8s %8s %8s\n' % ('stage', 'count', 'p50', 'p90', 'p99', 'p999', 'max'))
+        for stage, summary in self.report().items():
+            stream.write('%-16s %8d %8d %8d %8d %8d %8d\n' % (stage, summary['count'], summary['p50'], summary['p90'],
+                                                             summary['p99'], summary['p999'], summary['max']))
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+# process wide tracer shared by the socket, depth cache, client and model
+tracer = LatencyTracer()
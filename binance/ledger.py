@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+from collections import OrderedDict
+
+from .enums import ORDER_STATUS_CANCELED, ORDER_STATUS_EXPIRED, ORDER_STATUS_FILLED, ORDER_STATUS_REJECTED
+from .websockets import BinanceSocketManager
+
+# orders in these states get no more events
+FINAL_ORDER_STATUSES = frozenset((ORDER_STATUS_FILLED, ORDER_STATUS_CANCELED, ORDER_STATUS_REJECTED,
+                                  ORDER_STATUS_EXPIRED))
+
+
+class AccountLedger(object):
+
+    def __init__(self, order_retention=300):
+        """Intialise the AccountLedger
+
+        Holds the account balances and the state of orders seen on the user data stream.
+
+        :param order_retention: seconds a filled, canceled, rejected or expired order is kept
+        :type order_retention: float
+
+        """
+        self.order_retention = order_retention
+        self._balances = {}
+        self._updated = {}
+        self._orders = {}
+        # order id to the time it reached a final status, oldest first
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_balance(self, asset, free, locked=0.0):
+        """Set the balance of an asset, e.g. from a user data stream event
+
+        :param asset: asset name e.g. BTC
+        :type asset: str
+        :param free: free balance
+        :type free: float
+        :param locked: balance locked in open orders
+        :type locked: float
+
+        """
+        with self._lock:
+            self._balances[asset] = (float(free), float(locked))
+            self._updated[asset] = time.monotonic()
+
+    def apply_snapshot(self, balances, sent):
+        """Set the balances from a get_account response
+
+        A balance the stream updated after the request was sent is newer than the
+        snapshot's and is kept.
+
+        :param balances: balances of a get_account response
+        :type balances: list
+        :param sent: time.monotonic() when the request was sent
+        :type sent: float
+
+        :return: assets that were kept
+
+        """
+        kept = []
+        with self._lock:
+            for balance in balances:
+                asset = balance['asset']
+                if self._updated.get(asset, sent) > sent:
+                    kept.append(asset)
+                    continue
+                self._balances[asset] = (float(balance['free']), float(balance['locked']))
+                self._updated[asset] = sent
+        return kept
+
+    def get_balance(self, asset):
+        """Get the free balance of an asset
+
+        :param asset: asset name e.g. BTC
+        :type asset: str
+
+        :return: free balance as a float, 0.0 for unknown assets
+
+        """
+        return self._balances.get(asset, (0.0, 0.0))[0]
+
+    def get_locked(self, asset):
+        """Get the balance of an asset locked in open orders
+
+        :param asset: asset name e.g. BTC
+        :type asset: str
+
+        :return: locked balance as a float, 0.0 for unknown assets
+
+        """
+        return self._balances.get(asset, (0.0, 0.0))[1]
+
+    def get_balances(self):
+        """Get all balances
+
+        :return: dict of asset to (free, locked) tuples
+
+        """
+        return dict(self._balances)
+
+    def update_order(self, msg):
+        """Update the order state from an executionReport event
+
+        :param msg: executionReport message from the user data stream
+
+        """
+        order_id = msg['i']
+        now = time.monotonic()
+        self._orders[order_id] = {
+            'symbol': msg['s'],
+            'clientOrderId': msg['c'],
+            'side': msg['S'],
+            'type': msg['o'],
+            'status': msg['X'],
+            'origQty': float(msg['q']),
+            'executedQty': float(msg['z']),
+            'lastPrice': float(msg['L']),
+            'commission': float(msg['n']),
+            'commissionAsset': msg['N'],
+            'time': msg['E'],
+        }
+        self._finished.pop(order_id, None)
+        if msg['X'] in FINAL_ORDER_STATUSES:
+            self._finished[order_id] = now
+
+        # forget orders that finished more than order_retention ago
+        while self._finished:
+            order_id, finished = next(iter(self._finished.items()))
+            if now - finished < self.order_retention:
+                break
+            del self._finished[order_id]
+            del self._orders[order_id]
+
+    def get_order(self, order_id):
+        """Get the last known state of an order
+
+        :param order_id: exchange order id
+        :type order_id: int
+
+        :return: order dict or None if the order has not been seen or finished more than order_retention ago
+
+        .. code-block:: python
+
+            {
+                'symbol': 'ETHBTC',
+                'clientOrderId': 'mUvoqJxFIILMdfAW5iGSOW',
+                'side': 'BUY',
+                'type': 'MARKET',
+                'status': 'FILLED',
+                'origQty': 1.0,
+                'executedQty': 1.0,
+                'lastPrice': 0.10264410,
+                'commission': 0.001,
+                'commissionAsset': 'ETH',
+                'time': 1499405658658
+            }
+
+        """
+        return self._orders.get(order_id)
+
+
+class AccountLedgerManager(object):
+
+    def __init__(self, client, callback=None, recv_window=None, stream_url=None):
+        """Intialise the AccountLedgerManager
+
+        Opens the user data stream, then loads the balances with one REST call once
+        it connects. Stream events are held until the balances are loaded. REST is
+        only used again after the stream reconnects.
+
+        :param client: Binance API client
+        :type client: binance.Client
+        :param callback: Optional function to receive ledger updates
+        :type callback: function
+        :param recv_window: recvWindow for the reconciling get_account call
+        :type recv_window: int
+        :param stream_url: stream server to use instead of the Binance one
+        :type stream_url: str
+
+        """
+        self._client = client
+        self._callback = callback
+        self._recv_window = recv_window
+        self._stream_url = stream_url
+        self._bm = None
+        self._ledger = AccountLedger()
+        # (time.monotonic() received, msg) of the events before the first reconcile, None once it is done
+        self._buffered = []
+        self._buffer_lock = threading.Lock()
+        self._ready = threading.Event()
+
+        self._start_socket()
+
+    def reconcile(self):
+        """Replace the ledger balances with the balances from the REST API, see AccountLedger.apply_snapshot
+
+        :return: time.monotonic() when the request was sent
+
+        """
+        params = {}
+        if self._recv_window:
+            params['recvWindow'] = self._recv_window
+        # stream events that arrive while the request is in flight are newer than its balances
+        sent = time.monotonic()
+        info = self._client.get_account(**params)
+        self._ledger.apply_snapshot(info['balances'], sent)
+        return sent
+
+    def _start_socket(self):
+        self._bm = BinanceSocketManager(self._client, stream_url=self._stream_url)
+
+        self._bm.start_user_socket(self._user_event, connect_callback=self._user_connect)
+
+        self._bm.start()
+
+    def _user_connect(self):
+        # the first connect loads the balances, a reconnect picks up the events sent while the
+        # socket was down, either way reconcile off the reactor thread
+        thread = threading.Thread(target=self._reconcile_connect)
+        thread.daemon = True
+        thread.start()
+
+    def _reconcile_connect(self):
+        sent = self.reconcile()
+        with self._buffer_lock:
+            buffered, self._buffered = self._buffered, None
+            if buffered is None:
+                return
+            # balances received before the request was sent are already in the snapshot
+            for received, msg in buffered:
+                if received > sent or msg.get('e') == 'executionReport':
+                    self._apply_event(msg)
+        self._ready.set()
+
+    def _user_event(self, msg):
+        """
+
+        :param msg:
+        :return:
+
+        """
+        with self._buffer_lock:
+            if self._buffered is not None:
+                self._buffered.append((time.monotonic(), msg))
+                return
+            self._apply_event(msg)
+
+    def _apply_event(self, msg):
+        event_type = msg.get('e')
+        if event_type in ('outboundAccountInfo', 'outboundAccountPosition'):
+            for balance in msg['B']:
+                self._ledger.set_balance(balance['a'], balance['f'], balance['l'])
+        elif event_type == 'executionReport':
+            self._ledger.update_order(msg)
+        else:
+            return
+
+        if self._callback:
+            self._callback(self._ledger)
+
+    def wait_ready(self, timeout=None):
+        """Wait for the first reconcile to load the balances
+
+        :param timeout: seconds to wait, default forever
+        :type timeout: float
+
+        :return: True once the balances are loaded, False on timeout
+
+        """
+        return self._ready.wait(timeout)
+
+    def get_ledger(self):
+        """Get the current account ledger
+
+        :return: AccountLedger object
+
+        """
+        return self._ledger
+
+    def close(self):
+        """Close the open socket for this manager
+
+        :return:
+        """
+        self._bm.close()
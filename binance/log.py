@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import atexit
+import os
+import sys
+import threading
+import time
+
+from six.moves import queue
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+class LogWriter(threading.Thread):
+
+    def __init__(self, stream=None, max_queue_size=10000):
+        """Intialise the LogWriter
+
+        Background thread that formats and writes log records. Records are handed
+        over through a bounded queue, when it is full new records are dropped and
+        counted instead of blocking the caller.
+
+        :param stream: file like object, default sys.stdout
+        :param max_queue_size: default 10000
+        :type max_queue_size: int
+
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._stream = stream
+        self._queue = queue.Queue(max_queue_size)
+        self.dropped = 0
+
+    def put(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                self._queue.task_done()
+                return
+            stream = self._stream or sys.stdout
+            try:
+                stream.write(self._format(record))
+                # batch the flush when records are queued back to back
+                if self._queue.empty():
+                    stream.flush()
+            except Exception:  # pragma: no cover
+                # a bad record must not kill the writer
+                pass
+            self._queue.task_done()
+
+    @staticmethod
+    def _format(record):
+        created, level, name, event, msg, args, fields = record
+        line = '%s.%03d %s %s %s' % (time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(created)),
+                                     int(created * 1000) % 1000, _LEVEL_NAMES.get(level, level), name, event)
+        if msg:
+            line += ' ' + (msg % args if args else msg)
+        if fields:
+            line += ' ' + ' '.join('%s=%s' % (key, value) for key, value in sorted(fields.items()))
+        return line + '\n'
+
+    def flush(self):
+        """Block until every queued record has been written
+
+        """
+        if self.is_alive():
+            self._queue.join()
+
+    def close(self):
+        if self.is_alive():
+            self._queue.put(None)
+            self.join()
+
+
+class StructuredLogger(object):
+
+    def __init__(self, name, writer, level=INFO):
+        """Intialise the StructuredLogger
+
+        Records are an event name, an optional printf style message and key=value
+        fields. Nothing is formatted on the calling thread and records below the
+        logger level are discarded before any work is done.
+
+        :param name: logger name, written with every record
+        :type name: str
+        :param writer: background writer shared by all loggers
+        :type writer: LogWriter
+        :param level: minimum level to write, default INFO
+        :type level: int
+
+        """
+        self.name = name
+        self.level = level
+        self._writer = writer
+        self._sample_counts = {}
+
+    def is_enabled_for(self, level):
+        return level >= self.level
+
+    def log(self, level, event, msg=None, *args, **fields):
+        if level < self.level:
+            return
+        self._writer.put((time.time(), level, self.name, event, msg, args, fields))
+
+    def debug(self, event, msg=None, *args, **fields):
+        if DEBUG >= self.level:
+            self._writer.put((time.time(), DEBUG, self.name, event, msg, args, fields))
+
+    def info(self, event, msg=None, *args, **fields):
+        if INFO >= self.level:
+            self._writer.put((time.time(), INFO, self.name, event, msg, args, fields))
+
+    def warning(self, event, msg=None, *args, **fields):
+        if WARNING >= self.level:
+            self._writer.put((time.time(), WARNING, self.name, event, msg, args, fields))
+
+    def error(self, event, msg=None, *args, **fields):
+        if ERROR >= self.level:
+            self._writer.put((time.time(), ERROR, self.name, event, msg, args, fields))
+
+    def sampled(self, level, event, every, msg=None, *args, **fields):
+        """Log only one in every n records of a high frequency event
+
+        The written record carries a sampled=n field.
+
+        :param every: write the first record and then every n-th one
+        :type every: int
+
+        """
+        if level < self.level:
+            return
+        count = self._sample_counts.get(event, 0)
+        self._sample_counts[event] = count + 1
+        if count % every == 0:
+            fields['sampled'] = every
+            self._writer.put((time.time(), level, self.name, event, msg, args, fields))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_loggers = {}
+
+
+def get_writer():
+    """Get the process wide LogWriter, starting it on first use
+
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter()
+                _writer.start()
+                # write out whatever is queued when the process exits
+                atexit.register(_writer.close)
+    return _writer
+
+
+def _restart_writer():
+    # a forked child has the writer but not its thread, e.g. sharding and sweep workers
+    global _writer, _writer_lock
+    if _writer is None:
+        return
+    # the parent's lock and queue may have been held mid fork
+    _writer = None
+    _writer_lock = threading.Lock()
+    writer = get_writer()
+    for logger in _loggers.values():
+        logger._writer = writer
+    # multiprocessing children leave through os._exit, which skips atexit, and clear the
+    # finalizers registered before they start, so the finalizer is added once they have
+    from multiprocessing import util
+    util.register_after_fork(writer, _close_at_exit)
+
+
+def _close_at_exit(writer):
+    from multiprocessing import util
+    util.Finalize(writer, writer.close, exitpriority=0)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_writer)
+
+
+def get_logger(name, level=INFO):
+    """Get a named StructuredLogger writing through the shared LogWriter
+
+    :param name: logger name
+    :type name: str
+    :param level: minimum level for a new logger, default INFO
+    :type level: int
+
+    :return: StructuredLogger
+
+    """
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, StructuredLogger(name, get_writer(), level))
+    return logger
+
+
+def set_level(level):
+    """Set the level of every logger
+
+    """
+    for logger in _loggers.values():
+        logger.level = level
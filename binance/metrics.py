@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+from bisect import bisect_left
+
+import six
+
+if six.PY2:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+elif six.PY3:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, str(value).replace('"', '\\"')) for name, value in pairs) + '}'
+
+
+class _CounterValue(object):
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        return ['%s%s %s' % (name, labels, self.value)]
+
+
+class _GaugeValue(object):
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Compute the value only when the metrics are scraped
+
+        :param function: function returning the current value
+        :type function: function
+
+        """
+        self.function = function
+
+    def samples(self, name, labels):
+        value = self.function() if self.function else self.value
+        return ['%s%s %s' % (name, labels, value)]
+
+
+class _HistogramValue(object):
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self._counts[bisect_left(self._buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labelnames, labelvalues):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self._buckets) + ['+Inf'], self._counts):
+            cumulative += count
+            labels = _format_labels(labelnames, labelvalues, [('le', bound)])
+            lines.append('%s_bucket%s %s' % (name, labels, cumulative))
+        labels = _format_labels(labelnames, labelvalues)
+        lines.append('%s_sum%s %s' % (name, labels, self.sum))
+        lines.append('%s_count%s %s' % (name, labels, self.count))
+        return lines
+
+
+class _Metric(object):
+
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *labelvalues):
+        """Get the child metric for a set of label values
+
+        Callers on hot paths should keep the returned child rather than look it up per update.
+
+        """
+        value = self._values.get(labelvalues)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(labelvalues, self._new_value())
+        return value
+
+    def remove(self, *labelvalues):
+        """Stop exposing the child metric for a set of label values, e.g. once what it measures is closed"""
+        with self._lock:
+            self._values.pop(labelvalues, None)
+
+    def expose(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation), '# TYPE %s %s' % (self.name, self.metric_type)]
+        for labelvalues, value in list(self._values.items()):
+            lines.extend(self._samples(value, labelvalues))
+        return lines
+
+    def _samples(self, value, labelvalues):
+        return value.samples(self.name, _format_labels(self.labelnames, labelvalues))
+
+
+class Counter(_Metric):
+
+    metric_type = 'counter'
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+
+    metric_type = 'gauge'
+
+    def _new_value(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Histogram(_Metric):
+
+    metric_type = 'histogram'
+
+    # seconds, from sub millisecond book updates to multi second REST calls
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+
+    def _new_value(self):
+        return _HistogramValue(self._buckets)
+
+    def _samples(self, value, labelvalues):
+        return value.samples(self.name, self.labelnames, labelvalues)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class MetricsRegistry(object):
+
+    def __init__(self):
+        """Intialise the MetricsRegistry
+
+        Metrics are plain in-process values, nothing is formatted until the
+        text endpoint is scraped.
+
+        """
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self):
+        """Render every metric in the Prometheus text exposition format
+
+        :return: str
+
+        """
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].expose())
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port=9108, addr='127.0.0.1'):
+        """Serve the metrics on http://addr:port/metrics from a daemon thread
+
+        :param port: default 9108
+        :type port: int
+        :param addr: default 127.0.0.1, local scrapers only
+        :type addr: str
+
+        :return: the HTTPServer
+
+        """
+        if self._server is None:
+            self._server = _ThreadingHTTPServer((addr, port), _make_handler(self))
+            thread = threading.Thread(target=self._server.serve_forever)
+            thread.daemon = True
+            thread.start()
+        return self._server
+
+    def stop_http_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+def _make_handler(registry):
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.expose().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # keep scrapes out of stderr
+            pass
+
+    return MetricsHandler
+
+
+# process wide registry, call registry.start_http_server() to opt in to scraping
+registry = MetricsRegistry()
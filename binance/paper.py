@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from decimal import Decimal
+
+from .client import Client
+from .enums import *
+from .exceptions import BinanceOrderException, BinanceOrderUnknownSymbolException
+from .latency import tracer
+from .log import get_logger
+from .metrics import registry
+from .rules import SymbolRules
+
+log = get_logger('paper')
+
+PAPER_ORDERS = registry.counter('binance_paper_orders_total', 'Orders matched by the paper trading client',
+                                ['symbol', 'status'])
+
+
+class PaperOrderTemplate(object):
+
+    def __init__(self, symbol, side, order_type=ORDER_TYPE_MARKET, **params):
+        """Order template for the paper trading client, nothing is signed
+
+        :param symbol: required
+        :type symbol: str
+        :param side: required
+        :type side: enum
+        :param order_type: default ORDER_TYPE_MARKET
+        :type order_type: enum
+        :param params: any other static order parameters, e.g. recvWindow
+
+        """
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.params = params
+
+
+class PaperClient(Client):
+
+    def __init__(self, exchange_info=None, balances=None, trade_fee=0.0005, book_source=None, base_url=None):
+        """Simulated execution venue with the Client order interface
+
+        MARKET and IOC LIMIT orders are matched against the current order books,
+        which come from set_order_book, e.g. from a DepthCacheManager callback or a
+        replay, or from book_source. Fills take trade_fee of the received asset as
+        commission and orders must pass the symbol's LOT_SIZE, PRICE_FILTER and
+        MIN_NOTIONAL filters, MARKET orders are checked at the best price. Every
+        order is answered like a FULL response, whatever newOrderRespType asks for.
+
+        Market data calls are not simulated and still go to the REST API.
+
+        :param exchange_info: exchange info for the symbol filters and assets, downloaded if not given
+        :type exchange_info: dict
+        :param balances: starting free balance per asset, None does not check balances
+        :type balances: dict
+        :param trade_fee: commission as a fraction of the received amount
+        :type trade_fee: float
+        :param book_source: Optional function taking a symbol and returning its order book
+        :type book_source: function
+        :param base_url: REST server for exchange info, see Client
+        :type base_url: str
+
+        """
+        super(PaperClient, self).__init__(None, None, ping=False, base_url=base_url)
+        self.trade_fee = trade_fee
+        self.book_source = book_source
+        self._books = {}
+        self._check_balances = balances is not None
+        self._balances = dict((asset, float(free)) for asset, free in (balances or {}).items())
+        self._order_id = 0
+
+        if exchange_info is None:
+            exchange_info = self.get_exchange_info()
+        self._rules = SymbolRules.for_exchange_info(exchange_info)
+
+        self.orders = 0
+        self.fills = 0
+
+    def set_order_book(self, symbol, order_book):
+        """Set the order book orders for a symbol are matched against
+
+        :param symbol: required
+        :type symbol: str
+        :param order_book: REST depth layout dict or a DepthCache
+        :type order_book: dict or DepthCache
+
+        """
+        self._books[symbol] = order_book
+
+    def _check_filters(self, symbol, quantity, price=None, levels=None):
+        # reject an order the exchange would reject, a MARKET order has no price and its
+        # notional is taken at the best price of the book
+        quantiser = self._rules.quantiser(symbol)
+        failed = quantiser.check(quantity, price)
+        if failed is None and price is None and levels and quantiser.min_notional:
+            if Decimal(str(quantity)) * Decimal(str(levels[0][0])) < quantiser.min_notional:
+                failed = FILTER_TYPE_MIN_NOTIONAL
+        if failed is not None:
+            raise BinanceOrderException(-1013, 'Filter failure: %s' % failed)
+
+    def _get_levels(self, symbol, side):
+        # levels the order takes liquidity from, best price first
+        if self.book_source:
+            order_book = self.book_source(symbol)
+        else:
+            order_book = self._books.get(symbol)
+        if not order_book:
+            return []
+        if hasattr(order_book, 'get_asks'):
+            return order_book.get_asks() if side == SIDE_BUY else order_book.get_bids()
+        return order_book['asks'] if side == SIDE_BUY else order_book['bids']
+
+    def get_balance(self, asset):
+        """Get the simulated free balance of an asset
+
+        :param asset: asset name e.g. BTC
+        :type asset: str
+
+        :return: free balance as a float
+
+        """
+        return self._balances.get(asset, 0.0)
+
+    def get_account(self, **params):
+        """Get the simulated account, see Client.get_account
+
+        :returns: account dict with the simulated balances
+
+        """
+        return {
+            'makerCommission': int(self.trade_fee * 10000),
+            'takerCommission': int(self.trade_fee * 10000),
+            'canTrade': True,
+            'balances': [{'asset': asset, 'free': '%.8f' % free, 'locked': '0.00000000'}
+                         for asset, free in sorted(self._balances.items())]
+        }
+
+    def create_order(self, **params):
+        """Match an order against the current order book, see Client.create_order
+
+        :returns: FULL style order response
+
+        .. code-block:: python
+
+            {
+                "symbol": "ETHBTC",
+                "orderId": 1,
+                "clientOrderId": "paper1",
+                "transactTime": 1507725176595,
+                "price": "0.00000000",
+                "origQty": "1.00000000",
+                "executedQty": "1.00000000",
+                "status": "FILLED",
+                "timeInForce": "GTC",
+                "type": "MARKET",
+                "side": "BUY",
+                "fills": [
+                    {
+                        "price": "0.04000000",
+                        "qty": "1.00000000",
+                        "commission": "0.00050000",
+                        "commissionAsset": "ETH"
+                    }
+                ]
+            }
+
+        :raises: BinanceOrderException, e.g. Filter failure: LOT_SIZE, BinanceOrderUnknownSymbolException
+
+        """
+        symbol = params['symbol']
+        side = params['side']
+        order_type = params['type']
+        if symbol not in self._rules:
+            raise BinanceOrderUnknownSymbolException(symbol)
+        base_asset, quote_asset = self._rules.assets(symbol)
+
+        limit_price = None
+        time_in_force = params.get('timeInForce', TIME_IN_FORCE_GTC)
+        if order_type == ORDER_TYPE_LIMIT and time_in_force == TIME_IN_FORCE_IOC:
+            limit_price = float(params['price'])
+        elif order_type != ORDER_TYPE_MARKET:
+            raise BinanceOrderException(-1116, 'Only MARKET and IOC LIMIT orders are simulated.')
+
+        levels = self._get_levels(symbol, side)
+        self._check_filters(symbol, params['quantity'], params.get('price') if limit_price is not None else None,
+                            levels)
+
+        # walk the book, the simulated order does not consume liquidity for later orders
+        # quantities are counted in Decimal so a complete fill leaves exactly nothing remaining
+        quantity = Decimal(str(params['quantity']))
+        remaining = quantity
+        fills = []
+        for level in levels:
+            if remaining <= 0:
+                break
+            price = float(level[0])
+            if limit_price is not None and (price > limit_price if side == SIDE_BUY else price < limit_price):
+                break
+            qty = min(remaining, Decimal(str(level[1])))
+            remaining -= qty
+            fills.append((price, float(qty)))
+
+        executed = float(quantity - remaining)
+        quote_amount = sum(price * qty for price, qty in fills)
+        if side == SIDE_BUY:
+            spent_asset, spent, received_asset, received = quote_asset, quote_amount, base_asset, executed
+        else:
+            spent_asset, spent, received_asset, received = base_asset, executed, quote_asset, quote_amount
+        if self._check_balances and spent > self._balances.get(spent_asset, 0.0):
+            raise BinanceOrderException(-2010, 'Account has insufficient balance for requested action.')
+        if self._check_balances or spent_asset in self._balances:
+            self._balances[spent_asset] = self._balances.get(spent_asset, 0.0) - spent
+        self._balances[received_asset] = self._balances.get(received_asset, 0.0) + received * (1.0 - self.trade_fee)
+
+        # whatever the book could not fill expires, as it does for MARKET and IOC orders on the exchange
+        status = ORDER_STATUS_FILLED if remaining <= 0 else ORDER_STATUS_EXPIRED
+
+        self._order_id += 1
+        self.orders += 1
+        self.fills += len(fills)
+        PAPER_ORDERS.labels(symbol, status).inc()
+        order = {
+            'symbol': symbol,
+            'orderId': self._order_id,
+            'clientOrderId': params.get('newClientOrderId', 'paper%d' % self._order_id),
+            'transactTime': self.server_timestamp(),
+            'price': '%.8f' % (limit_price or 0.0),
+            'origQty': '%.8f' % quantity,
+            'executedQty': '%.8f' % executed,
+            'status': status,
+            'timeInForce': time_in_force,
+            'type': order_type,
+            'side': side,
+            'fills': [{'price': '%.8f' % price,
+                       'qty': '%.8f' % qty,
+                       'commission': '%.8f' % ((qty if side == SIDE_BUY else price * qty) * self.trade_fee),
+                       'commissionAsset': received_asset} for price, qty in fills]
+        }
+        log.debug('paper_order', symbol=symbol, side=side, quantity=params['quantity'], status=status,
+                  executed=executed)
+        return order
+
+    def order_template(self, symbol, side, type=ORDER_TYPE_MARKET, **params):
+        """Get an order template, see Client.order_template
+
+        :returns: PaperOrderTemplate
+
+        """
+        key = (symbol, side, type, tuple(params.items()))
+        template = self._order_templates.get(key)
+        if template is None:
+            template = PaperOrderTemplate(symbol, side, type, **params)
+            self._order_templates[key] = template
+        return template
+
+    def create_template_order(self, template, quantity):
+        """Match an order built from an order template, see create_order
+
+        :param template: template returned by order_template
+        :type template: PaperOrderTemplate
+        :param quantity: required
+        :type quantity: str
+
+        :returns: FULL style order response
+
+        """
+        start = tracer.start()
+        order = self.create_order(symbol=template.symbol, side=template.side, type=template.order_type,
+                                  quantity=quantity, **template.params)
+        tracer.stop('submit_ack', start)
+        return order
+
+    def create_test_order(self, **params):
+        """Validate an order without matching it, see Client.create_test_order
+
+        :returns: empty dict
+
+        :raises: BinanceOrderException, e.g. Filter failure: LOT_SIZE, BinanceOrderUnknownSymbolException
+
+        """
+        symbol = params['symbol']
+        if symbol not in self._rules:
+            raise BinanceOrderUnknownSymbolException(symbol)
+        price = params.get('price')
+        self._check_filters(symbol, params['quantity'], price,
+                            None if price is not None else self._get_levels(symbol, params['side']))
+        return {}
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from six.moves import queue
+
+from .log import get_logger
+
+log = get_logger('recorder')
+
+RECORD_DEPTH_DIFF = 1
+RECORD_DEPTH_SNAPSHOT = 2
+RECORD_BOOK_TICKER = 3
+RECORD_ORDER_RESPONSE = 4
+RECORD_EXCHANGE_INFO = 5
+RECORD_WS_OTHER = 6
+
+FILE_MAGIC = b'BNBREC1\n'
+
+# compressed block length, record count
+_BLOCK_HEADER = struct.Struct('<II')
+# payload length, kind, wall clock receive ns, monotonic receive ns, stream name length
+_RECORD_HEADER = struct.Struct('<IBqqH')
+
+Record = namedtuple('Record', ['kind', 'received', 'received_monotonic', 'stream', 'payload'])
+
+_PARTIAL_DEPTH = re.compile(r'@depth\d+')
+
+
+def stream_record_kind(stream):
+    """Get the record kind for the messages of a websocket stream path
+
+    :param stream: stream path e.g. ethbtc@depth
+    :type stream: str
+
+    :return: record kind
+
+    """
+    if _PARTIAL_DEPTH.search(stream):
+        return RECORD_DEPTH_SNAPSHOT
+    if stream.endswith('@depth'):
+        return RECORD_DEPTH_DIFF
+    if stream.endswith('@bookTicker'):
+        return RECORD_BOOK_TICKER
+    return RECORD_WS_OTHER
+
+
+class MarketDataRecorder(threading.Thread):
+
+    def __init__(self, path, block_size=65536, flush_interval=1.0, max_queue_size=100000, compress_level=6):
+        """Intialise the MarketDataRecorder
+
+        Append only log of raw market data. Records are length prefixed and
+        grouped into zlib compressed blocks, each block is prefixed with its
+        compressed length and record count. Callers only enqueue, compression and
+        file writes happen on the recorder thread.
+
+        :param path: file to append to, created with a header if it does not exist
+        :type path: str
+        :param block_size: uncompressed bytes buffered before writing a block
+        :type block_size: int
+        :param flush_interval: seconds after which a partial block is written
+        :type flush_interval: float
+        :param max_queue_size: records queued before new ones are dropped
+        :type max_queue_size: int
+        :param compress_level: zlib compression level
+        :type compress_level: int
+
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.path = path
+        self._block_size = block_size
+        self._flush_interval = flush_interval
+        self._compress_level = compress_level
+        self._queue = queue.Queue(max_queue_size)
+        self.recorded = 0
+        self.dropped = 0
+
+        with open(path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(FILE_MAGIC)
+
+        self.start()
+
+    def record(self, kind, payload, stream='', received=None, received_monotonic=None):
+        """Queue a raw payload for writing
+
+        :param kind: RECORD_* kind
+        :type kind: int
+        :param payload: raw payload bytes as received
+        :type payload: bytes
+        :param stream: stream path or symbol the payload belongs to
+        :type stream: str
+        :param received: wall clock receive time in ns, default now
+        :type received: int
+        :param received_monotonic: monotonic receive time in ns, default now
+        :type received_monotonic: int
+
+        """
+        if received is None:
+            received = time.time_ns()
+        if received_monotonic is None:
+            received_monotonic = time.perf_counter_ns()
+        try:
+            self._queue.put_nowait((kind, received, received_monotonic, stream, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_json(self, kind, obj, stream=''):
+        """Queue an already decoded response, encoded back to JSON
+
+        """
+        self.record(kind, json.dumps(obj, separators=(',', ':')).encode('utf-8'), stream)
+
+    def run(self):
+        buf = []
+        buf_size = 0
+        count = 0
+        deadline = time.time() + self._flush_interval
+        with open(self.path, 'ab') as f:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.time(), 0.0))
+                except queue.Empty:
+                    item = False
+
+                if item:
+                    kind, received, received_monotonic, stream, payload = item
+                    stream = stream.encode('utf-8')
+                    buf.append(_RECORD_HEADER.pack(len(payload), kind, received, received_monotonic, len(stream)))
+                    buf.append(stream)
+                    buf.append(payload)
+                    buf_size += _RECORD_HEADER.size + len(stream) + len(payload)
+                    count += 1
+
+                flush_due = item is None or item is False or buf_size >= self._block_size or time.time() >= deadline
+                if count and flush_due:
+                    block = zlib.compress(b''.join(buf), self._compress_level)
+                    f.write(_BLOCK_HEADER.pack(len(block), count))
+                    f.write(block)
+                    f.flush()
+                    self.recorded += count
+                    buf = []
+                    buf_size = 0
+                    count = 0
+
+                if item is not False:
+                    self._queue.task_done()
+                if item is None:
+                    return
+                if flush_due:
+                    deadline = time.time() + self._flush_interval
+
+    def flush(self):
+        """Block until every queued record has been handed to the writer
+
+        Records still in the current block are written at the next flush interval.
+
+        """
+        self._queue.join()
+
+    def close(self):
+        """Write out everything queued and stop the recorder thread
+
+        """
+        if self.is_alive():
+            self._queue.put(None)
+            self.join()
+        log.info('recorder_closed', path=self.path, recorded=self.recorded, dropped=self.dropped)
+
+
+def read_records(path):
+    """Iterate over the records of a recording in order
+
+    A truncated final block, e.g. after a crash, ends the iteration.
+
+    :param path: recording file
+    :type path: str
+
+    :return: generator of Record tuples
+
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError('%s is not a market data recording' % path)
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                return
+            length, count = _BLOCK_HEADER.unpack(header)
+            block = f.read(length)
+            if len(block) < length:
+                return
+            data = zlib.decompress(block)
+            offset = 0
+            for _ in range(count):
+                size, kind, received, received_monotonic, stream_size = _RECORD_HEADER.unpack_from(data, offset)
+                offset += _RECORD_HEADER.size
+                stream = data[offset:offset + stream_size].decode('utf-8')
+                offset += stream_size
+                yield Record(kind, received, received_monotonic, stream, data[offset:offset + size])
+                offset += size
@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import math
+import numbers
+import sys
+from decimal import Decimal, InvalidOperation
+
+from .enums import FILTER_TYPE_LOT_SIZE, FILTER_TYPE_MIN_NOTIONAL, FILTER_TYPE_PRICE_FILTER
+
+# numpy is only imported by the batch methods, it would double the import time of the model
+
+# a float times the scale within the error of the multiplication of an integer is taken as that integer,
+# so 2.3 at 0.01 steps is 230 units although 2.3 * 100 is 229.99999999999997
+_SNAP = 2 * sys.float_info.epsilon
+
+# floats are integers up to 2 ** 53, a scaled float beyond it is parsed through its repr instead
+_EXACT_FLOAT = 2.0 ** 53
+
+# decimals used when a filter has no step to take them from, the precision of exchangeInfo
+_DEFAULT_DECIMALS = 8
+
+
+def _decimals(value):
+    return max(-value.normalize().as_tuple().exponent, 0)
+
+
+class Quantiser(object):
+
+    def __init__(self, minimum, maximum, step):
+        """Intialise the Quantiser
+
+        Range and step of a PRICE_FILTER or LOT_SIZE filter, parsed once from the
+        exchangeInfo strings. Values are counted in integer units of the finest
+        decimal the filter uses, so rounding to the step and formatting are exact
+        integer operations at any magnitude. A step or bound of 0 is not enforced.
+
+        :param minimum: e.g. minQty
+        :type minimum: str
+        :param maximum: e.g. maxQty
+        :type maximum: str
+        :param step: e.g. stepSize
+        :type step: str
+
+        """
+        self.minimum = Decimal(minimum)
+        self.maximum = Decimal(maximum)
+        self.step = Decimal(step)
+        if self.step:
+            self.decimals = max(_decimals(self.step), _decimals(self.minimum), _decimals(self.maximum))
+        else:
+            self.decimals = _DEFAULT_DECIMALS
+        self.scale = 10 ** self.decimals
+        self.step_units = int(self.step.scaleb(self.decimals))
+        self.min_units = int(self.minimum.scaleb(self.decimals))
+        self.max_units = int(self.maximum.scaleb(self.decimals))
+
+    def to_units(self, value):
+        """Round a value toward zero to a multiple of the step
+
+        str, Decimal and int values are converted exactly. A float is taken as the
+        decimal it was written as, within the rounding error of the float, so 2.3
+        is 2.3 and not 2.2999999999999998.
+
+        :param value: required
+        :type value: float, int, Decimal or str
+
+        :return: int count of units of 10 ** -decimals
+
+        :raises: ValueError if the value is not a finite number
+
+        """
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                raise ValueError('Cannot quantise %r' % value)
+            scaled = value * self.scale
+            if abs(scaled) < _EXACT_FLOAT:
+                units = round(scaled)
+                if abs(scaled - units) > abs(scaled) * _SNAP:
+                    units = int(scaled)
+            else:
+                units = self._decimal_units(repr(value))
+        elif isinstance(value, numbers.Integral):
+            units = int(value) * self.scale
+        else:
+            units = self._decimal_units(value)
+        if self.step_units > 1:
+            remainder = abs(units) % self.step_units
+            units -= remainder if units >= 0 else -remainder
+        return units
+
+    def _decimal_units(self, value):
+        try:
+            value = Decimal(value)
+        except (InvalidOperation, TypeError):
+            raise ValueError('Cannot quantise %r' % (value,))
+        if not value.is_finite():
+            raise ValueError('Cannot quantise %r' % value)
+        return int(value.scaleb(self.decimals))
+
+    def exact_units(self, value):
+        """Get the units of a value without rounding it
+
+        :param value: required
+        :type value: Decimal
+
+        :return: int, None if the value has more decimals than the filter
+
+        """
+        units = value.scaleb(self.decimals)
+        if units != units.to_integral_value():
+            return None
+        return int(units)
+
+    def format(self, units):
+        """Format units as a decimal string with the filter's decimals, e.g. for an order quantity
+
+        :param units: required
+        :type units: int
+
+        :return: str
+
+        """
+        if not self.decimals:
+            return '%d' % units
+        sign = '-' if units < 0 else ''
+        whole, fraction = divmod(abs(units), self.scale)
+        return '%s%d.%0*d' % (sign, whole, self.decimals, fraction)
+
+    def quantise(self, value):
+        """Round a value toward zero to a multiple of the step and format it
+
+        :param value: required
+        :type value: float, int or str
+
+        :return: str, e.g. '1.234000'
+
+        """
+        return self.format(self.to_units(value))
+
+    def floor(self, value):
+        """Round a value toward zero to a multiple of the step
+
+        :return: Decimal
+
+        """
+        return Decimal(self.to_units(value)).scaleb(-self.decimals)
+
+    def contains(self, units):
+        """Check units are a multiple of the step within the range
+
+        :param units: required
+        :type units: int
+
+        :return: bool
+
+        """
+        if units is None:
+            return False
+        if self.step_units and units % self.step_units:
+            return False
+        if self.min_units and units < self.min_units:
+            return False
+        return not self.max_units or units <= self.max_units
+
+    def to_units_batch(self, values):
+        """Round an array of non negative values down to multiples of the step, see to_units
+
+        Values are float64, so each must be less than 2 ** 53 units.
+
+        :param values: required
+        :type values: list or numpy.ndarray
+
+        :return: numpy.ndarray of int64 units
+
+        :raises: ValueError if a value is not finite or too large
+
+        """
+        import numpy as np
+
+        scaled = np.asarray(values, dtype=np.float64) * self.scale
+        if not np.all(np.abs(scaled) < _EXACT_FLOAT):
+            raise ValueError('Cannot quantise values that are not finite or of 2 ** 53 units or more')
+        nearest = np.rint(scaled)
+        units = np.where(np.abs(scaled - nearest) <= np.abs(scaled) * _SNAP, nearest, np.floor(scaled))
+        units = units.astype(np.int64)
+        if self.step_units > 1:
+            units -= units % self.step_units
+        return units
+
+    def contains_batch(self, units):
+        """Check an array of units are multiples of the step within the range, see contains
+
+        :return: numpy.ndarray of bool
+
+        """
+        import numpy as np
+
+        units = np.asarray(units, dtype=np.int64)
+        valid = np.ones(units.shape, dtype=bool)
+        if self.step_units:
+            valid &= units % self.step_units == 0
+        if self.min_units:
+            valid &= units >= self.min_units
+        if self.max_units:
+            valid &= units <= self.max_units
+        return valid
+
+    def format_batch(self, units):
+        """Format an array of units, see format
+
+        :return: list of str
+
+        """
+        import numpy as np
+
+        return [self.format(u) for u in np.asarray(units, dtype=np.int64).tolist()]
+
+    def __repr__(self):
+        return 'Quantiser(%s, %s, %s)' % (self.minimum, self.maximum, self.step)
+
+
+class SymbolQuantiser(object):
+
+    def __init__(self, lot_size=None, price_filter=None, min_notional=None):
+        """Intialise the SymbolQuantiser
+
+        Rounds and validates the quantities and prices of one symbol's orders
+        against its LOT_SIZE, PRICE_FILTER and MIN_NOTIONAL filters.
+
+        :param lot_size: LOT_SIZE quantiser
+        :type lot_size: Quantiser
+        :param price_filter: PRICE_FILTER quantiser
+        :type price_filter: Quantiser
+        :param min_notional: MIN_NOTIONAL
+        :type min_notional: Decimal
+
+        """
+        self.lot_size = lot_size
+        self.price_filter = price_filter
+        self.min_notional = min_notional
+        self._min_notional = float(min_notional) if min_notional else 0.0
+
+    def quantity(self, value):
+        """Round a quantity down to the step size, formatted for an order
+
+        :return: str
+
+        """
+        return self.lot_size.quantise(value) if self.lot_size else str(value)
+
+    def price(self, value):
+        """Round a price down to the tick size, formatted for an order
+
+        :return: str
+
+        """
+        return self.price_filter.quantise(value) if self.price_filter else str(value)
+
+    def check(self, quantity, price=None):
+        """Get the filter an order would fail
+
+        :param quantity: order quantity
+        :type quantity: float or str
+        :param price: limit price or expected fill price, MIN_NOTIONAL is only checked with a price
+        :type price: float or str
+
+        :return: FILTER_TYPE_LOT_SIZE, FILTER_TYPE_PRICE_FILTER or FILTER_TYPE_MIN_NOTIONAL, None if it passes
+
+        """
+        quantity = Decimal(str(quantity))
+        if self.lot_size and not self.lot_size.contains(self.lot_size.exact_units(quantity)):
+            return FILTER_TYPE_LOT_SIZE
+        if price is None:
+            return None
+        price = Decimal(str(price))
+        if self.price_filter and not self.price_filter.contains(self.price_filter.exact_units(price)):
+            return FILTER_TYPE_PRICE_FILTER
+        if self.min_notional and quantity * price < self.min_notional:
+            return FILTER_TYPE_MIN_NOTIONAL
+        return None
+
+    def validate_batch(self, quantities, prices=None):
+        """Round candidate quantities down to the step size and check them all at once
+
+        :param quantities: candidate quantities
+        :type quantities: list or numpy.ndarray
+        :param prices: expected fill price of each candidate, to check MIN_NOTIONAL
+        :type prices: list or numpy.ndarray
+
+        :return: (units, valid), numpy arrays of the rounded quantities in LOT_SIZE units, see
+            Quantiser.format_batch, and whether each rounded quantity passes the filters.
+            Quantities that are not finite or too large for to_units_batch are invalid with 0 units.
+            The notional is compared in float64, exact up to one ulp of MIN_NOTIONAL
+
+        """
+        import numpy as np
+
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if self.lot_size is None:
+            return quantities, np.isfinite(quantities)
+        representable = np.abs(quantities * self.lot_size.scale) < _EXACT_FLOAT
+        units = self.lot_size.to_units_batch(np.where(representable, quantities, 0.0))
+        valid = self.lot_size.contains_batch(units) & representable
+        if prices is not None and self._min_notional:
+            valid &= units / float(self.lot_size.scale) * np.asarray(prices, dtype=np.float64) >= self._min_notional
+        return units, valid
+
+
+def _parse_filter(symbol_filter):
+    filter_type = symbol_filter['filterType']
+    if filter_type == FILTER_TYPE_PRICE_FILTER:
+        return Quantiser(symbol_filter['minPrice'], symbol_filter['maxPrice'], symbol_filter['tickSize'])
+    if filter_type == FILTER_TYPE_LOT_SIZE:
+        return Quantiser(symbol_filter['minQty'], symbol_filter['maxQty'], symbol_filter['stepSize'])
+    if filter_type == FILTER_TYPE_MIN_NOTIONAL:
+        return Decimal(symbol_filter['minNotional'])
+    # other filters are kept as they came
+    return symbol_filter
+
+
+class SymbolRules(object):
+
+    # the exchange info and rules last built by for_exchange_info
+    _last = (None, None)
+
+    def __init__(self, exchange_info):
+        """Intialise the SymbolRules
+
+        Trading rules of every symbol in exchangeInfo, indexed in one pass by
+        symbol and filterType, so the rules of any triangle are dict lookups.
+
+        .. code-block:: python
+
+            rules = SymbolRules(client.get_exchange_info())
+            rules.lot_size('ETHBTC').step           # Decimal('0.001')
+            rules.price_filter('ETHBTC').minimum    # Decimal('0.000001')
+            rules.min_notional('ETHBTC')            # Decimal('0.001')
+
+        :param exchange_info: get_exchange_info response
+        :type exchange_info: dict
+
+        """
+        self._filters = {}
+        self._assets = {}
+        self._quantisers = {}
+        for symbol in exchange_info['symbols']:
+            filters = dict((f['filterType'], _parse_filter(f)) for f in symbol['filters'])
+            self._filters[symbol['symbol']] = filters
+            self._assets[symbol['symbol']] = (symbol['baseAsset'], symbol['quoteAsset'])
+            self._quantisers[symbol['symbol']] = SymbolQuantiser(filters.get(FILTER_TYPE_LOT_SIZE),
+                                                                 filters.get(FILTER_TYPE_PRICE_FILTER),
+                                                                 filters.get(FILTER_TYPE_MIN_NOTIONAL))
+
+    @classmethod
+    def for_exchange_info(cls, exchange_info):
+        """Get the rules of an exchange info, reusing the last ones built for the same object
+
+        Many models created from one exchange info share a single index.
+
+        :param exchange_info: get_exchange_info response
+        :type exchange_info: dict
+
+        :return: SymbolRules
+
+        """
+        last_exchange_info, rules = cls._last
+        if last_exchange_info is not exchange_info:
+            rules = cls(exchange_info)
+            cls._last = (exchange_info, rules)
+        return rules
+
+    def __contains__(self, symbol):
+        return symbol in self._filters
+
+    def __len__(self):
+        return len(self._filters)
+
+    def get(self, symbol, filter_type, default=None):
+        """Get one parsed filter of a symbol
+
+        :param symbol: required
+        :type symbol: str
+        :param filter_type: e.g. FILTER_TYPE_LOT_SIZE
+        :type filter_type: str
+
+        :return: Quantiser for PRICE_FILTER and LOT_SIZE, Decimal for MIN_NOTIONAL, the filter dict otherwise,
+            default if the symbol or filter is unknown
+
+        """
+        filters = self._filters.get(symbol)
+        if filters is None:
+            return default
+        return filters.get(filter_type, default)
+
+    def filters(self, symbol):
+        """Get every parsed filter of a symbol
+
+        :return: dict of filterType to the parsed filter
+
+        """
+        return self._filters[symbol]
+
+    def assets(self, symbol):
+        """Get the base and quote asset of a symbol
+
+        :return: (base asset, quote asset)
+
+        """
+        return self._assets[symbol]
+
+    def lot_size(self, symbol):
+        return self.get(symbol, FILTER_TYPE_LOT_SIZE)
+
+    def price_filter(self, symbol):
+        return self.get(symbol, FILTER_TYPE_PRICE_FILTER)
+
+    def min_notional(self, symbol):
+        return self.get(symbol, FILTER_TYPE_MIN_NOTIONAL)
+
+    def quantiser(self, symbol):
+        """Get the quantiser rounding and validating a symbol's orders
+
+        :return: SymbolQuantiser, None if the symbol is unknown
+
+        """
+        return self._quantisers.get(symbol)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .depthcache import DepthCacheManager
+from .log import get_logger
+
+log = get_logger('shmbook')
+
+# shared memory layout
+#   header  <8sIII   magic, version, symbol count, levels per side
+#   names   16 bytes per symbol, ascii, zero padded
+#   slots   one per symbol, SLOT_HEADER then bids then asks, each levels x (price, qty) float64
+# every slot is guarded by a seqlock: the writer makes its version odd, writes the slot and makes it even,
+# a reader copies the slot and retries if the version was odd or changed while it copied
+# there must be only one writer, and the stores are relied on to become visible in program order as they do on x86
+
+BUS_MAGIC = b'BNBBOOK1'
+BUS_VERSION = 1
+
+_HEADER = struct.Struct('<8sIII')
+_NAME_SIZE = 16
+
+# version, update id, publish time in ns, bid levels, ask levels
+SLOT_HEADER = np.dtype([('version', '<u8'), ('update_id', '<i8'), ('timestamp', '<i8'),
+                        ('bids', '<i4'), ('asks', '<i4')])
+
+
+def _slot_dtype(levels):
+    return np.dtype([('header', SLOT_HEADER), ('bids', '<f8', (levels, 2)), ('asks', '<f8', (levels, 2))])
+
+
+def _bus_size(symbols, levels):
+    return _HEADER.size + _NAME_SIZE * symbols + _slot_dtype(levels).itemsize * symbols
+
+
+class SharedBookWriter(object):
+
+    def __init__(self, name, symbols, levels=20):
+        """Intialise the SharedBookWriter
+
+        Creates the shared memory segment that readers in other processes attach to by name.
+
+        :param name: shared memory name
+        :type name: str
+        :param symbols: symbols with a slot on the bus
+        :type symbols: list
+        :param levels: price levels kept per side
+        :type levels: int
+
+        """
+        self.name = name
+        self.symbols = list(symbols)
+        self.levels = levels
+        self._shm = shared_memory.SharedMemory(name, create=True, size=_bus_size(len(self.symbols), levels))
+        buf = self._shm.buf
+        _HEADER.pack_into(buf, 0, BUS_MAGIC, BUS_VERSION, len(self.symbols), levels)
+        for i, symbol in enumerate(self.symbols):
+            offset = _HEADER.size + i * _NAME_SIZE
+            buf[offset:offset + _NAME_SIZE] = symbol.encode('ascii').ljust(_NAME_SIZE, b'\0')
+        self._slots = np.ndarray((len(self.symbols),), dtype=_slot_dtype(levels), buffer=buf,
+                                 offset=_HEADER.size + _NAME_SIZE * len(self.symbols))
+        # field views over every slot, writes go straight to the shared memory
+        self._headers = self._slots['header']
+        self._bids = self._slots['bids']
+        self._asks = self._slots['asks']
+        self._index = dict((symbol, i) for i, symbol in enumerate(self.symbols))
+
+    def publish(self, symbol, bids, asks, update_id=0):
+        """Write the top levels of a book to the symbol's slot
+
+        :param symbol: required
+        :type symbol: str
+        :param bids: bids best first, e.g. DepthCache.get_bids()
+        :type bids: list
+        :param asks: asks best first, e.g. DepthCache.get_asks()
+        :type asks: list
+        :param update_id: last update id applied to the book
+        :type update_id: int
+
+        """
+        i = self._index[symbol]
+        headers = self._headers
+        bids = bids[:self.levels]
+        asks = asks[:self.levels]
+        headers['version'][i] += 1
+        if len(bids):
+            self._bids[i, :len(bids)] = [level[:2] for level in bids]
+        if len(asks):
+            self._asks[i, :len(asks)] = [level[:2] for level in asks]
+        headers['bids'][i] = len(bids)
+        headers['asks'][i] = len(asks)
+        headers['update_id'][i] = update_id
+        headers['timestamp'][i] = time.time_ns()
+        headers['version'][i] += 1
+
+    def close(self):
+        """Detach and remove the segment, attached readers keep their mapping until they close"""
+        self._slots = None
+        self._headers = self._bids = self._asks = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedBookReader(object):
+
+    def __init__(self, name, timeout=0.1):
+        """Intialise the SharedBookReader
+
+        Attaches to the segment of a SharedBookWriter by name.
+
+        :param name: shared memory name
+        :type name: str
+        :param timeout: seconds a read waits for the writer to finish publishing a book,
+            a writer that died part way through a publish leaves the slot unreadable
+        :type timeout: float
+
+        """
+        self.name = name
+        self.timeout = timeout
+        try:
+            self._shm = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            # before python 3.13 attaching registers the segment with this process' resource tracker,
+            # which would remove it from under the writer when this process exits
+            self._shm = shared_memory.SharedMemory(name)
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        buf = self._shm.buf
+        magic, version, count, self.levels = _HEADER.unpack_from(buf, 0)
+        if magic != BUS_MAGIC or version != BUS_VERSION:
+            raise ValueError('%s is not a version %d book bus' % (name, BUS_VERSION))
+        self.symbols = []
+        for i in range(count):
+            offset = _HEADER.size + i * _NAME_SIZE
+            self.symbols.append(bytes(buf[offset:offset + _NAME_SIZE]).rstrip(b'\0').decode('ascii'))
+        self._slots = np.ndarray((count,), dtype=_slot_dtype(self.levels), buffer=buf,
+                                 offset=_HEADER.size + _NAME_SIZE * count)
+        self._versions = self._slots['header']['version']
+        self._index = dict((symbol, i) for i, symbol in enumerate(self.symbols))
+        self.retries = 0
+
+    def version(self, symbol):
+        """Get the slot version, it changes every time the book is published
+
+        :param symbol: required
+        :type symbol: str
+
+        :return: int, 0 if the book was never published
+
+        """
+        return int(self._versions[self._index[symbol]])
+
+    def read(self, symbol):
+        """Copy a consistent snapshot of a book out of the bus
+
+        :param symbol: required
+        :type symbol: str
+
+        :return: dict with bids and asks as (levels, 2) numpy arrays of price and qty, best first,
+            or None if the book was never published
+
+        .. code-block:: python
+
+            {
+                'bids': array([[0.0400, 1.5], ...]),
+                'asks': array([[0.0401, 2.0], ...]),
+                'update_id': 7913455,
+                'timestamp': 1515900000000000000,
+                'version': 42
+            }
+
+        :raises: TimeoutError if no consistent copy could be made within the timeout
+
+        """
+        i = self._index[symbol]
+        versions = self._versions
+        deadline = None
+        while True:
+            version = int(versions[i])
+            # an odd version is the writer part way through the slot
+            if not version & 1:
+                # one memcpy of the slot, checked against the version afterwards
+                copy = self._slots[i:i + 1].copy()[0]
+                if int(versions[i]) == version:
+                    break
+            self.retries += 1
+            # retry straight away once, then give the writer the cpu until the deadline
+            if deadline is None:
+                deadline = time.monotonic() + self.timeout
+            elif time.monotonic() < deadline:
+                time.sleep(0)
+            else:
+                raise TimeoutError('No consistent copy of the %s book on %s within %ss, is the writer alive?'
+                                   % (symbol, self.name, self.timeout))
+        if not version:
+            return None
+        header = copy['header']
+        return {
+            'bids': copy['bids'][:header['bids']],
+            'asks': copy['asks'][:header['asks']],
+            'update_id': int(header['update_id']),
+            'timestamp': int(header['timestamp']),
+            'version': version,
+        }
+
+    def get_order_book(self, symbol):
+        """Get a book in the REST depth layout the model expects
+
+        :param symbol: required
+        :type symbol: str
+
+        :return: dict of bids and asks lists of [price, qty], empty if the book was never published
+
+        """
+        book = self.read(symbol)
+        if book is None:
+            return {'bids': [], 'asks': []}
+        return {'lastUpdateId': book['update_id'], 'bids': book['bids'].tolist(), 'asks': book['asks'].tolist()}
+
+    def get_order_books(self, symbols):
+        """Get several books in the REST depth layout, so the reader can be a model's book provider
+
+        :param symbols: required
+        :type symbols: list
+
+        :return: list of dicts, see get_order_book
+
+        """
+        return [self.get_order_book(symbol) for symbol in symbols]
+
+    def close(self):
+        self._slots = self._versions = None
+        self._shm.close()
+
+
+class BookFeed(object):
+
+    def __init__(self, client, symbols, name, levels=20, stream_url=None, recorder=None):
+        """Intialise the BookFeed
+
+        Owns one DepthCacheManager per symbol and publishes every update to a
+        shared book bus, so any number of strategy processes read the books with
+        a SharedBookReader instead of opening their own sockets and REST calls.
+
+        :param client: Binance API client
+        :type client: binance.Client
+        :param symbols: symbols to publish
+        :type symbols: list
+        :param name: shared memory name
+        :type name: str
+        :param levels: price levels published per side
+        :type levels: int
+        :param stream_url: stream server to use instead of the Binance one
+        :type stream_url: str
+        :param recorder: optional recorder for the snapshots and depth events
+        :type recorder: binance.recorder.MarketDataRecorder
+
+        """
+        self.writer = SharedBookWriter(name, symbols, levels)
+        self.depth_cache_managers = {}
+        for symbol in symbols:
+            self.depth_cache_managers[symbol] = DepthCacheManager(client, symbol, self._publish, recorder,
+                                                                  stream_url=stream_url)
+        log.info('book_feed_started', name=name, symbols=list(symbols), levels=levels)
+
+    def _publish(self, depth_cache):
+        self.writer.publish(depth_cache._symbol, depth_cache.get_bids(), depth_cache.get_asks(),
+                            depth_cache.update_id)
+
+    def close(self):
+        for depth_cache_manager in self.depth_cache_managers.values():
+            depth_cache_manager.close()
+        self.writer.close()
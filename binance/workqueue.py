@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+from collections import deque
+
+from .log import get_logger
+from .metrics import registry
+
+log = get_logger('workqueue')
+
+# keep one pending item per key, a newer item replaces the pending one in its place in the queue
+POLICY_COALESCE = 'coalesce'
+# keep every item, drop the oldest when the queue is full
+POLICY_DROP_OLDEST = 'drop_oldest'
+
+QUEUE_DEPTH = registry.gauge('binance_work_queue_depth', 'Items waiting in the work queue', ['queue'])
+QUEUE_DROPPED = registry.counter('binance_work_queue_dropped_total', 'Items dropped or replaced before a worker ran them',
+                                 ['queue', 'reason'])
+QUEUE_WAIT = registry.histogram('binance_work_queue_wait_seconds', 'Time from put to a worker taking the item',
+                                ['queue'])
+
+
+class WorkQueue(object):
+
+    def __init__(self, name='default', maxsize=1000, policy=POLICY_COALESCE):
+        """Intialise the WorkQueue
+
+        Bounded hand off from the reactor thread to worker threads. put never
+        blocks, when the queue is full the oldest item is dropped, so a slow
+        worker costs stale work instead of stalling every socket.
+
+        :param name: queue name for the metrics
+        :type name: str
+        :param maxsize: most items held at once
+        :type maxsize: int
+        :param policy: POLICY_COALESCE or POLICY_DROP_OLDEST
+        :type policy: str
+
+        """
+        if policy not in (POLICY_COALESCE, POLICY_DROP_OLDEST):
+            raise ValueError('unknown work queue policy %s' % policy)
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self._keys = deque()
+        self._items = {}
+        self._sequence = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        QUEUE_DEPTH.labels(name).set_function(lambda: len(self._keys))
+        self._coalesced = QUEUE_DROPPED.labels(name, 'coalesced')
+        self._overflowed = QUEUE_DROPPED.labels(name, 'overflow')
+        self._wait = QUEUE_WAIT.labels(name)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def put(self, key, func, *args):
+        """Queue func(*args) to run on a worker
+
+        :param key: coalescing key, e.g. the symbol
+        :type key: str
+        :param func: function to run
+        :type func: function
+
+        :return: False if the item replaced a pending item or the queue was closed
+
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            if self.policy == POLICY_COALESCE:
+                if key in self._items:
+                    # the pending item keeps its place in the queue, with the newer work
+                    self._items[key] = (func, args, self._items[key][2])
+                    self._coalesced.inc()
+                    return False
+            else:
+                # every item gets its own slot
+                self._sequence += 1
+                key = (key, self._sequence)
+            if len(self._keys) >= self.maxsize:
+                del self._items[self._keys.popleft()]
+                self._overflowed.inc()
+            self._keys.append(key)
+            self._items[key] = (func, args, time.perf_counter())
+            self._cond.notify()
+            return True
+
+    def get(self, timeout=None):
+        """Take the oldest item, waiting for one if the queue is empty
+
+        :param timeout: seconds to wait, None waits until an item arrives or the queue is closed
+        :type timeout: float
+
+        :return: (func, args) or None on timeout or once the queue is closed and empty
+
+        """
+        with self._cond:
+            if not self._keys and not self._closed:
+                self._cond.wait(timeout)
+            if not self._keys:
+                return None
+            func, args, queued = self._items.pop(self._keys.popleft())
+        self._wait.observe(time.perf_counter() - queued)
+        return func, args
+
+    def close(self):
+        """Stop accepting items and wake every waiting worker
+
+        Items already queued are still handed out.
+
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class WorkerPool(object):
+
+    def __init__(self, queue, workers=1):
+        """Intialise the WorkerPool
+
+        Threads that drain a WorkQueue. Each item runs on exactly one worker,
+        use one worker when items must run in order or share state that is not
+        thread safe, e.g. a single model.
+
+        :param queue: queue to drain
+        :type queue: WorkQueue
+        :param workers: number of worker threads
+        :type workers: int
+
+        """
+        self.queue = queue
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name='%s-worker-%d' % (queue.name, i))
+            thread.daemon = True
+            self._threads.append(thread)
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                if self.queue.closed:
+                    return
+                continue
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                # a failing item must not take the worker down with it
+                log.error('work_item_failed', 'work item raised', queue=self.queue.name, exception=repr(e))
+
+    def stop(self, timeout=None):
+        """Close the queue and wait for the workers to finish the queued items
+
+        :param timeout: seconds to wait for each worker
+        :type timeout: float
+
+        """
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
@@ -1,7 +1,7 @@
 from TriangularArbitrageModel import *
 
 # model = TriangularArbitrageModel('USDT', 'BTC', 'ETH')
-model = TriangularArbitrageModel('USDT', 'ETH', 'BTC')
+model = TriangularArbitrageModel('USDT', 'ETH', 'BTC', exchange_info_cache='~/.cache/arbitrage/exchange_info.json')
 
 print(model.pair_a_valid_name)
 print(model.pair_b_valid_name)
@@ -23,6 +23,7 @@ window = 60
 # fees = (1.0005 ** 3)
 profit_threshold = 0.04
 
+model.start_ledger()
 model.print_account_info()
 while True:
     model.async_update(total_base_asset=trade_amount, profit_conditional=(trade_amount + profit_threshold))
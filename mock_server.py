@@ -0,0 +1,471 @@
+import argparse
+import json
+import random
+import time
+from collections import defaultdict, deque
+
+from autobahn.twisted.websocket import WebSocketServerFactory, WebSocketServerProtocol
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from twisted.web.resource import Resource
+from twisted.web.server import NOT_DONE_YET, Site
+
+from binance.log import get_logger
+from binance.recorder import read_records, RECORD_DEPTH_DIFF, RECORD_DEPTH_SNAPSHOT, RECORD_EXCHANGE_INFO
+
+# local stand in for the Binance REST API and websocket streams, for load and latency testing offline
+#   client = Client(None, None, base_url='http://127.0.0.1:8080')
+#   bm = BinanceSocketManager(client, stream_url='ws://127.0.0.1:9443/')
+#   api_lib.set_base_endpoint('http://127.0.0.1:8080')
+
+log = get_logger('mock_server')
+
+LISTEN_KEY = 'pqia91ma19a5s61cv6a81va65sdf19v8a65a1a5s61cv6a81va65sdf19v8a65a1'
+
+# (symbol, base asset, quote asset, starting mid price) of the synthetic books
+DEFAULT_SYMBOLS = [('ETHUSDT', 'ETH', 'USDT', 400.0), ('ETHBTC', 'ETH', 'BTC', 0.04),
+                   ('BTCUSDT', 'BTC', 'USDT', 10000.0)]
+
+
+def _format(value):
+    return '%.8f' % value
+
+
+class FaultConfig:
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit_probability=0.0, disconnect_probability=0.0,
+                 weight_limit=1200, seed=None):
+        # latency and jitter are seconds added to every REST response and websocket message,
+        # a websocket connection still delivers its messages in order, as the exchange does
+        # rate_limit_probability answers a REST request with a 429 at random
+        # disconnect_probability drops a websocket connection at random on each message
+        # weight_limit answers with 429 once the request weight of the current minute is used up
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.disconnect_probability = disconnect_probability
+        self.weight_limit = weight_limit
+        self.random = random.Random(seed)
+
+    def delay(self):
+        return self.latency + self.random.uniform(0.0, self.jitter)
+
+
+class SyntheticMarket:
+    def __init__(self, symbols=None, levels=20, tick_size=0.0001, seed=None):
+        # random walk order books on a relative price grid, one level per tick_size of the mid price
+        # symbols is a table of (symbol, base asset, quote asset, starting mid price), default DEFAULT_SYMBOLS
+        symbols = symbols or DEFAULT_SYMBOLS
+        self.prices = dict((symbol, price) for symbol, _, _, price in symbols)
+        self.assets = dict((symbol, (base, quote)) for symbol, base, quote, _ in symbols)
+        self.levels = levels
+        self.tick_size = tick_size
+        self.random = random.Random(seed)
+        self.update_ids = {}
+        self.books = {}
+        self._mid_ticks = {}
+        for symbol in self.prices:
+            self._mid_ticks[symbol] = 0
+            self.update_ids[symbol] = 1
+            self.books[symbol] = {'bids': {}, 'asks': {}}
+            self._rebuild(symbol)
+
+    def symbols(self):
+        return list(self.prices)
+
+    def _level_price(self, symbol, ticks):
+        return _format(self.prices[symbol] * (1.0 + ticks * self.tick_size))
+
+    def _rebuild(self, symbol):
+        # move the book to the current mid, returns the changed levels as depth diff entries
+        mid = self._mid_ticks[symbol]
+        book = self.books[symbol]
+        changes = {'bids': [], 'asks': []}
+        wanted = {'bids': set(self._level_price(symbol, mid - k) for k in range(1, self.levels + 1)),
+                  'asks': set(self._level_price(symbol, mid + k) for k in range(1, self.levels + 1))}
+        for side in ('bids', 'asks'):
+            for price in list(book[side]):
+                if price not in wanted[side]:
+                    del book[side][price]
+                    changes[side].append([price, _format(0.0), []])
+            for price in wanted[side]:
+                if price not in book[side]:
+                    book[side][price] = _format(self.random.uniform(0.1, 10.0))
+                    changes[side].append([price, book[side][price], []])
+            # a few resting levels change size every update
+            for price in self.random.sample(sorted(book[side]), min(2, len(book[side]))):
+                book[side][price] = _format(self.random.uniform(0.1, 10.0))
+                changes[side].append([price, book[side][price], []])
+        return changes
+
+    def tick(self):
+        # advance every symbol by one update, returns (symbol, depthUpdate event) pairs
+        events = []
+        for symbol in self.prices:
+            self._mid_ticks[symbol] += self.random.choice((-1, 0, 0, 1))
+            changes = self._rebuild(symbol)
+            first_update_id = self.update_ids[symbol] + 1
+            self.update_ids[symbol] = first_update_id
+            events.append((symbol, {'e': 'depthUpdate', 'E': int(time.time() * 1000), 's': symbol,
+                                    'U': first_update_id, 'u': first_update_id,
+                                    'b': changes['bids'], 'a': changes['asks']}))
+        return events
+
+    def exchange_info(self):
+        symbols = []
+        for symbol, (base, quote) in self.assets.items():
+            symbols.append({'symbol': symbol, 'status': 'TRADING', 'baseAsset': base, 'quoteAsset': quote,
+                            'filters': [{'filterType': 'PRICE_FILTER', 'minPrice': '0.00000100',
+                                         'maxPrice': '100000.00000000', 'tickSize': '0.00000100'},
+                                        {'filterType': 'LOT_SIZE', 'minQty': '0.00100000',
+                                         'maxQty': '100000.00000000', 'stepSize': '0.00100000'},
+                                        {'filterType': 'MIN_NOTIONAL', 'minNotional': '0.00100000'}]})
+        return {'timezone': 'UTC', 'serverTime': int(time.time() * 1000), 'rateLimits': [],
+                'exchangeFilters': [], 'symbols': symbols}
+
+
+class RecordedMarket(SyntheticMarket):
+    def __init__(self, path, loop=True, symbols=None):
+        # order books and depth diffs from a market data recording, one recorded update per tick
+        # the assets of each symbol come from the recorded exchange info, symbols is a table of
+        # (symbol, base asset, quote asset) for recordings made without it
+        self.path = path
+        self.loop = loop
+        self._exchange_info = None
+        self.assets = dict((symbol, (base, quote)) for symbol, base, quote in symbols or ())
+        self.records = []
+        for record in read_records(path):
+            if record.kind == RECORD_EXCHANGE_INFO:
+                self._exchange_info = json.loads(record.payload.decode('utf-8'))
+                for info in self._exchange_info.get('symbols', ()):
+                    self.assets[info['symbol']] = (info['baseAsset'], info['quoteAsset'])
+            elif record.kind in (RECORD_DEPTH_SNAPSHOT, RECORD_DEPTH_DIFF):
+                self.records.append(record)
+        self.position = 0
+        self.update_ids = {}
+        self.books = {}
+        self.prices = {}
+
+    def symbols(self):
+        return list(self.books)
+
+    def tick(self):
+        if self.position >= len(self.records):
+            if not self.loop:
+                return []
+            self.position = 0
+        record = self.records[self.position]
+        self.position += 1
+        msg = json.loads(record.payload.decode('utf-8'))
+        if isinstance(msg, dict) and 'data' in msg:
+            msg = msg['data']
+        if record.kind == RECORD_DEPTH_SNAPSHOT:
+            # replace the book and publish the difference as one update
+            symbol = record.stream.split('@')[0].upper()
+            old = self.books.get(symbol, {'bids': {}, 'asks': {}})
+            new = {'bids': dict((level[0], level[1]) for level in msg['bids']),
+                   'asks': dict((level[0], level[1]) for level in msg['asks'])}
+            changes = {}
+            for side in ('bids', 'asks'):
+                changes[side] = [[price, _format(0.0), []] for price in old[side] if price not in new[side]]
+                changes[side] += [[price, qty, []] for price, qty in new[side].items() if old[side].get(price) != qty]
+            self.books[symbol] = new
+            msg = {'e': 'depthUpdate', 's': symbol, 'b': changes['bids'], 'a': changes['asks']}
+        else:
+            symbol = msg['s']
+            book = self.books.setdefault(symbol, {'bids': {}, 'asks': {}})
+            for side, key in (('bids', 'b'), ('asks', 'a')):
+                for price, qty in ((level[0], level[1]) for level in msg[key]):
+                    if float(qty) == 0.0:
+                        book[side].pop(price, None)
+                    else:
+                        book[side][price] = qty
+        first_update_id = self.update_ids.get(symbol, 0) + 1
+        self.update_ids[symbol] = first_update_id
+        msg.update({'E': int(time.time() * 1000), 'U': first_update_id, 'u': first_update_id})
+        return [(symbol, msg)]
+
+    def exchange_info(self):
+        if self._exchange_info and self._exchange_info.get('symbols'):
+            return self._exchange_info
+        return super().exchange_info()
+
+
+class MockBinanceServer:
+    def __init__(self, market, faults=None, rest_port=8080, ws_port=9443, tick_interval=0.1,
+                 starting_balance=1000.0, interface='127.0.0.1'):
+        # serves the REST endpoints the client and model use and the depth, ticker and user streams
+        self.market = market
+        self.faults = faults or FaultConfig()
+        self.rest_port = rest_port
+        self.ws_port = ws_port
+        self.tick_interval = tick_interval
+        self.interface = interface
+        self.balances = defaultdict(lambda: starting_balance)
+        self.order_id = 0
+        self.subscribers = defaultdict(set)
+        self.weight_used = 0
+        self._weight_minute = int(time.time() // 60)
+        self._loop = None
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.messages = 0
+        self.disconnects = 0
+
+    @property
+    def base_url(self):
+        return 'http://%s:%d' % (self.interface, self.rest_port)
+
+    @property
+    def stream_url(self):
+        return 'ws://%s:%d/' % (self.interface, self.ws_port)
+
+    def listen(self):
+        # start serving on the reactor, call before or from within reactor.run()
+        reactor.listenTCP(self.rest_port, Site(_RestResource(self)), interface=self.interface)
+        factory = WebSocketServerFactory(self.stream_url)
+        factory.protocol = _StreamProtocol
+        factory.server = self
+        reactor.listenTCP(self.ws_port, factory, interface=self.interface)
+        self._loop = LoopingCall(self._tick)
+        self._loop.start(self.tick_interval, now=False)
+        log.info('mock_server_listening', base_url=self.base_url, stream_url=self.stream_url)
+
+    # REST
+
+    def use_weight(self, weight):
+        minute = int(time.time() // 60)
+        if minute != self._weight_minute:
+            self._weight_minute = minute
+            self.weight_used = 0
+        self.weight_used += weight
+        return self.weight_used <= self.faults.weight_limit
+
+    def handle(self, method, path, params):
+        # returns (status, body) for a REST request
+        if path.endswith('/ping'):
+            return 200, {}
+        if path.endswith('/time'):
+            return 200, {'serverTime': int(time.time() * 1000)}
+        if path.endswith('/exchangeInfo'):
+            return 200, self.market.exchange_info()
+        if path.endswith('/depth'):
+            return self._depth(params.get('symbol'), int(params.get('limit', 100)))
+        if path.endswith('/ticker/bookTicker') or path.endswith('/ticker/allBookTickers'):
+            return self._book_ticker(params.get('symbol'))
+        if path.endswith('/userDataStream'):
+            return 200, {'listenKey': LISTEN_KEY} if method == 'POST' else {}
+        if path.endswith('/account'):
+            return 200, {'makerCommission': 10, 'takerCommission': 10, 'canTrade': True,
+                         'balances': [{'asset': asset, 'free': _format(free), 'locked': _format(0.0)}
+                                      for asset, free in sorted(self.balances.items())]}
+        if path.endswith('/order') and method == 'POST':
+            return self._order(params)
+        return 404, {'code': -1000, 'msg': 'Unknown endpoint %s' % path}
+
+    def _sorted_book(self, symbol):
+        book = self.market.books.get(symbol)
+        if book is None:
+            return None
+        bids = sorted(book['bids'].items(), key=lambda level: float(level[0]), reverse=True)
+        asks = sorted(book['asks'].items(), key=lambda level: float(level[0]))
+        return bids, asks
+
+    def _depth(self, symbol, limit):
+        book = self._sorted_book(symbol)
+        if book is None:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        bids, asks = book
+        return 200, {'lastUpdateId': self.market.update_ids.get(symbol, 0),
+                     'bids': [[price, qty, []] for price, qty in bids[:limit]],
+                     'asks': [[price, qty, []] for price, qty in asks[:limit]]}
+
+    def _book_ticker(self, symbol):
+        tickers = []
+        for name in ([symbol] if symbol else self.market.symbols()):
+            book = self._sorted_book(name)
+            if book is None or not book[0] or not book[1]:
+                continue
+            bids, asks = book
+            tickers.append({'symbol': name, 'bidPrice': bids[0][0], 'bidQty': bids[0][1],
+                            'askPrice': asks[0][0], 'askQty': asks[0][1]})
+        if symbol:
+            return (200, tickers[0]) if tickers else (400, {'code': -1121, 'msg': 'Invalid symbol.'})
+        return 200, tickers
+
+    def _order(self, params):
+        # MARKET orders fill against the current book levels, no self impact is kept on the book
+        symbol = params.get('symbol')
+        book = self._sorted_book(symbol)
+        if book is None or symbol not in self.market.assets:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        base_asset, quote_asset = self.market.assets[symbol]
+        side = params.get('side')
+        remaining = float(params.get('quantity', 0))
+        levels = book[1] if side == 'BUY' else book[0]
+        fills = []
+        for price, qty in levels:
+            if remaining <= 0:
+                break
+            fill_qty = min(remaining, float(qty))
+            remaining -= fill_qty
+            fills.append({'price': price, 'qty': _format(fill_qty), 'commission': _format(0.0),
+                          'commissionAsset': 'BNB'})
+        executed = float(params.get('quantity', 0)) - remaining
+        quote = sum(float(fill['price']) * float(fill['qty']) for fill in fills)
+        if side == 'BUY':
+            self.balances[base_asset] += executed
+            self.balances[quote_asset] -= quote
+        else:
+            self.balances[base_asset] -= executed
+            self.balances[quote_asset] += quote
+
+        self.order_id += 1
+        now = int(time.time() * 1000)
+        order = {'symbol': symbol, 'orderId': self.order_id, 'clientOrderId': 'mock%d' % self.order_id,
+                 'transactTime': now}
+        resp_type = params.get('newOrderRespType', 'RESULT')
+        if resp_type in ('RESULT', 'FULL'):
+            order.update({'price': _format(0.0), 'origQty': params.get('quantity'), 'executedQty': _format(executed),
+                          'status': 'FILLED' if remaining <= 0 else 'EXPIRED', 'timeInForce': 'GTC',
+                          'type': params.get('type'), 'side': side})
+        if resp_type == 'FULL':
+            order['fills'] = fills
+
+        self._publish_user_events(symbol, side, params, executed, fills, now, base_asset, quote_asset)
+        return 200, order
+
+    def _publish_user_events(self, symbol, side, params, executed, fills, now, base_asset, quote_asset):
+        last_price = fills[-1]['price'] if fills else _format(0.0)
+        self.publish(LISTEN_KEY, {'e': 'executionReport', 'E': now, 's': symbol, 'c': 'mock%d' % self.order_id,
+                                  'S': side, 'o': params.get('type'), 'q': params.get('quantity'), 'p': '0',
+                                  'x': 'TRADE', 'X': 'FILLED', 'i': self.order_id, 'l': _format(executed),
+                                  'z': _format(executed), 'L': last_price, 'n': '0', 'N': 'BNB', 'T': now})
+        self.publish(LISTEN_KEY, {'e': 'outboundAccountInfo', 'E': now,
+                                  'B': [{'a': asset, 'f': _format(self.balances[asset]), 'l': _format(0.0)}
+                                        for asset in (base_asset, quote_asset)]})
+
+    # websockets
+
+    def _tick(self):
+        for symbol, event in self.market.tick():
+            self.publish(symbol.lower() + '@depth', event)
+            if event['b'] or event['a']:
+                ticker = self._book_ticker(symbol)[1]
+                if 'symbol' in ticker:
+                    self.publish(symbol.lower() + '@bookTicker',
+                                 {'u': event['u'], 's': symbol, 'b': ticker['bidPrice'], 'B': ticker['bidQty'],
+                                  'a': ticker['askPrice'], 'A': ticker['askQty']})
+
+    def publish(self, stream, event):
+        for protocol in list(self.subscribers.get(stream, ())):
+            protocol.send_event(stream, event)
+
+
+class _RestResource(Resource):
+    isLeaf = True
+
+    def __init__(self, server):
+        Resource.__init__(self)
+        self.server = server
+
+    def render(self, request):
+        server = self.server
+        server.requests += 1
+        method = request.method.decode('utf-8')
+        path = request.path.decode('utf-8')
+        params = dict((key.decode('utf-8'), values[-1].decode('utf-8')) for key, values in request.args.items())
+
+        weight = 5 if path.endswith('/account') else 1
+        if (server.faults.random.random() < server.faults.rate_limit_probability
+                or not server.use_weight(weight)):
+            server.rate_limited += 1
+            status, body = 429, {'code': -1003, 'msg': 'Too many requests.'}
+        else:
+            status, body = server.handle(method, path, params)
+
+        def respond():
+            request.setResponseCode(status)
+            request.setHeader(b'Content-Type', b'application/json')
+            request.setHeader(b'X-MBX-USED-WEIGHT', str(server.weight_used).encode('utf-8'))
+            request.write(json.dumps(body).encode('utf-8'))
+            request.finish()
+
+        reactor.callLater(server.faults.delay(), respond)
+        return NOT_DONE_YET
+
+
+class _StreamProtocol(WebSocketServerProtocol):
+    def onConnect(self, request):
+        # /ws/<stream> for a single stream, /stream?streams=<a>/<b> for a combined stream
+        # (send time, payload) of the delayed messages, in the order they were published
+        self.pending = deque()
+        self.combined = request.path.startswith('/stream')
+        if self.combined:
+            self.streams = request.params.get('streams', [''])[0].split('/')
+        else:
+            self.streams = [request.path[len('/ws/'):]]
+
+    def onOpen(self):
+        for stream in self.streams:
+            self.factory.server.subscribers[stream].add(self)
+
+    def onClose(self, wasClean, code, reason):
+        for stream in getattr(self, 'streams', ()):
+            self.factory.server.subscribers[stream].discard(self)
+        getattr(self, 'pending', deque()).clear()
+
+    def send_event(self, stream, event):
+        server = self.factory.server
+        faults = server.faults
+        if faults.random.random() < faults.disconnect_probability:
+            server.disconnects += 1
+            self.dropConnection(abort=True)
+            return
+        if self.combined:
+            event = {'stream': stream, 'data': event}
+        payload = json.dumps(event).encode('utf-8')
+        server.messages += 1
+        delay = faults.delay()
+        if not delay and not self.pending:
+            self.sendMessage(payload)
+            return
+        # the jitter delays the stream as a whole, a message never overtakes the one before it
+        send_time = reactor.seconds() + delay
+        if self.pending:
+            send_time = max(send_time, self.pending[-1][0])
+        self.pending.append((send_time, payload))
+        if len(self.pending) == 1:
+            reactor.callLater(delay, self._send_pending)
+
+    def _send_pending(self):
+        now = reactor.seconds()
+        while self.pending and self.pending[0][0] <= now:
+            self.sendMessage(self.pending.popleft()[1])
+        if self.pending:
+            reactor.callLater(self.pending[0][0] - now, self._send_pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock Binance REST and websocket server')
+    parser.add_argument('--recording', default=None, help='serve a market data recording instead of synthetic books')
+    parser.add_argument('--rest-port', type=int, default=8080)
+    parser.add_argument('--ws-port', type=int, default=9443)
+    parser.add_argument('--tick-interval', type=float, default=0.1, help='seconds between book updates')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response and message')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds up to this value')
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0)
+    parser.add_argument('--disconnect-probability', type=float, default=0.0)
+    parser.add_argument('--weight-limit', type=int, default=1200)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    market = RecordedMarket(args.recording) if args.recording else SyntheticMarket(seed=args.seed)
+    faults = FaultConfig(args.latency, args.jitter, args.rate_limit_probability, args.disconnect_probability,
+                         args.weight_limit, args.seed)
+    MockBinanceServer(market, faults, args.rest_port, args.ws_port, args.tick_interval).listen()
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import json
+import time
+from datetime import datetime
+
+from binance.client import Client
+from binance.depthcache import DepthCacheManager
+from binance.log import get_logger
+from binance.recorder import (read_records, RECORD_DEPTH_DIFF, RECORD_DEPTH_SNAPSHOT, RECORD_EXCHANGE_INFO,
+                              RECORD_WS_OTHER)
+from TriangularArbitrageModel import TriangularArbitrageModel
+
+log = get_logger('replay')
+
+
+class SimulatedClock:
+    # stands in for datetime in the model, time only moves when the replay sets it
+    def __init__(self, start=None):
+        self._now = start or datetime.fromtimestamp(0)
+
+    def now(self):
+        return self._now
+
+    def set_ns(self, timestamp_ns):
+        self._now = datetime.fromtimestamp(timestamp_ns / 1e9)
+
+
+class ReplayDriver:
+    def __init__(self, model, total_base_asset, profit_conditional, speed=None, paper_balances=None):
+        # feed recorded market data through the model's live code path
+        # speed=None replays as fast as possible, otherwise at speed times the recorded rate
+        # paper_balances executes the model's trades on a PaperClient holding those balances, matched against
+        # the replayed books, it starts once the model has the exchange info for the filters
+        self.model = model
+        self.total_base_asset = total_base_asset
+        self.profit_conditional = profit_conditional
+        self.speed = speed
+        self.paper_balances = paper_balances
+
+        self.clock = SimulatedClock()
+        self.model.clock = self.clock
+        self._clock_started = False
+
+        # depth diffs go through a depth cache manager per symbol, exactly as they do live
+        self.symbols = [model.pair_a_valid_name, model.pair_b_valid_name, model.pair_c_valid_name]
+        self.depth_cache_managers = {}
+        for symbol in self.symbols:
+            self.depth_cache_managers[symbol] = DepthCacheManager(model.client, symbol, self._depth_cache_update,
+                                                                  start=False)
+        # REST snapshots arrive one per pair, evaluate once all three books are refreshed
+        self._pending_snapshots = set()
+
+        self.records = 0
+        self.evaluations = 0
+        self.decisions = []
+        if self.model.exchangeInfo.get('symbols'):
+            self._start_paper_trading()
+
+    def run(self, path):
+        # replay one recording, returns a summary of the run
+        first_received = None
+        wall_start = time.perf_counter()
+        last_received = None
+        for record in read_records(path):
+            if first_received is None:
+                first_received = record.received
+            last_received = record.received
+            if self.speed:
+                # hold back until the recorded offset, scaled by speed, has elapsed
+                delay = (record.received - first_received) / 1e9 / self.speed - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self._set_clock(record.received)
+            self.records += 1
+            self._dispatch(record)
+
+        wall_seconds = time.perf_counter() - wall_start
+        recorded_seconds = (last_received - first_received) / 1e9 if first_received is not None else 0.0
+        summary = {
+            'records': self.records,
+            'evaluations': self.evaluations,
+            'decisions': len(self.decisions),
+            'recorded_seconds': recorded_seconds,
+            'wall_seconds': wall_seconds,
+            'speedup': recorded_seconds / wall_seconds if wall_seconds else None,
+        }
+        log.info('replay_complete', path=path, **summary)
+        return summary
+
+    def _set_clock(self, received):
+        self.clock.set_ns(received)
+        if not self._clock_started:
+            # the model was built on the system clock, let it trade from the start of the recording
+            self.model.last_trade_time = self.clock.now() - self.model.debounce
+            self._clock_started = True
+
+    def _dispatch(self, record):
+        if record.kind == RECORD_EXCHANGE_INFO:
+            self.model.exchangeInfo = self.model.update_exchange_info(json.loads(record.payload.decode('utf-8')))
+            self._start_paper_trading()
+        elif record.kind == RECORD_DEPTH_SNAPSHOT:
+            self._snapshot(record.stream, json.loads(record.payload.decode('utf-8')))
+        elif record.kind in (RECORD_DEPTH_DIFF, RECORD_WS_OTHER):
+            msg = json.loads(record.payload.decode('utf-8'))
+            # combined streams wrap the event in a data field
+            if isinstance(msg, dict) and 'data' in msg:
+                msg = msg['data']
+            if isinstance(msg, dict) and msg.get('e') == 'depthUpdate' and msg['s'] in self.depth_cache_managers:
+                self.depth_cache_managers[msg['s']]._depth_event(msg)
+
+    def _snapshot(self, stream, snapshot):
+        if stream in self.depth_cache_managers:
+            # REST depth snapshot from update_order_books
+            self.depth_cache_managers[stream].apply_snapshot(snapshot)
+            self.model.set_order_book(stream, snapshot)
+            self._pending_snapshots.add(stream)
+            if len(self._pending_snapshots) == len(self.symbols):
+                self._pending_snapshots = set()
+                self._evaluate()
+            return
+        symbol = stream.split('@')[0].upper()
+        if symbol not in self.depth_cache_managers:
+            return
+        self.model.set_order_book(symbol, snapshot)
+        if stream.endswith('@depth'):
+            # a depth cache initialising, live only evaluates on its depth events
+            self.depth_cache_managers[symbol].apply_snapshot(snapshot)
+        elif self._books_ready():
+            # partial book depth stream e.g. ethbtc@depth5
+            self._evaluate()
+
+    def _depth_cache_update(self, depth_cache):
+        self.model.set_order_book(depth_cache._symbol, {'bids': depth_cache.get_bids(),
+                                                        'asks': depth_cache.get_asks()})
+        if self._books_ready():
+            self._evaluate()
+
+    def _start_paper_trading(self):
+        if self.paper_balances is not None and not self.model.execute_trades:
+            self.model.start_paper_trading(self.paper_balances)
+
+    def _books_ready(self):
+        # as live, nothing is evaluated until every book of the triangle has arrived
+        return all(self.model.get_order_book(symbol) for symbol in self.symbols)
+
+    def _evaluate(self):
+        self.evaluations += 1
+        if self.model.evaluate(self.total_base_asset, self.profit_conditional):
+            self.decisions.append((self.clock.now(), self.model.implicit_profit))
+
+
+def replay_model(path, base_asset, quote_asset, tertiary_asset, total_base_asset, profit_conditional,
+                 exchange_info=None, speed=None, paper_balances=None, **model_params):
+    # build an offline model for the triangle and replay a recording through it
+    # model_params override model attributes such as debounce or implicit_rolling_window
+    # paper_balances trades the model's decisions on a PaperClient, see ReplayDriver
+    client = Client(None, None, ping=False)
+    model = TriangularArbitrageModel(base_asset, quote_asset, tertiary_asset, client=client,
+                                     exchange_info=exchange_info or {'symbols': []})
+    for name, value in model_params.items():
+        setattr(model, name, value)
+    driver = ReplayDriver(model, total_base_asset, profit_conditional, speed, paper_balances)
+    return driver, driver.run(path)
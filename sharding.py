@@ -0,0 +1,306 @@
+import argparse
+import heapq
+import itertools
+import math
+import multiprocessing
+import queue
+import time
+
+from binance.log import WARNING, set_level
+
+# one model per triangle, scanned across worker processes
+#   scanner = ShardedScanner(exchange_info, find_triangles(exchange_info, ['USDT']), shards=4,
+#                            total_base_asset=50.0, profit_conditional=50.04)
+#   scanner.start()
+#   scanner.publish('ETHBTC', order_book)   # from a depth cache callback, a book bus or a replay
+#   for opportunity in scanner.opportunities():
+#       ...
+# a shard only receives the books of its own symbols, opportunities from every shard merge into one ranked stream
+
+
+def find_triangles(exchange_info, base_assets=None):
+    # every (base, quote, tertiary) asset cycle whose three pairs trade, in both directions
+    # base_assets limits the cycles to ones starting and ending in those assets
+    pairs = set()
+    assets = set()
+    for symbol in exchange_info['symbols']:
+        if symbol.get('status', 'TRADING') != 'TRADING':
+            continue
+        pairs.add(frozenset((symbol['baseAsset'], symbol['quoteAsset'])))
+        assets.update((symbol['baseAsset'], symbol['quoteAsset']))
+    neighbours = dict((asset, set()) for asset in assets)
+    for pair in pairs:
+        a, b = tuple(pair)
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    triangles = []
+    for base in sorted(base_assets or assets):
+        for quote in sorted(neighbours.get(base, ())):
+            for tertiary in sorted(neighbours[quote] & neighbours[base]):
+                if tertiary != base:
+                    triangles.append((base, quote, tertiary))
+    return triangles
+
+
+def triangle_symbols(triangle, pair_names):
+    base, quote, tertiary = triangle
+    return frozenset((pair_names[(base, quote)], pair_names[(quote, tertiary)], pair_names[(tertiary, base)]))
+
+
+def partition_triangles(triangles, shards, pair_names):
+    # greedy partition that keeps triangles sharing symbols together, so each book update goes to as few
+    # shards as possible, while capping every shard at its even share of the triangles
+    capacity = int(math.ceil(len(triangles) / float(shards)))
+    # both directions of a cycle trade the same symbols, so triangles are placed in groups of one symbol set
+    groups = {}
+    for triangle in triangles:
+        groups.setdefault(triangle_symbols(triangle, pair_names), []).append(triangle)
+    counts = {}
+    for symbols, group in groups.items():
+        for symbol in symbols:
+            counts[symbol] = counts.get(symbol, 0) + len(group)
+    # rarest symbols first, they are the ones worth keeping together, while hub symbols such as BTCUSDT
+    # end up on every shard whatever the partition, ties by name keep the groups of one asset adjacent
+    ordered = sorted(groups, key=lambda symbols: (sorted(counts[s] for s in symbols), sorted(symbols)))
+
+    partitions = [[] for _ in range(shards)]
+    shard_symbols = [set() for _ in range(shards)]
+    for symbols in ordered:
+        group = groups[symbols]
+        best = None
+        for i in range(shards):
+            if len(partitions[i]) + len(group) > capacity and partitions[i]:
+                continue
+            # most shared symbols weighted by rarity, then the emptiest shard
+            key = (sum(1.0 / counts[s] for s in symbols & shard_symbols[i]), -len(partitions[i]))
+            if best is None or key > best[0]:
+                best = (key, i)
+        if best is None:
+            # no shard has room for the whole group, take the emptiest
+            best = (None, min(range(shards), key=lambda i: len(partitions[i])))
+        partitions[best[1]].extend(group)
+        shard_symbols[best[1]].update(symbols)
+    return [partition for partition in partitions if partition]
+
+
+def run_shard(shard_id, exchange_info, triangles, total_base_asset, profit_conditional, model_params, inbox, results):
+    # worker process: one model per triangle, evaluated whenever one of its books changes
+    from binance.client import Client
+    from TriangularArbitrageModel import TriangularArbitrageModel, register_pairs
+
+    set_level(WARNING)
+    register_pairs(exchange_info)
+    client = Client(None, None, ping=False)
+    models_by_symbol = {}
+    for triangle in triangles:
+        model = TriangularArbitrageModel(triangle[0], triangle[1], triangle[2], client=client,
+                                         exchange_info=exchange_info)
+        for name, value in model_params.items():
+            setattr(model, name, value)
+        for symbol in (model.pair_a_valid_name, model.pair_b_valid_name, model.pair_c_valid_name):
+            models_by_symbol.setdefault(symbol, []).append(model)
+    results.put(('ready', shard_id, 0))
+
+    evaluations = 0
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        # the coordinator batches updates, only the latest book per symbol matters
+        updated = set()
+        for symbol, order_book in message:
+            for model in models_by_symbol.get(symbol, ()):
+                model.set_order_book(symbol, order_book)
+                updated.add(model)
+        for model in updated:
+            if not (model.pair_a_order_book and model.pair_b_order_book and model.pair_c_order_book):
+                continue
+            evaluations += 1
+            if model.evaluate(total_base_asset, profit_conditional):
+                results.put((model.implicit_profit, (model.base_asset, model.quote_asset, model.tertiary_asset),
+                             time.time(), shard_id))
+    results.put(('done', shard_id, evaluations))
+
+
+class ShardedScanner(object):
+    def __init__(self, exchange_info, triangles, shards=None, total_base_asset=50.0, profit_conditional=50.04,
+                 batch_size=64, max_delay=0.002, **model_params):
+        # model_params override model attributes such as debounce or implicit_rolling_window
+        # a shard's batch is sent once it holds batch_size updates or its oldest update is max_delay seconds old,
+        # max_delay=0 sends every update straight away
+        from TriangularArbitrageModel import register_pairs, valid_pair_name
+
+        register_pairs(exchange_info)
+        self.exchange_info = exchange_info
+        self.total_base_asset = total_base_asset
+        self.profit_conditional = profit_conditional
+        self.model_params = model_params
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.partitions = partition_triangles(triangles, shards or multiprocessing.cpu_count(), valid_pair_name)
+
+        # the shards every symbol has to be sent to
+        self.routes = {}
+        for shard_id, partition in enumerate(self.partitions):
+            for triangle in partition:
+                for symbol in triangle_symbols(triangle, valid_pair_name):
+                    routes = self.routes.setdefault(symbol, [])
+                    if shard_id not in routes:
+                        routes.append(shard_id)
+
+        self._inboxes = []
+        self._pending = []
+        self._published = []
+        # perf_counter of the oldest update in each shard's batch, None while it is empty
+        self._oldest = []
+        self._processes = []
+        self._results = multiprocessing.Queue()
+        self.evaluations = 0
+
+    def start(self):
+        for shard_id, partition in enumerate(self.partitions):
+            inbox = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run_shard,
+                                              args=(shard_id, self.exchange_info, partition, self.total_base_asset,
+                                                    self.profit_conditional, self.model_params, inbox, self._results))
+            process.daemon = True
+            process.start()
+            self._inboxes.append(inbox)
+            self._pending.append({})
+            self._published.append(0)
+            self._oldest.append(None)
+            self._processes.append(process)
+        # wait for every shard to build its models, so nothing published is queued behind the startup
+        ready = 0
+        while ready < len(self._processes):
+            if self._results.get()[0] == 'ready':
+                ready += 1
+
+    def publish(self, symbol, order_book):
+        # route a book to the shards trading the symbol, batched to save queue round trips
+        # a batch keeps only the latest book of each symbol
+        now = time.perf_counter()
+        for shard_id in self.routes.get(symbol, ()):
+            self._pending[shard_id][symbol] = order_book
+            self._published[shard_id] += 1
+            if self._oldest[shard_id] is None:
+                self._oldest[shard_id] = now
+            if self._published[shard_id] >= self.batch_size:
+                self._send(shard_id)
+        self.flush_overdue(now)
+
+    def flush_overdue(self, now=None):
+        # send the batches whose oldest update has waited max_delay, so a quiet shard's books do not go stale,
+        # called by publish and opportunities, call it when publishing stops for a while
+        now = time.perf_counter() if now is None else now
+        for shard_id, oldest in enumerate(self._oldest):
+            if oldest is not None and now - oldest >= self.max_delay:
+                self._send(shard_id)
+
+    def flush(self):
+        for shard_id in range(len(self._inboxes)):
+            self._send(shard_id)
+
+    def _send(self, shard_id):
+        if self._pending[shard_id]:
+            self._inboxes[shard_id].put(list(self._pending[shard_id].items()))
+            self._pending[shard_id] = {}
+        self._published[shard_id] = 0
+        self._oldest[shard_id] = None
+
+    def opportunities(self, timeout=0.0):
+        # every opportunity the shards reported since the last call, best implicit profit first
+        self.flush_overdue()
+        found = []
+        while True:
+            try:
+                result = self._results.get(timeout=timeout) if timeout else self._results.get_nowait()
+            except queue.Empty:
+                break
+            timeout = 0.0
+            if result[0] == 'done':
+                self.evaluations += result[2]
+                continue
+            implicit_profit, triangle, found_time, shard_id = result
+            heapq.heappush(found, (-implicit_profit, found_time, triangle, shard_id))
+        return [{'implicit_profit': -profit, 'triangle': triangle, 'time': found_time, 'shard': shard_id}
+                for profit, found_time, triangle, shard_id in (heapq.heappop(found) for _ in range(len(found)))]
+
+    def stop(self):
+        # flush, stop every shard and return the opportunities still queued
+        self.flush()
+        for inbox in self._inboxes:
+            inbox.put(None)
+        done = 0
+        found = []
+        while done < len(self._processes):
+            result = self._results.get()
+            if result[0] == 'done':
+                self.evaluations += result[2]
+                done += 1
+            else:
+                found.append({'implicit_profit': result[0], 'triangle': result[1], 'time': result[2],
+                              'shard': result[3]})
+        for process in self._processes:
+            process.join()
+        return sorted(found, key=lambda opportunity: -opportunity['implicit_profit'])
+
+
+def synthetic_market(assets=30, levels=20, seed=1):
+    # exchange info and books for assets traded against BTC, ETH and USDT, to benchmark the sharding
+    import random
+
+    rng = random.Random(seed)
+    prices = {'BTC': 10000.0, 'ETH': 400.0, 'USDT': 1.0}
+    for i in range(assets):
+        prices['A%02d' % i] = 0.1 + rng.random() * 50
+    symbols = []
+    for base in sorted(prices):
+        for quote in ('BTC', 'ETH', 'USDT'):
+            if base == quote or (base, quote) in (('BTC', 'ETH'), ('USDT', 'BTC'), ('USDT', 'ETH')):
+                continue
+            symbols.append({'symbol': base + quote, 'status': 'TRADING', 'baseAsset': base, 'quoteAsset': quote,
+                            'filters': [{'filterType': 'PRICE_FILTER', 'minPrice': '0.00000001', 'maxPrice': '100000',
+                                         'tickSize': '0.00000001'},
+                                        {'filterType': 'LOT_SIZE', 'minQty': '0.001', 'maxQty': '100000',
+                                         'stepSize': '0.001'}]})
+    books = {}
+    for symbol in symbols:
+        mid = prices[symbol['baseAsset']] / prices[symbol['quoteAsset']]
+        books[symbol['symbol']] = {
+            'bids': [['%.8f' % (mid * (1 - 0.0005 * k)), '%.8f' % (1000 + rng.random())] for k in range(1, levels + 1)],
+            'asks': [['%.8f' % (mid * (1 + 0.0005 * k)), '%.8f' % (1000 + rng.random())] for k in range(1, levels + 1)],
+        }
+    return {'symbols': symbols}, books
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure book update throughput across shards')
+    parser.add_argument('--assets', type=int, default=30, help='synthetic assets traded against BTC, ETH and USDT')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--updates', type=int, default=20000, help='book updates to publish')
+    args = parser.parse_args()
+
+    exchange_info, books = synthetic_market(args.assets)
+    triangles = find_triangles(exchange_info, ['USDT'])
+    symbols = sorted(books)
+    baseline = None
+    for shards in args.shards:
+        scanner = ShardedScanner(exchange_info, triangles, shards)
+        scanner.start()
+        start = time.perf_counter()
+        for symbol in itertools.islice(itertools.cycle(symbols), args.updates):
+            scanner.publish(symbol, books[symbol])
+        scanner.stop()
+        seconds = time.perf_counter() - start
+        # batches coalesce a different share of the updates at every shard count, so the evaluations they
+        # cost are not comparable, the updates published until every shard has caught up are
+        rate = args.updates / seconds
+        baseline = baseline or rate
+        print('%2d shards %4d triangles %10.0f updates/s %5.2fx %8d evaluations' % (
+            len(scanner.partitions), len(triangles), rate, rate / baseline, scanner.evaluations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import itertools
+import multiprocessing
+import sys
+from datetime import timedelta
+
+from binance.latency import tracer
+from binance.log import WARNING, set_level
+
+# the hand tuned values from live_implicit_profit.py and TriangularArbitrageModel
+DEFAULT_GRID = {
+    'trade_amount': [50.0],
+    'profit_threshold': [0.02, 0.04, 0.08],
+    'implicit_rolling_window': [5, 10, 20],
+    'live_window': [60],
+    'debounce': [1, 10],
+    'trade_fee': [0.0005],
+}
+
+# the paper account of a job starts with this many trade amounts of the base asset, so every decision is
+# traded instead of the account running out after a few losing ones
+PAPER_TRADE_AMOUNTS = 100
+
+RESULT_FIELDS = ['trade_amount', 'profit_threshold', 'implicit_rolling_window', 'live_window', 'debounce',
+                 'trade_fee', 'partitions', 'evaluations', 'opportunities', 'failed_trades', 'pnl',
+                 'pnl_per_opportunity', 'predicted_pnl', 'evaluation_p50_us', 'evaluation_p99_us', 'speedup']
+
+
+def expand_grid(grid):
+    # every combination of the grid values as a list of parameter dicts
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_job(job):
+    # replay one partition with one parameter set, runs in a worker process
+    # the decisions are traded on a paper client against the replayed books
+    from replay import replay_model
+
+    params, path, triangle = job
+    set_level(WARNING)
+    tracer.reset()
+    trade_amount = params['trade_amount']
+    balance = trade_amount * PAPER_TRADE_AMOUNTS
+    driver, summary = replay_model(path, triangle[0], triangle[1], triangle[2],
+                                   total_base_asset=trade_amount,
+                                   profit_conditional=trade_amount + params['profit_threshold'],
+                                   paper_balances={triangle[0]: balance},
+                                   implicit_rolling_window=params['implicit_rolling_window'],
+                                   live_window=params['live_window'],
+                                   debounce=timedelta(seconds=params['debounce']),
+                                   trade_fee=params['trade_fee'])
+
+    model = driver.model
+    # realised pnl is the change in the base asset, what a leg failing or rounding down leaves in the
+    # other assets is not counted, predicted pnl is what the model expected of the same decisions
+    pnl = model.client.get_balance(triangle[0]) - balance if model.execute_trades else 0.0
+    predicted_pnl = sum(implicit_profit - trade_amount for _, implicit_profit in driver.decisions)
+    evaluation = tracer.get_histogram('fill_simulation')
+    return {
+        'params': params,
+        'path': path,
+        'evaluations': summary['evaluations'],
+        'opportunities': len(driver.decisions),
+        'failed_trades': len(model.failed_trades),
+        'pnl': pnl,
+        'predicted_pnl': predicted_pnl,
+        'evaluation_p50_us': evaluation.percentile(50) if evaluation else None,
+        'evaluation_p99_us': evaluation.percentile(99) if evaluation else None,
+        'speedup': summary['speedup'],
+    }
+
+
+def merge_results(results):
+    # one row per parameter set, summed over the partitions
+    rows = {}
+    for result in results:
+        key = tuple(sorted(result['params'].items()))
+        row = rows.get(key)
+        if row is None:
+            row = dict(result['params'])
+            row.update({'partitions': 0, 'evaluations': 0, 'opportunities': 0, 'failed_trades': 0, 'pnl': 0.0,
+                        'predicted_pnl': 0.0, 'evaluation_p50_us': None, 'evaluation_p99_us': None,
+                        'speedup': None})
+            rows[key] = row
+        row['partitions'] += 1
+        for field in ('evaluations', 'opportunities', 'failed_trades', 'pnl', 'predicted_pnl'):
+            row[field] += result[field]
+        # percentiles can not be summed, report the worst partition
+        for field in ('evaluation_p50_us', 'evaluation_p99_us'):
+            if result[field] is not None:
+                row[field] = max(row[field] or 0, result[field])
+        if result['speedup'] is not None:
+            row['speedup'] = min(row['speedup'] or result['speedup'], result['speedup'])
+    for row in rows.values():
+        row['pnl_per_opportunity'] = row['pnl'] / row['opportunities'] if row['opportunities'] else 0.0
+    return sorted(rows.values(), key=lambda row: row['pnl'], reverse=True)
+
+
+def run_sweep(paths, grid=None, triangle=('USDT', 'ETH', 'BTC'), processes=None):
+    # fan every parameter set and partition out across a process pool
+    # each recording in paths is one partition, e.g. one recording per day
+    jobs = [(params, path, triangle) for params in expand_grid(grid or DEFAULT_GRID) for path in paths]
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = list(pool.imap_unordered(run_job, jobs, chunksize=1))
+    finally:
+        pool.close()
+        pool.join()
+    return merge_results(results)
+
+
+def write_table(rows, stream):
+    writer = csv.DictWriter(stream, RESULT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep model parameters over recorded market data')
+    parser.add_argument('recordings', nargs='+', help='market data recordings, one per partition')
+    parser.add_argument('--triangle', default='USDT,ETH,BTC', help='base,quote,tertiary assets')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, default every core')
+    parser.add_argument('--output', default=None, help='csv file for the results, default stdout')
+    args = parser.parse_args()
+
+    rows = run_sweep(args.recordings, triangle=tuple(args.triangle.split(',')), processes=args.processes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            write_table(rows, f)
+    else:
+        write_table(rows, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
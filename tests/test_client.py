@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+
+from binance.client import Client
+
+
+def test_time_sync_survives_unexpected_errors():
+    client = Client(None, None, ping=False)
+    calls = []
+    refreshed = threading.Event()
+
+    def sync_server_time(samples):
+        calls.append(samples)
+        if len(calls) == 3:
+            refreshed.set()
+        raise ValueError('bad body')
+
+    client.sync_server_time = sync_server_time
+    client.start_time_sync(interval=0.01, delay=0)
+    assert refreshed.wait(5)
+    client.stop_time_sync()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import gc
+import weakref
+
+from binance.depthcache import DEPTH_CACHE_LEVELS, DepthCacheManager
+
+SNAPSHOT = {'lastUpdateId': 1, 'bids': [['0.0500', '1.0'], ['0.0499', '2.0']], 'asks': [['0.0501', '1.0']]}
+
+
+def _levels():
+    return [line for line in DEPTH_CACHE_LEVELS.expose() if line.startswith('binance_depth_cache_levels{')]
+
+
+def test_close_removes_the_level_gauges():
+    manager = DepthCacheManager(None, 'LVLBTC', None, start=False)
+    manager.apply_snapshot(SNAPSHOT)
+    assert 'binance_depth_cache_levels{symbol="LVLBTC",side="bids"} 2' in _levels()
+    assert 'binance_depth_cache_levels{symbol="LVLBTC",side="asks"} 1' in _levels()
+
+    manager.close()
+    assert not [line for line in _levels() if 'LVLBTC' in line]
+
+
+def test_close_keeps_the_gauges_of_a_newer_manager():
+    old = DepthCacheManager(None, 'NEWBTC', None, start=False)
+    new = DepthCacheManager(None, 'NEWBTC', None, start=False)
+    new.apply_snapshot(SNAPSHOT)
+    old.close()
+    assert 'binance_depth_cache_levels{symbol="NEWBTC",side="bids"} 2' in _levels()
+    new.close()
+
+
+def test_gauges_do_not_keep_the_manager_alive():
+    manager = DepthCacheManager(None, 'GCBTC', None, start=False)
+    ref = weakref.ref(manager)
+    del manager
+    gc.collect()
+    assert ref() is None
+    assert 'binance_depth_cache_levels{symbol="GCBTC",side="bids"} 0' in _levels()
+    DEPTH_CACHE_LEVELS.remove('GCBTC', 'bids')
+    DEPTH_CACHE_LEVELS.remove('GCBTC', 'asks')
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+
+import pytest
+
+from binance.hedging import HedgePolicy
+
+
+def _reserve(weight, max_weight):
+    return True
+
+
+def test_fast_primary_runs_on_the_calling_thread():
+    policy = HedgePolicy(initial_delay=0.05)
+    threads = []
+
+    def send():
+        threads.append(threading.current_thread())
+        return 'response'
+
+    before = set(threading.enumerate())
+    assert policy.run('depth', 1, send, _reserve) == 'response'
+    time.sleep(0.1)
+    assert threads == [threading.main_thread()]
+    # only the shared timer thread was started
+    assert set(threading.enumerate()) - before == set([policy._timer._thread])
+    assert policy.report()['depth']['hedges'] == 0
+
+
+def test_failed_primary_is_answered_by_the_hedge():
+    policy = HedgePolicy(initial_delay=0.01, min_delay=0.01)
+    calls = []
+
+    def send():
+        calls.append(threading.current_thread())
+        if len(calls) == 1:
+            time.sleep(0.05)
+            raise IOError('reset')
+        return 'hedged'
+
+    assert policy.run('depth', 1, send, _reserve) == 'hedged'
+    assert calls[0] is threading.main_thread() and calls[1] is not threading.main_thread()
+    report = policy.report()['depth']
+    assert report['hedges'] == 1 and report['wins'] == 1
+
+
+def test_hedge_is_skipped_over_the_weight_budget():
+    policy = HedgePolicy(initial_delay=0.01, min_delay=0.01)
+
+    def send():
+        time.sleep(0.05)
+        raise IOError('reset')
+
+    with pytest.raises(IOError):
+        policy.run('depth', 1, send, lambda weight, max_weight: False)
+    report = policy.report()['depth']
+    assert report['hedges'] == 0 and report['skipped'] == 1
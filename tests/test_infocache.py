@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import time
+
+from binance.infocache import CACHE_VERSION, ExchangeInfoCache
+
+from TriangularArbitrageModel import TriangularArbitrageModel
+
+
+def _exchange_info(step_size):
+    return {'symbols': [{'symbol': symbol, 'status': 'TRADING', 'baseAsset': base_asset, 'quoteAsset': quote_asset,
+                         'filters': [{'filterType': 'LOT_SIZE', 'minQty': step_size, 'maxQty': '1000.00000000',
+                                      'stepSize': step_size}]}
+                        for symbol, base_asset, quote_asset in (('ETHUSDT', 'ETH', 'USDT'), ('ETHBTC', 'ETH', 'BTC'),
+                                                                ('BTCUSDT', 'BTC', 'USDT'))]}
+
+
+class _Client(object):
+
+    API_URL = 'https://api.binance.com/api'
+
+    def __init__(self, exchange_info):
+        self.exchange_info = exchange_info
+        self.calls = 0
+
+    def get_exchange_info(self):
+        self.calls += 1
+        return self.exchange_info
+
+
+def _write_cache(path, exchange_info, fetched):
+    with open(str(path), 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'api_url': _Client.API_URL, 'fetched': fetched,
+                   'exchange_info': exchange_info}, f)
+
+
+def test_revalidation_is_applied_after_the_cached_copy(tmp_path):
+    path = tmp_path / 'exchange_info.json'
+    _write_cache(path, _exchange_info('0.00100000'), time.time())
+    fresh = _exchange_info('0.00010000')
+    client = _Client(fresh)
+
+    model = TriangularArbitrageModel('USDT', 'ETH', 'BTC', client=client, exchange_info_cache=str(path))
+    model.exchange_info_cache.wait(5)
+
+    assert client.calls == 1
+    assert model.exchangeInfo is fresh
+    assert str(model.pair_a_lot_size.step) == '0.00010000'
+
+
+def test_stale_cache_is_fetched_before_use(tmp_path):
+    path = tmp_path / 'exchange_info.json'
+    _write_cache(path, _exchange_info('0.00100000'), 0)
+    fresh = _exchange_info('0.00010000')
+    updates = []
+
+    assert ExchangeInfoCache(str(path), _Client(fresh)).load(updates.append) is fresh
+    assert updates == [fresh]
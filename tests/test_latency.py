@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+
+from binance.latency import LatencyTracer
+
+
+def test_spans_recorded_from_many_threads_are_all_counted():
+    tracer = LatencyTracer()
+
+    def record():
+        for i in range(5000):
+            tracer.record('decision', (i % 100) / 1e6)
+            tracer.record('stage_%d' % (i % 7), 0.001)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = tracer.report()
+    assert report['decision']['count'] == 40000
+    assert report['decision']['min'] == 0 and report['decision']['max'] == 99
+    assert sum(report['stage_%d' % i]['count'] for i in range(7)) == 40000
+
+
+def test_get_histogram_is_a_copy():
+    tracer = LatencyTracer()
+    tracer.record('sign', 0.00005)
+    histogram = tracer.get_histogram('sign')
+    tracer.record('sign', 0.00005)
+    assert histogram.count == 1 and histogram.percentile(50) == 50
+    assert tracer.get_histogram('sign').count == 2
+    assert tracer.get_histogram('submit_ack') is None
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+
+from binance import ledger as ledger_module
+from binance.ledger import AccountLedger, AccountLedgerManager
+
+
+def _execution_report(order_id, status):
+    return {
+        'e': 'executionReport', 'E': 1499405658658, 'i': order_id, 's': 'ETHBTC', 'c': 'client%d' % order_id,
+        'S': 'BUY', 'o': 'MARKET', 'X': status, 'q': '1.0', 'z': '1.0', 'L': '0.05', 'n': '0.001', 'N': 'ETH',
+    }
+
+
+def test_finished_orders_are_pruned_after_the_retention():
+    ledger = AccountLedger(order_retention=0.05)
+    ledger.update_order(_execution_report(1, 'FILLED'))
+    ledger.update_order(_execution_report(2, 'NEW'))
+    assert ledger.get_order(1)['status'] == 'FILLED'
+
+    time.sleep(0.1)
+    ledger.update_order(_execution_report(3, 'CANCELED'))
+    assert ledger.get_order(1) is None
+    # open orders are kept however old they are
+    assert ledger.get_order(2)['status'] == 'NEW'
+    assert ledger.get_order(3)['status'] == 'CANCELED'
+
+
+def test_reopened_order_is_not_pruned():
+    ledger = AccountLedger(order_retention=0)
+    ledger.update_order(_execution_report(1, 'EXPIRED'))
+    assert ledger.get_order(1) is None
+    ledger.update_order(_execution_report(2, 'FILLED'))
+    ledger.update_order(_execution_report(2, 'PARTIALLY_FILLED'))
+    ledger.update_order(_execution_report(3, 'NEW'))
+    assert ledger.get_order(2)['status'] == 'PARTIALLY_FILLED'
+
+
+class _Client(object):
+
+    def __init__(self, manager=None):
+        self.manager = manager
+        self.accounts = 0
+
+    def get_account(self, **params):
+        self.accounts += 1
+        # the stream delivers a BTC update while the request is in flight
+        self.manager._user_event({'e': 'outboundAccountPosition', 'B': [{'a': 'BTC', 'f': '2.0', 'l': '0.5'}]})
+        return {'balances': [{'asset': 'BTC', 'free': '1.0', 'locked': '0.0'},
+                             {'asset': 'ETH', 'free': '3.0', 'locked': '0.0'}]}
+
+
+def test_reconcile_keeps_balances_streamed_while_in_flight():
+    manager = AccountLedgerManager.__new__(AccountLedgerManager)
+    manager._client = _Client(manager)
+    manager._callback = None
+    manager._recv_window = None
+    manager._ledger = AccountLedger()
+    manager._buffered = None
+    manager._buffer_lock = threading.Lock()
+    manager._ledger.set_balance('ETH', '5.0')
+
+    manager.reconcile()
+    ledger = manager.get_ledger()
+    assert ledger.get_balances() == {'BTC': (2.0, 0.5), 'ETH': (3.0, 0.0)}
+
+
+class _SocketManager(object):
+
+    def __init__(self, client, stream_url=None):
+        self.started = False
+
+    def start_user_socket(self, callback, connect_callback=None):
+        self.callback = callback
+        self.connect_callback = connect_callback
+
+    def start(self):
+        self.started = True
+
+
+def test_events_before_the_first_connect_are_buffered_until_reconciled(monkeypatch):
+    monkeypatch.setattr(ledger_module, 'BinanceSocketManager', _SocketManager)
+    client = _Client()
+    updates = []
+    manager = AccountLedgerManager(client, callback=updates.append)
+    client.manager = manager
+    # the socket is open before any REST call
+    assert manager._bm.started
+    assert client.accounts == 0
+
+    # a balance older than the snapshot and an order, both received before the reconcile is sent
+    manager._bm.callback({'e': 'outboundAccountPosition', 'B': [{'a': 'ETH', 'f': '9.0', 'l': '0.0'}]})
+    manager._bm.callback(_execution_report(1, 'NEW'))
+    assert manager.get_ledger().get_balances() == {}
+    assert updates == []
+
+    manager._bm.connect_callback()
+    assert manager.wait_ready(5)
+    assert client.accounts == 1
+    ledger = manager.get_ledger()
+    # the snapshot replaces the stale ETH balance, the BTC update sent while it was in flight is kept
+    assert ledger.get_balances() == {'BTC': (2.0, 0.5), 'ETH': (3.0, 0.0)}
+    assert ledger.get_order(1)['status'] == 'NEW'
+    assert len(updates) == 2
+
+    # once reconciled, events go straight to the ledger
+    manager._bm.callback(_execution_report(1, 'FILLED'))
+    assert ledger.get_order(1)['status'] == 'FILLED'
+    assert len(updates) == 3
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+from binance.log import get_logger, get_writer
+
+
+def _log_from_child(path):
+    sys.stdout = open(path, 'w')
+    get_logger('forked').info('child_event', pid=os.getpid(), writer_alive=get_writer().is_alive())
+
+
+@pytest.mark.skipif(not hasattr(os, 'register_at_fork'), reason='fork only')
+def test_forked_child_writes_its_records(tmp_path):
+    get_logger('forked').info('parent_event')
+    path = str(tmp_path / 'child.log')
+    process = multiprocessing.get_context('fork').Process(target=_log_from_child, args=(path,))
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+    with open(path) as f:
+        output = f.read()
+    assert 'forked child_event' in output
+    assert 'writer_alive=True' in output
+    assert 'parent_event' not in output
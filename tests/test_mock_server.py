@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import socket
+import threading
+
+from twisted.internet import reactor
+
+from binance.client import Client
+from binance.websockets import BinanceSocketManager
+from mock_server import FaultConfig, MockBinanceServer, SyntheticMarket
+
+# a base asset that is not three letters long
+SYMBOLS = [('IOTABTC', 'IOTA', 'BTC', 0.0001), ('BTCUSDT', 'BTC', 'USDT', 10000.0)]
+
+
+def _free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_client_order_and_depth_stream_against_the_mock_server():
+    server = MockBinanceServer(SyntheticMarket(SYMBOLS, seed=1), FaultConfig(seed=1), rest_port=_free_port(),
+                               ws_port=_free_port(), tick_interval=0.01, starting_balance=100.0)
+    listening = threading.Event()
+
+    def listen():
+        server.listen()
+        listening.set()
+
+    # the reactor can only be run once per process, so every mock server check is in this one test
+    reactor.callWhenRunning(listen)
+    thread = threading.Thread(target=reactor.run, kwargs={'installSignalHandlers': False})
+    thread.daemon = True
+    thread.start()
+    bm = None
+    try:
+        assert listening.wait(5)
+        client = Client('key', 'secret', base_url=server.base_url)
+
+        info = dict((symbol['symbol'], symbol) for symbol in client.get_exchange_info()['symbols'])
+        assert (info['IOTABTC']['baseAsset'], info['IOTABTC']['quoteAsset']) == ('IOTA', 'BTC')
+
+        order = client.order_market_buy(symbol='IOTABTC', quantity=1.0, newOrderRespType='FULL')
+        assert order['status'] == 'FILLED'
+        assert float(order['executedQty']) == 1.0
+        cost = sum(float(fill['price']) * float(fill['qty']) for fill in order['fills'])
+        assert server.balances['IOTA'] == 101.0
+        assert server.balances['BTC'] == 100.0 - cost
+        assert 'IOT' not in server.balances
+
+        events = []
+        received = threading.Event()
+
+        def depth_event(msg):
+            events.append(msg)
+            if len(events) >= 2:
+                received.set()
+
+        bm = BinanceSocketManager(client, stream_url=server.stream_url)
+        bm.start_depth_socket('IOTABTC', depth_event)
+        assert received.wait(5)
+        assert events[0]['e'] == 'depthUpdate'
+        assert events[0]['s'] == 'IOTABTC'
+        assert events[1]['U'] == events[0]['u'] + 1
+    finally:
+        if bm is not None:
+            reactor.callFromThread(bm.close)
+        reactor.callFromThread(reactor.stop)
+        thread.join(5)
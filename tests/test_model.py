@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+from datetime import timedelta
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from binance.latency import tracer
+
+from TriangularArbitrageModel import TriangularArbitrageModel
+from tests.test_paper import BOOKS, EXCHANGE_INFO
+
+
+class _Response(object):
+
+    def __init__(self, status_code, body, seconds):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = json.dumps(body)
+        self.elapsed = timedelta(seconds=seconds)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class _Session(object):
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.sent = []
+
+    def post(self, uri, data=None, headers=None):
+        symbol = dict(pair.split('=') for pair in data.split('&'))['symbol']
+        self.sent.append(symbol)
+        response = self.responses[symbol]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _model(responses):
+    client = Client('key', 'secret', ping=False)
+    client.session = _Session(responses)
+    model = TriangularArbitrageModel('USDT', 'ETH', 'BTC', client=client, exchange_info=EXCHANGE_INFO)
+    for symbol, order_book in BOOKS.items():
+        model.set_order_book(symbol, order_book)
+    model.evaluate(50.0, 0.0)
+    return model
+
+
+def _accepted(symbol, order_id, seconds):
+    return _Response(200, {'symbol': symbol, 'orderId': order_id}, seconds)
+
+
+def test_concurrent_legs_are_all_handled_when_one_is_rejected():
+    model = _model({
+        'ETHUSDT': _Response(400, {'code': -2010, 'msg': 'Account has insufficient balance'}, 0.01),
+        'ETHBTC': _accepted('ETHBTC', 2, 0.02),
+        'BTCUSDT': _accepted('BTCUSDT', 3, 0.03),
+    })
+    recorded = []
+    model._record_order = recorded.append
+    with pytest.raises(BinanceAPIException) as e:
+        model._place_legs_concurrent(model._arbitrage_legs())
+    assert e.value.code == -2010
+    assert sorted(model.client.session.sent) == ['BTCUSDT', 'ETHBTC', 'ETHUSDT']
+    assert [order['orderId'] for order in recorded] == [2, 3]
+    assert model.leg_latency == [0.01, 0.02, 0.03]
+
+
+def test_concurrent_leg_latency_lines_up_with_the_legs():
+    model = _model({
+        'ETHUSDT': _accepted('ETHUSDT', 1, 0.01),
+        'ETHBTC': ConnectionError('reset'),
+        'BTCUSDT': _accepted('BTCUSDT', 3, 0.03),
+    })
+    with pytest.raises(ConnectionError):
+        model._place_legs_concurrent(model._arbitrage_legs())
+    assert model.leg_latency == [0.01, None, 0.03]
+
+
+def test_concurrent_legs_are_signed_one_by_one():
+    model = _model(dict((symbol, _accepted(symbol, i, 0.01)) for i, symbol in enumerate(BOOKS)))
+    tracer.reset()
+    orders = model._place_legs_concurrent(model._arbitrage_legs())
+    assert len(orders) == 3
+    assert tracer.get_histogram('sign').count == 3
+
+
+def test_concurrent_legs_on_a_paper_client():
+    model = _model({})
+    model.start_paper_trading({'USDT': 100.0, 'ETH': 1.0, 'BTC': 0.1})
+    orders = model.place_arbitrage_trade(sequential=False)
+    assert [order['status'] for order in orders] == ['FILLED'] * 3
+    assert len(model.leg_latency) == 3
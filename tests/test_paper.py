@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import pytest
+
+from binance.client import Client
+from binance.enums import ORDER_TYPE_MARKET, SIDE_BUY, SIDE_SELL
+from binance.exceptions import BinanceOrderException
+
+from TriangularArbitrageModel import TriangularArbitrageModel
+
+
+def _symbol(symbol, base_asset, quote_asset, step_size, tick_size='0.01000000'):
+    return {
+        'symbol': symbol,
+        'status': 'TRADING',
+        'baseAsset': base_asset,
+        'quoteAsset': quote_asset,
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'minPrice': tick_size, 'maxPrice': '100000.00000000',
+             'tickSize': tick_size},
+            {'filterType': 'LOT_SIZE', 'minQty': step_size, 'maxQty': '1000.00000000', 'stepSize': step_size},
+            {'filterType': 'MIN_NOTIONAL', 'minNotional': '0.00010000'},
+        ],
+    }
+
+
+EXCHANGE_INFO = {
+    'symbols': [
+        _symbol('ETHUSDT', 'ETH', 'USDT', '0.00010000'),
+        _symbol('ETHBTC', 'ETH', 'BTC', '0.00010000', '0.00000100'),
+        _symbol('BTCUSDT', 'BTC', 'USDT', '0.00001000'),
+    ]
+}
+
+BOOKS = {
+    'ETHUSDT': {'bids': [['2999.00', '10']], 'asks': [['3000.00', '0.01'], ['3001.00', '10']]},
+    'ETHBTC': {'bids': [['0.050000', '10']], 'asks': [['0.050100', '10']]},
+    'BTCUSDT': {'bids': [['60000.00', '10']], 'asks': [['60010.00', '10']]},
+}
+
+
+def _model(balances):
+    model = TriangularArbitrageModel('USDT', 'ETH', 'BTC', client=Client(None, None, ping=False),
+                                     exchange_info=EXCHANGE_INFO)
+    for symbol, order_book in BOOKS.items():
+        model.set_order_book(symbol, order_book)
+    model.start_paper_trading(balances)
+    # price the triangle without trading, the conditional is never met on the first evaluation
+    model.evaluate(50.0, 0.0)
+    return model
+
+
+def _trade_on_next_evaluation(model):
+    # a history below the current profit meets the trade conditional
+    model.live_pair_a_fill = [0.0] * 11
+    model.live_pair_b_fill = [0.0] * 11
+    model.live_implicit_profit = [40.0] * 11
+
+
+def _filled(order):
+    return sum(float(fill['qty']) for fill in order['fills'])
+
+
+def test_chain_trades_base_to_quote_to_tertiary_and_back():
+    model = _model({'USDT': 100.0})
+    orders = model.place_chained_arbitrage_trade()
+
+    assert [(order['symbol'], order['side']) for order in orders] == [
+        ('ETHUSDT', SIDE_BUY), ('ETHBTC', SIDE_SELL), ('BTCUSDT', SIDE_SELL)]
+    assert [asset for asset, amount in model.leg_received] == ['ETH', 'BTC', 'USDT']
+
+    fee = 1.0 - model.trade_fee
+    eth, btc, usdt = [amount for asset, amount in model.leg_received]
+    assert orders[0]['fills'][1]['price'] == '3001.00000000'
+    # commissions are reported to 8 decimals
+    assert eth == pytest.approx(_filled(orders[0]) * fee, abs=1e-8)
+    assert btc == pytest.approx(_filled(orders[1]) * 0.05 * fee, abs=1e-8)
+    assert usdt == pytest.approx(_filled(orders[2]) * 60000.0 * fee, abs=1e-8)
+
+    # each leg spends what the previous one received, rounded down to the step size
+    assert _filled(orders[1]) == pytest.approx(eth, abs=0.0001)
+    assert _filled(orders[2]) == pytest.approx(btc, abs=0.00001)
+    assert model.trade_results[-1] == (model.implicit_profit, usdt)
+    # the rest is lost rounding each leg down to its step size
+    assert usdt == pytest.approx(model.implicit_profit, rel=0.03)
+
+    client = model.client
+    spent = sum(float(fill['price']) * float(fill['qty']) for fill in orders[0]['fills'])
+    assert client.get_balance('USDT') == pytest.approx(100.0 - spent + usdt)
+    assert client.get_balance('ETH') == pytest.approx(eth - _filled(orders[1]), abs=1e-8)
+    assert client.get_balance('BTC') == pytest.approx(btc - _filled(orders[2]), abs=1e-8)
+    assert min(client.get_balance(asset) for asset in ('USDT', 'ETH', 'BTC')) >= 0.0
+
+
+def test_chained_buy_is_sized_down_the_asks():
+    model = _model({'USDT': 100.0})
+    # 60 USDT buys the 0.01 ETH at 3000 and 0.0099 more at 3001, not 0.02 ETH at the best ask
+    quantity = model._get_chained_quantity(60.0, SIDE_BUY, BOOKS['ETHUSDT'], model.pair_a_lot_size)
+    assert quantity == '0.0199'
+
+
+def test_chain_stops_when_a_leg_raises():
+    model = _model({'USDT': 10.0})
+    assert model.place_chained_arbitrage_trade() == []
+    assert model.leg_received == []
+    assert model.client.get_balance('USDT') == 10.0
+
+
+def test_chain_stops_when_a_leg_fills_nothing():
+    model = _model({'USDT': 100.0})
+    model.set_order_book('ETHBTC', {'bids': [], 'asks': []})
+    orders = model.place_chained_arbitrage_trade()
+    assert [order['symbol'] for order in orders] == ['ETHUSDT', 'ETHBTC']
+    assert model.leg_received[-1] == ('BTC', 0.0)
+    assert not model.trade_results
+
+
+def test_chain_failures_are_recorded():
+    model = _model({'USDT': 10.0})
+    _trade_on_next_evaluation(model)
+    assert model.evaluate(50.0, 0.0)
+    assert model.failed_trades[-1][:2] == (model.implicit_profit, 0)
+    assert 'insufficient balance' in model.failed_trades[-1][2]
+    assert not model.trade_results
+
+
+def test_evaluate_survives_errors_after_the_legs():
+    model = _model({'USDT': 100.0})
+
+    def get_account(**params):
+        raise BinanceOrderException(-1000, 'unavailable')
+
+    model.client.get_account = get_account
+    _trade_on_next_evaluation(model)
+    assert model.evaluate(50.0, 0.0)
+    assert model.failed_trades[-1][1] is None
+    assert len(model.trade_results) == 1
+
+
+@pytest.mark.parametrize('quantity, failure', [
+    ('0.00015', 'LOT_SIZE'),
+    ('0.00001', 'LOT_SIZE'),
+    ('1000.0001', 'LOT_SIZE'),
+    ('0.0001', 'MIN_NOTIONAL'),
+])
+def test_paper_orders_are_rejected_by_the_exchange_filters(quantity, failure):
+    client = _model(None).client
+    with pytest.raises(BinanceOrderException) as e:
+        client.create_order(symbol='ETHBTC', side=SIDE_SELL, type=ORDER_TYPE_MARKET, quantity=quantity)
+    assert e.value.message == 'Filter failure: %s' % failure
+    with pytest.raises(BinanceOrderException):
+        client.create_test_order(symbol='ETHBTC', side=SIDE_SELL, type=ORDER_TYPE_MARKET, quantity=quantity)
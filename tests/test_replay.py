@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+from datetime import timedelta
+
+from binance.recorder import MarketDataRecorder, RECORD_DEPTH_DIFF, RECORD_DEPTH_SNAPSHOT, RECORD_EXCHANGE_INFO
+
+from replay import replay_model
+from tests.test_paper import EXCHANGE_INFO
+
+SNAPSHOTS = {
+    'ETHUSDT': {'lastUpdateId': 10, 'bids': [['2999.00', '10']], 'asks': [['3000.00', '10']]},
+    'ETHBTC': {'lastUpdateId': 20, 'bids': [['0.050000', '10']], 'asks': [['0.050100', '10']]},
+    'BTCUSDT': {'lastUpdateId': 30, 'bids': [['60000.00', '10']], 'asks': [['60010.00', '10']]},
+}
+
+
+def _diff(symbol, update_id, bids=(), asks=()):
+    return {'e': 'depthUpdate', 'E': 0, 's': symbol, 'U': update_id, 'u': update_id,
+            'b': [list(level) for level in bids], 'a': [list(level) for level in asks]}
+
+
+def _record(path, records):
+    recorder = MarketDataRecorder(str(path))
+    for i, (kind, obj, stream) in enumerate(records):
+        # a millisecond apart, from the start of 2024
+        received = 1704067200 * 10 ** 9 + i * 10 ** 6
+        recorder.record(kind, json.dumps(obj).encode('utf-8'), stream, received, received)
+    recorder.close()
+
+
+def _session():
+    # what start_depth_streams records: the depth caches initialise one after another, so
+    # ETHUSDT's depth events arrive before the other books exist
+    records = [(RECORD_EXCHANGE_INFO, EXCHANGE_INFO, ''),
+               (RECORD_DEPTH_SNAPSHOT, SNAPSHOTS['ETHUSDT'], 'ethusdt@depth'),
+               (RECORD_DEPTH_DIFF, _diff('ETHUSDT', 11, bids=[('2999.50', '1')]), 'ethusdt@depth'),
+               (RECORD_DEPTH_SNAPSHOT, SNAPSHOTS['ETHBTC'], 'ethbtc@depth'),
+               (RECORD_DEPTH_SNAPSHOT, SNAPSHOTS['BTCUSDT'], 'btcusdt@depth')]
+    # BTCUSDT's best ask climbs 100 USDT at a time, so does the implicit profit
+    for i in range(6):
+        ask = 60010 + 100 * i
+        records.append((RECORD_DEPTH_DIFF, _diff('BTCUSDT', 31 + i, asks=[('%d.00' % ask, '0'), ('%d.00' % (ask + 100), '10')]),
+                        'btcusdt@depth'))
+    return records
+
+
+def test_replay_of_a_recorded_session(tmp_path):
+    path = tmp_path / 'session.rec'
+    _record(path, _session())
+
+    driver, summary = replay_model(str(path), 'USDT', 'ETH', 'BTC', total_base_asset=100.0,
+                                   profit_conditional=95.0, implicit_rolling_window=2,
+                                   debounce=timedelta(seconds=0.0015))
+
+    # no evaluation until all three books are in, none on the depth cache snapshots
+    assert summary['records'] == 11
+    assert summary['evaluations'] == 6
+    assert driver.model.live_implicit_profit[0] < driver.model.live_implicit_profit[-1]
+    # a rising profit trades once the rolling window is full, then every other update for the debounce
+    assert [str(decision_time.time()) for decision_time, _ in driver.decisions] == [
+        '00:00:00.008000', '00:00:00.010000']
+    assert [profit for _, profit in driver.decisions] == driver.model.live_implicit_profit[3::2]
+
+
+def test_depth_event_before_the_other_books_is_not_evaluated(tmp_path):
+    path = tmp_path / 'partial.rec'
+    _record(path, [(RECORD_DEPTH_SNAPSHOT, SNAPSHOTS['ETHBTC'], 'ethbtc@depth'),
+                   (RECORD_DEPTH_DIFF, _diff('ETHBTC', 21, asks=[('0.050200', '1')]), 'ethbtc@depth')])
+
+    driver, summary = replay_model(str(path), 'USDT', 'ETH', 'BTC', total_base_asset=100.0,
+                                   profit_conditional=95.0, exchange_info=EXCHANGE_INFO)
+    assert summary['evaluations'] == 0
+    assert driver.model.pair_b_order_book['asks'][0] == [0.0501, 10.0]
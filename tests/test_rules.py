@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from decimal import Decimal
+
+import pytest
+
+from binance.enums import FILTER_TYPE_LOT_SIZE, FILTER_TYPE_MIN_NOTIONAL, FILTER_TYPE_PRICE_FILTER
+from binance.rules import Quantiser, SymbolQuantiser
+
+
+def _lot_size():
+    return Quantiser('0.00000001', '90000000000.00000000', '0.00000001')
+
+
+def test_float_snaps_to_the_decimal_it_was_written_as():
+    quantiser = Quantiser('0.01', '1000', '0.01')
+    assert quantiser.to_units(2.3) == 230
+    assert quantiser.quantise(2.3) == '2.30'
+    assert quantiser.quantise(0.0199) == '0.01'
+
+
+def test_str_and_decimal_are_exact():
+    quantiser = _lot_size()
+    assert quantiser.quantise('123456789.12345678') == '123456789.12345678'
+    assert quantiser.quantise(Decimal('123456789.123456789')) == '123456789.12345678'
+    assert quantiser.quantise('2.29999999999999999') == '2.29999999'
+
+
+def test_large_values_keep_every_unit():
+    quantiser = _lot_size()
+    # 9e15 units and more do not fit a float's 53 bits
+    assert quantiser.quantise(123456789.12345678) == '123456789.12345678'
+    assert quantiser.quantise('98765432109.87654321') == '98765432109.87654321'
+    assert Quantiser('0.001', '0', '0.001').quantise(12345678.9) == '12345678.900'
+
+
+def test_int_values():
+    assert Quantiser('0.001', '1000', '0.001').quantise(7) == '7.000'
+    assert Quantiser('1', '1000', '5').quantise(17) == '15'
+
+
+def test_rounds_toward_zero():
+    quantiser = Quantiser('0', '0', '0.5')
+    assert quantiser.quantise(1.9) == '1.5'
+    assert quantiser.quantise(-1.9) == '-1.5'
+    assert quantiser.floor('1.99') == Decimal('1.5')
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), float('-inf'), 'nan', 'inf', Decimal('NaN'), 'abc'])
+def test_non_finite_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        _lot_size().to_units(value)
+
+
+def test_check():
+    quantiser = SymbolQuantiser(Quantiser('0.001', '100', '0.001'), Quantiser('0.01', '10000', '0.01'),
+                                Decimal('10'))
+    assert quantiser.check('1.0015') == FILTER_TYPE_LOT_SIZE
+    assert quantiser.check('100.001') == FILTER_TYPE_LOT_SIZE
+    assert quantiser.check('0.0001') == FILTER_TYPE_LOT_SIZE
+    assert quantiser.check('1', '10.005') == FILTER_TYPE_PRICE_FILTER
+    assert quantiser.check('0.999', '10') == FILTER_TYPE_MIN_NOTIONAL
+    assert quantiser.check('1', '10') is None
+    assert quantiser.check('1') is None
+
+
+def test_validate_batch():
+    np = pytest.importorskip('numpy')
+    quantiser = SymbolQuantiser(Quantiser('0.001', '100', '0.001'), None, Decimal('1'))
+    units, valid = quantiser.validate_batch([2.3, 0.0009, 150.0, float('nan'), float('inf'), 1e300, 0.5],
+                                            [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+    assert units.tolist()[:3] == [2300, 0, 150000]
+    assert valid.tolist() == [True, False, False, False, False, False, False]
+    assert quantiser.lot_size.format_batch(units[:1]) == ['2.300']
+    assert np.array_equal(quantiser.lot_size.to_units_batch([2.3, 0.0199]), [2300, 19])
+
+
+def test_to_units_batch_rejects_non_finite():
+    pytest.importorskip('numpy')
+    with pytest.raises(ValueError):
+        _lot_size().to_units_batch([1.0, float('nan')])
+
+
+def test_batch_matches_scalar():
+    np = pytest.importorskip('numpy')
+    quantiser = Quantiser('0.001', '0', '0.001')
+    values = np.random.RandomState(1).random_sample(10000) * 10.0 ** np.arange(-3, 7).repeat(1000)
+    assert quantiser.to_units_batch(values).tolist() == [quantiser.to_units(value) for value in values]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import time
+
+from sharding import ShardedScanner, find_triangles, partition_triangles, synthetic_market
+from TriangularArbitrageModel import register_pairs, valid_pair_name
+
+
+def _market():
+    exchange_info, books = synthetic_market(assets=4, levels=5)
+    register_pairs(exchange_info)
+    return exchange_info, books, find_triangles(exchange_info, ['USDT'])
+
+
+def test_find_triangles_in_both_directions():
+    exchange_info, books, triangles = _market()
+    assert ('USDT', 'BTC', 'A00') in triangles and ('USDT', 'A00', 'BTC') in triangles
+    assert all(triangle[0] == 'USDT' for triangle in triangles)
+
+
+def test_partition_keeps_both_directions_together():
+    exchange_info, books, triangles = _market()
+    partitions = partition_triangles(triangles, 3, valid_pair_name)
+    assert sorted(sum(partitions, [])) == sorted(triangles)
+    for partition in partitions:
+        assert len(partition) <= -(-len(triangles) // 3) + 1
+        for base, quote, tertiary in partition:
+            assert (base, tertiary, quote) in partition
+
+
+def test_scanner_evaluates_every_shard():
+    exchange_info, books, triangles = _market()
+    scanner = ShardedScanner(exchange_info, triangles, 2, batch_size=1000, max_delay=60.0)
+    scanner.start()
+    for symbol, order_book in sorted(books.items()):
+        scanner.publish(symbol, order_book)
+    scanner.stop()
+    assert len(scanner.partitions) == 2
+    # one batch per shard, each model evaluated once
+    assert scanner.evaluations == len(triangles)
+
+
+def test_quiet_shards_are_flushed_after_max_delay():
+    exchange_info, books, triangles = _market()
+    scanner = ShardedScanner(exchange_info, triangles, 2, batch_size=1000, max_delay=0.01)
+    scanner.start()
+    try:
+        for symbol, order_book in sorted(books.items()):
+            scanner.publish(symbol, order_book)
+        assert any(scanner._pending)
+        time.sleep(0.02)
+        scanner.opportunities()
+        assert not any(scanner._pending)
+    finally:
+        scanner.stop()
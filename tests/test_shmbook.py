@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import time
+from multiprocessing import resource_tracker
+
+import pytest
+
+from binance.depthcache import DepthCacheManager
+from binance.shmbook import SharedBookReader, SharedBookWriter
+
+
+@pytest.fixture
+def writer():
+    writer = SharedBookWriter('test_book_%d' % os.getpid(), ['ETHBTC', 'BTCUSDT'], levels=5)
+    yield writer
+    # readers in the writer's process drop its resource tracker registration, which close unregisters
+    resource_tracker.register(writer._shm._name, 'shared_memory')
+    writer.close()
+
+
+def test_read_returns_the_published_update_id(writer):
+    reader = SharedBookReader(writer.name)
+    assert reader.read('ETHBTC') is None
+    writer.publish('ETHBTC', [[0.04, 1.5]], [[0.0401, 2.0]], 7913455)
+    book = reader.read('ETHBTC')
+    assert book['update_id'] == 7913455
+    assert book['asks'].tolist() == [[0.0401, 2.0]]
+    reader.close()
+
+
+def test_read_gives_up_on_a_writer_that_died_mid_publish(writer):
+    reader = SharedBookReader(writer.name, timeout=0.05)
+    writer.publish('ETHBTC', [[0.04, 1.5]], [[0.0401, 2.0]], 1)
+    # a publish that never finished leaves the version odd
+    writer._headers['version'][0] += 1
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        reader.read('ETHBTC')
+    assert time.monotonic() - start < 1.0
+    assert reader.read('BTCUSDT') is None
+    reader.close()
+
+
+def test_depth_cache_keeps_the_last_update_id():
+    books = []
+    manager = DepthCacheManager(None, 'ETHBTC', books.append, start=False)
+    manager.apply_snapshot({'lastUpdateId': 100, 'bids': [['0.04000000', '1.00000000']], 'asks': []})
+    assert manager.get_depth_cache().update_id == 100
+    manager._depth_event({'u': 105, 'b': [], 'a': [['0.04010000', '2.00000000']]})
+    assert books[-1].update_id == 105
+    assert books[-1].copy().update_id == 105
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import pytest
+
+from sweep import merge_results, run_job
+from tests.test_replay import _record, _session
+
+PARAMS = {'trade_amount': 100.0, 'profit_threshold': -5.0, 'implicit_rolling_window': 2, 'live_window': 60,
+          'debounce': 0.0015, 'trade_fee': 0.0005}
+
+
+def test_job_reports_the_realised_pnl_of_its_decisions(tmp_path):
+    path = str(tmp_path / 'session.rec')
+    _record(path, _session())
+
+    result = run_job((PARAMS, path, ('USDT', 'ETH', 'BTC')))
+    assert result['evaluations'] == 6
+    assert result['opportunities'] == 2
+    assert result['failed_trades'] == 0
+    # the model prices the last leg off BTCUSDT's climbing asks, the paper sells fill at its bid
+    assert result['predicted_pnl'] > 0.0
+    # each trade buys 0.0333 ETH for 99.9 USDT, sells 0.0332 of the ETH received for 0.00166 BTC and
+    # 0.00165 of the BTC received for 99.0 USDT, less the fee of each leg and the rounding to each step size
+    assert result['pnl'] == pytest.approx(2 * (0.00165 * 60000 * 0.9995 - 99.9))
+
+    row, = merge_results([result, result])
+    assert row['partitions'] == 2
+    assert row['pnl'] == 2 * result['pnl']
+    assert row['pnl_per_opportunity'] == pytest.approx(result['pnl'] / 2)
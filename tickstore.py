@@ -0,0 +1,213 @@
+import json
+import os
+
+import numpy as np
+
+from binance.recorder import read_records, RECORD_DEPTH_DIFF, RECORD_DEPTH_SNAPSHOT, RECORD_WS_OTHER
+
+# on disk layout, one directory per symbol holding one fixed width file per column
+#   root/meta.json
+#   root/ETHBTC/ts.bin     int64   receive time in ns, non decreasing
+#   root/ETHBTC/side.bin   uint8   SIDE_BID or SIDE_ASK
+#   root/ETHBTC/kind.bin   uint8   KIND_UPDATE or KIND_SNAPSHOT
+#   root/ETHBTC/price.bin  int64   price in ticks of 10 ** -price_decimals
+#   root/ETHBTC/qty.bin    float64 quantity, 0 removes the level
+#   root/ETHBTC/index.bin  int64   ts of every INDEX_STRIDE-th row, for seeking
+# rows of a snapshot share one ts, a consumer resets the book when a new snapshot ts starts
+
+STORE_VERSION = 1
+
+SIDE_BID = 0
+SIDE_ASK = 1
+KIND_UPDATE = 0
+KIND_SNAPSHOT = 1
+
+INDEX_STRIDE = 4096
+
+COLUMNS = (('ts', np.int64), ('side', np.uint8), ('kind', np.uint8), ('price', np.int64), ('qty', np.float64))
+
+
+def price_to_ticks(price, decimals=8):
+    # exact conversion of a decimal price string to integer ticks, without going through float
+    whole, _, frac = price.partition('.')
+    return int(whole or 0) * 10 ** decimals + int((frac + '0' * decimals)[:decimals])
+
+
+class TickStoreWriter:
+    def __init__(self, root, price_decimals=8, buffer_rows=65536):
+        # append book updates and snapshots to a tick store, creating it if needed
+        self.root = root
+        self.price_decimals = price_decimals
+        self.buffer_rows = buffer_rows
+        self.meta = {'version': STORE_VERSION, 'price_decimals': price_decimals, 'symbols': {}}
+        meta_path = os.path.join(root, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+            if self.meta['price_decimals'] != price_decimals:
+                raise ValueError('tick store %s uses %d price decimals' % (root, self.meta['price_decimals']))
+        os.makedirs(root, exist_ok=True)
+
+        self._buffers = {}
+        self._last_ts = {}
+
+    def _buffer(self, symbol):
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            if symbol not in self.meta['symbols']:
+                self.meta['symbols'][symbol] = {'id': len(self.meta['symbols']), 'rows': 0}
+                os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+            buffer = self._buffers[symbol] = dict((name, []) for name, _ in COLUMNS)
+        return buffer
+
+    def add(self, symbol, ts, side, price, qty, kind=KIND_UPDATE):
+        # price is a decimal string as sent by the exchange, qty a string or float
+        last_ts = self._last_ts.get(symbol)
+        if last_ts is not None and ts < last_ts:
+            raise ValueError('%s rows must be added in time order' % symbol)
+        self._last_ts[symbol] = ts
+        buffer = self._buffer(symbol)
+        buffer['ts'].append(ts)
+        buffer['side'].append(side)
+        buffer['kind'].append(kind)
+        buffer['price'].append(price_to_ticks(price, self.price_decimals))
+        buffer['qty'].append(float(qty))
+        if len(buffer['ts']) >= self.buffer_rows:
+            self._flush_symbol(symbol)
+
+    def add_depth_event(self, ts, msg):
+        # a depthUpdate websocket event
+        for bid in msg['b']:
+            self.add(msg['s'], ts, SIDE_BID, bid[0], bid[1])
+        for ask in msg['a']:
+            self.add(msg['s'], ts, SIDE_ASK, ask[0], ask[1])
+
+    def add_snapshot(self, symbol, ts, order_book):
+        # a REST depth response or partial book depth event
+        for bid in order_book['bids']:
+            self.add(symbol, ts, SIDE_BID, bid[0], bid[1], KIND_SNAPSHOT)
+        for ask in order_book['asks']:
+            self.add(symbol, ts, SIDE_ASK, ask[0], ask[1], KIND_SNAPSHOT)
+
+    def _flush_symbol(self, symbol):
+        buffer = self._buffers.get(symbol)
+        if not buffer or not buffer['ts']:
+            return
+        directory = os.path.join(self.root, symbol)
+        for name, dtype in COLUMNS:
+            with open(os.path.join(directory, name + '.bin'), 'ab') as f:
+                np.asarray(buffer[name], dtype=dtype).tofile(f)
+            buffer[name] = []
+        self.meta['symbols'][symbol]['rows'] = os.path.getsize(os.path.join(directory, 'ts.bin')) // 8
+
+    def flush(self):
+        for symbol in list(self._buffers):
+            self._flush_symbol(symbol)
+        with open(os.path.join(self.root, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2, sort_keys=True)
+
+    def close(self):
+        # flush everything and rebuild the per symbol time indexes
+        self.flush()
+        for symbol in self.meta['symbols']:
+            directory = os.path.join(self.root, symbol)
+            ts_path = os.path.join(directory, 'ts.bin')
+            if not os.path.getsize(ts_path):
+                continue
+            ts = np.memmap(ts_path, dtype=np.int64, mode='r')
+            np.array(ts[::INDEX_STRIDE]).tofile(os.path.join(directory, 'index.bin'))
+            del ts
+
+
+class TickStore:
+    def __init__(self, root):
+        # read only view of a tick store, every column is a numpy.memmap
+        self.root = root
+        with open(os.path.join(root, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != STORE_VERSION:
+            raise ValueError('unsupported tick store version %s' % self.meta['version'])
+        self.price_decimals = self.meta['price_decimals']
+        self._columns = {}
+        self._indexes = {}
+
+    def symbols(self):
+        return sorted(self.meta['symbols'], key=lambda symbol: self.meta['symbols'][symbol]['id'])
+
+    def symbol_id(self, symbol):
+        return self.meta['symbols'][symbol]['id']
+
+    def columns(self, symbol):
+        # dict of column name to memmap over every row of the symbol
+        columns = self._columns.get(symbol)
+        if columns is None:
+            rows = self.meta['symbols'][symbol]['rows']
+            columns = {}
+            for name, dtype in COLUMNS:
+                if rows:
+                    columns[name] = np.memmap(os.path.join(self.root, symbol, name + '.bin'), dtype=dtype,
+                                              mode='r', shape=(rows,))
+                else:
+                    columns[name] = np.empty(0, dtype=dtype)
+            self._columns[symbol] = columns
+        return columns
+
+    def _index(self, symbol):
+        index = self._indexes.get(symbol)
+        if index is None:
+            path = os.path.join(self.root, symbol, 'index.bin')
+            if os.path.exists(path) and os.path.getsize(path):
+                index = np.fromfile(path, dtype=np.int64)
+            else:
+                index = np.asarray(self.columns(symbol)['ts'][::INDEX_STRIDE])
+            self._indexes[symbol] = index
+        return index
+
+    def seek(self, symbol, ts):
+        # row number of the first row at or after ts
+        # the sparse index narrows the search to one stride so only a few pages of ts are touched
+        index = self._index(symbol)
+        ts_column = self.columns(symbol)['ts']
+        block = max(int(np.searchsorted(index, ts, side='left')) - 1, 0)
+        start = block * INDEX_STRIDE
+        end = min(start + 2 * INDEX_STRIDE, len(ts_column))
+        row = start + int(np.searchsorted(ts_column[start:end], ts, side='left'))
+        if row == end and end < len(ts_column):
+            # ts lies beyond the searched window, fall back to the whole column
+            row = int(np.searchsorted(ts_column, ts, side='left'))
+        return row
+
+    def read(self, symbol, start_ts=None, end_ts=None):
+        # columns for start_ts <= ts < end_ts as zero copy memmap slices
+        columns = self.columns(symbol)
+        start = self.seek(symbol, start_ts) if start_ts is not None else 0
+        end = self.seek(symbol, end_ts) if end_ts is not None else len(columns['ts'])
+        return dict((name, column[start:end]) for name, column in columns.items())
+
+    def iter_chunks(self, symbol, start_ts=None, end_ts=None, chunk_rows=INDEX_STRIDE * 16):
+        # stream a time range in chunks of zero copy slices
+        columns = self.read(symbol, start_ts, end_ts)
+        for offset in range(0, len(columns['ts']), chunk_rows):
+            yield dict((name, column[offset:offset + chunk_rows]) for name, column in columns.items())
+
+    def prices(self, ticks):
+        # convert a price tick column to float prices
+        return ticks / float(10 ** self.price_decimals)
+
+
+def ingest_recording(path, root, price_decimals=8):
+    # convert the depth diffs and snapshots of a market data recording into a tick store
+    writer = TickStoreWriter(root, price_decimals)
+    for record in read_records(path):
+        if record.kind == RECORD_DEPTH_SNAPSHOT:
+            snapshot = json.loads(record.payload.decode('utf-8'))
+            symbol = record.stream.split('@')[0].upper()
+            writer.add_snapshot(symbol, record.received, snapshot)
+        elif record.kind in (RECORD_DEPTH_DIFF, RECORD_WS_OTHER):
+            msg = json.loads(record.payload.decode('utf-8'))
+            if isinstance(msg, dict) and 'data' in msg:
+                msg = msg['data']
+            if isinstance(msg, dict) and msg.get('e') == 'depthUpdate':
+                writer.add_depth_event(record.received, msg)
+    writer.close()
+    return TickStore(root)